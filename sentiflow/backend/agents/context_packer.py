@@ -0,0 +1,163 @@
+"""
+Context Packer Module
+Fits retrieved documents and conversation history into a token budget
+"""
+
+import re
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import Config
+from utils.tokens import estimate_tokens, truncate_to_tokens
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_HIGHLIGHT_TAG_RE = re.compile(r"</?em>")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _shingles(text: str, size: int = 5) -> Set[tuple]:
+    """Word n-grams used to detect overlapping chunks"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class ContextPacker:
+    """
+    Packs knowledge base documents into a prompt context:
+    1. Order by relevance score
+    2. Drop chunks that mostly repeat an already packed chunk of the same source
+    3. Use full text for the top documents, highlighted snippets for the rest
+    4. Stop (or truncate) when the token budget is spent
+    """
+
+    def __init__(
+        self,
+        budget_tokens: Optional[int] = None,
+        full_text_docs: int = 1,
+        min_doc_tokens: int = 40,
+        duplicate_threshold: float = 0.6
+    ):
+        """
+        Args:
+            budget_tokens: Token budget for the whole context section
+            full_text_docs: Number of top documents that may use full text
+            min_doc_tokens: Skip a document if less than this budget remains
+            duplicate_threshold: Fraction of shared shingles that marks a duplicate
+        """
+        self.budget_tokens = budget_tokens or Config.CONTEXT_TOKEN_BUDGET
+        self.full_text_docs = full_text_docs
+        self.min_doc_tokens = min_doc_tokens
+        self.duplicate_threshold = duplicate_threshold
+
+    @staticmethod
+    def _clean_snippet(doc: Dict) -> str:
+        return _HIGHLIGHT_TAG_RE.sub("", doc.get("snippet", "")).strip()
+
+    def _choose_body(self, doc: Dict, rank: int, remaining: int) -> Tuple[str, str]:
+        """Pick full text or snippet for a document; returns (body, kind)"""
+        text = doc.get("text", "")
+        snippet = self._clean_snippet(doc)
+        text_tokens = estimate_tokens(text)
+
+        # Snippets only help when they are meaningfully shorter than the text
+        use_snippet = bool(snippet) and estimate_tokens(snippet) < text_tokens and (
+            rank >= self.full_text_docs or text_tokens > remaining
+        )
+        if use_snippet:
+            return snippet, "snippet"
+        return text, "text"
+
+    def pack(self, documents: List[Dict]) -> Dict:
+        """
+        Build the context string within the token budget
+
+        Args:
+            documents: Retrieved documents (with text, snippet, score, source)
+
+        Returns:
+            Dictionary with:
+            - text: formatted context string
+            - documents: documents that made it into the context
+            - tokens: estimated context tokens
+            - snippets: number of documents represented by a snippet
+            - dropped_duplicates / dropped_budget: counts of skipped documents
+        """
+        if not documents:
+            text = "No relevant information found in knowledge base."
+            return {"text": text, "documents": [], "tokens": estimate_tokens(text),
+                    "snippets": 0, "dropped_duplicates": 0, "dropped_budget": 0}
+
+        ranked = sorted(documents, key=lambda d: d.get("score", 0.0), reverse=True)
+        seen: Dict[str, Set[tuple]] = {}
+        parts: List[str] = []
+        packed: List[Dict] = []
+        remaining = self.budget_tokens
+        snippets = dropped_duplicates = dropped_budget = 0
+
+        for doc in ranked:
+            source = doc.get("source", "")
+            shingles = _shingles(doc.get("text", ""))
+            previous = seen.get(source)
+            if previous and shingles:
+                overlap = len(shingles & previous) / len(shingles)
+                if overlap >= self.duplicate_threshold:
+                    dropped_duplicates += 1
+                    continue
+
+            if remaining < self.min_doc_tokens:
+                dropped_budget += 1
+                continue
+
+            header = f"[Document {len(packed) + 1}: {doc.get('title', 'Untitled')}]\n"
+            body, kind = self._choose_body(doc, len(packed), remaining)
+            body = truncate_to_tokens(body, remaining - estimate_tokens(header))
+
+            part = f"{header}{body}\n"
+            parts.append(part)
+            packed.append(doc)
+            remaining -= estimate_tokens(part)
+            snippets += kind == "snippet"
+            seen.setdefault(source, set()).update(shingles)
+
+        text = "\n".join(parts)
+        return {
+            "text": text,
+            "documents": packed,
+            "tokens": estimate_tokens(text),
+            "snippets": snippets,
+            "dropped_duplicates": dropped_duplicates,
+            "dropped_budget": dropped_budget
+        }
+
+
+def truncate_history(
+    history: List[Dict],
+    budget_tokens: Optional[int] = None,
+    max_message_tokens: int = 120
+) -> List[Dict]:
+    """
+    Keep the most recent messages that fit in the history budget
+
+    Args:
+        history: Chronological list of {"role", "content"} messages
+        budget_tokens: Token budget for all kept messages
+        max_message_tokens: Per-message cap (long answers are truncated)
+
+    Returns:
+        Chronological list of (possibly truncated) messages
+    """
+    budget = budget_tokens if budget_tokens is not None else Config.HISTORY_TOKEN_BUDGET
+    kept: List[Dict] = []
+    for msg in reversed(history):
+        content = truncate_to_tokens(msg.get("content", ""), max_message_tokens)
+        cost = estimate_tokens(content) + 2  # role label
+        if cost > budget:
+            break
+        kept.append({"role": msg.get("role", "user"), "content": content})
+        budget -= cost
+    kept.reverse()
+    return kept
@@ -0,0 +1,235 @@
+"""
+Extractive Answer Module
+Answers questions that one knowledge base chunk clearly covers by quoting
+its best sentences (no LLM call)
+"""
+
+import math
+import re
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from agents.context_packer import ContextPacker
+from agents.model_router import retrieval_margin
+from config import Config
+from utils.metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EXTRACTIVE_ANSWERS = REGISTRY.counter(
+    "sentiflow_extractive_answers_total",
+    "Extractive answer attempts by outcome (answered or the gate that failed)",
+    ("outcome",)
+)
+
+# Chunks keep line breaks, so a line is a heading, list item or paragraph;
+# chunks indexed before that are one line and also split at inline bullets
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_COLLAPSED_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])|\s+[-•*]\s+|\s+\d{1,2}\.\s+")
+_LINE_PREFIX_RE = re.compile(r"^(?:[-•*]|\d{1,2}\.|[QA]:)\s+")
+_HEADING_CONNECTORS = frozenset("a an and & for in of on or the to with".split())
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can could do does for from get has have how i i'm if in is it "
+    "its me my of on or our please should so that the their there this to was we what when "
+    "where which who why will with would you your much many hi hello hey".split()
+)
+# Matches through the segment's heading count half
+_HEADING_WEIGHT = 0.5
+_HIGHLIGHT_BONUS = 0.15
+_MIN_SEGMENT_WORDS = 2
+
+
+def _stem(word: str) -> str:
+    """Strip common inflections: shipping/shipped/ships -> ship"""
+    if word.endswith("'s"):
+        return word[:-2]
+    for suffix, min_length in (("ing", 6), ("ed", 5)):
+        if len(word) >= min_length and word.endswith(suffix):
+            word = word[:-len(suffix)]
+            if len(word) > 2 and word[-1] == word[-2] and word[-1] not in "ls":
+                word = word[:-1]
+            return word
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _terms(text: str) -> Set[str]:
+    """Stemmed content words"""
+    return {_stem(word) for word in _WORD_RE.findall(text.lower()) if word not in _STOPWORDS}
+
+
+def _is_heading(line: str) -> bool:
+    """Section titles, lead-ins ("Items must be:") and FAQ questions"""
+    if line.endswith((":", "?")):
+        return True
+    if line[-1] in ".!":
+        return False
+    words = line.split()
+    return len(words) <= 6 and all(
+        word[0].isupper() or not word[0].isalpha() or word.lower() in _HEADING_CONNECTORS
+        for word in words
+    )
+
+
+def split_segments(text: str) -> List[Tuple[str, str]]:
+    """
+    Sentences and list items of a chunk with the heading they belong to
+
+    Returns:
+        (segment, heading) pairs in document order; headings themselves
+        are never segments
+    """
+    segments = []
+    heading = ""
+    splitter = _SENTENCE_SPLIT_RE if "\n" in text else _COLLAPSED_SPLIT_RE
+    for line in text.splitlines():
+        line = _LINE_PREFIX_RE.sub("", line.strip())
+        if not line:
+            continue
+        if _is_heading(line):
+            heading = line.rstrip(":")
+            continue
+        for piece in splitter.split(line):
+            piece = piece.strip()
+            if len(piece.split()) >= _MIN_SEGMENT_WORDS and not piece.endswith(":"):
+                segments.append((piece, heading))
+    return segments
+
+
+class ExtractiveAnswerer:
+    """
+    Quotes the best sentences of a clearly winning knowledge base hit
+
+    Gates (all must pass, otherwise the LLM answers):
+    1. Top hit score >= EXTRACTIVE_MIN_SCORE
+    2. Top hit leads the runner-up by >= EXTRACTIVE_MIN_MARGIN (relative)
+    3. The sentiment is not in EXTRACTIVE_EXCLUDE_SENTIMENTS
+    4. The chosen sentences cover >= EXTRACTIVE_MIN_COVERAGE of the
+       query's content words (idf-weighted)
+
+    Sentences are scored as sparse idf-weighted term vectors against the
+    query in one pass over the chunk, with a bonus for sentences inside the
+    search highlight.
+    """
+
+    def __init__(self):
+        self.min_score = Config.EXTRACTIVE_MIN_SCORE
+        self.min_margin = Config.EXTRACTIVE_MIN_MARGIN
+        self.min_coverage = Config.EXTRACTIVE_MIN_COVERAGE
+        self.max_sentences = max(1, Config.EXTRACTIVE_MAX_SENTENCES)
+        self.excluded_sentiments = {
+            label.strip() for label in Config.EXTRACTIVE_EXCLUDE_SENTIMENTS.split(",") if label.strip()
+        }
+
+    def answer(self, query: str, documents: List[Dict], sentiment_data: Dict, tone: Dict) -> Optional[Dict]:
+        """
+        Build an extractive answer if the gates pass
+
+        Args:
+            query: Customer's question
+            documents: Retrieved documents (with score, text and snippet)
+            sentiment_data: Sentiment analysis result
+            tone: Opening/closing lines (SentimentAnalyzer.get_tone_template)
+
+        Returns:
+            Dictionary with text, sentences, document, score, margin and
+            coverage, or None when the LLM should answer
+        """
+        outcome = self._gate(documents, sentiment_data)
+        if outcome is not None:
+            EXTRACTIVE_ANSWERS.inc(outcome)
+            return None
+
+        top = max(documents, key=lambda doc: doc.get("score") or 0.0)
+        query_terms = _terms(query)
+        segments = split_segments(top.get("text", ""))
+        if not query_terms or not segments:
+            EXTRACTIVE_ANSWERS.inc("no_sentences")
+            return None
+
+        selected, coverage = self._select(query_terms, segments, top)
+        if coverage < self.min_coverage:
+            EXTRACTIVE_ANSWERS.inc("low_coverage")
+            return None
+
+        if len(selected) == 1:
+            body = selected[0]
+        else:
+            body = "\n".join(f"• {sentence}" for sentence in selected)
+        text = f"{tone['opening']}\n\n{body}\n\n{tone['closing']}"
+        EXTRACTIVE_ANSWERS.inc("answered")
+        logger.info(f"📋 Extractive answer from {top.get('title', 'Untitled')} (coverage {coverage:.2f})")
+        return {
+            "text": text,
+            "sentences": selected,
+            "document": {"_id": top.get("_id"), "title": top.get("title"), "source": top.get("source")},
+            "score": top.get("score"),
+            "margin": round(retrieval_margin(documents), 3),
+            "coverage": round(coverage, 3)
+        }
+
+    def _gate(self, documents: List[Dict], sentiment_data: Dict) -> Optional[str]:
+        """Name of the first failing gate, None if retrieval allows quoting"""
+        if not documents:
+            return "no_documents"
+        if sentiment_data.get("label") in self.excluded_sentiments:
+            return "sentiment"
+        top_score = max(doc.get("score") or 0.0 for doc in documents)
+        if top_score < self.min_score:
+            return "low_score"
+        margin = retrieval_margin(documents)
+        if margin is None or margin < self.min_margin:
+            return "low_margin"
+        return None
+
+    def _select(self, query_terms: Set[str], segments: List[Tuple[str, str]], document: Dict) -> tuple:
+        """
+        Best segments (in document order) and their idf-weighted query coverage
+
+        A segment also matches the words of its heading, at half weight
+        ("Return Window" + "Electronics: 15 days from delivery date"). The
+        answer is the best segment, the segments of its section that score
+        close to it, and segments elsewhere only for query words still
+        uncovered.
+        """
+        own_terms = [_terms(segment) for segment, _ in segments]
+        heading_terms = [_terms(heading) for _, heading in segments]
+        count = len(segments)
+        idf = {
+            term: math.log(1.0 + count / (1 + sum(
+                1 for own, head in zip(own_terms, heading_terms) if term in own or term in head
+            )))
+            for term in query_terms
+        }
+        total = sum(idf.values())
+        highlight = _terms(ContextPacker._clean_snippet(document) or "")
+
+        scores = []
+        for own, head in zip(own_terms, heading_terms):
+            score = sum(idf[term] for term in query_terms & own)
+            score += _HEADING_WEIGHT * sum(idf[term] for term in (query_terms & head) - own)
+            score /= total
+            if score > 0 and own and len(own & highlight) >= 0.8 * len(own):
+                # Segment lies inside the search highlight
+                score += _HIGHLIGHT_BONUS
+            scores.append(score)
+
+        ranked = sorted(range(count), key=lambda i: scores[i], reverse=True)
+        best = ranked[0]
+        if scores[best] <= 0:
+            return [], 0.0
+        matched = lambda i: query_terms & (own_terms[i] | heading_terms[i])
+        chosen = [best]
+        covered = set(matched(best))
+        for i in ranked[1:]:
+            if len(chosen) >= self.max_sentences or scores[i] <= 0:
+                break
+            same_section = segments[i][1] == segments[best][1]
+            if (same_section and scores[i] >= 0.8 * scores[best]) or matched(i) - covered:
+                chosen.append(i)
+                covered |= matched(i)
+        coverage = sum(idf[term] for term in covered) / total
+        return [segments[i][0] for i in sorted(chosen)], coverage
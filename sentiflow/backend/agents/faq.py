@@ -0,0 +1,303 @@
+"""
+Precomputed FAQ Answers
+Serves the most frequent customer questions from a table of answers
+generated offline per intent and tone (pipelines/build_faq_table.py), and
+regenerates the table when the knowledge base index changes
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from utils.embeddings import embedding_signature
+from utils.faq_table import FaqTable, write_faq_table
+from utils.metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FAQ_LOOKUPS = REGISTRY.counter(
+    "sentiflow_faq_lookups_total",
+    "FAQ table lookups by outcome (hit, no_match, no_tone, stale, error)",
+    ("outcome",)
+)
+FAQ_REBUILDS = REGISTRY.counter(
+    "sentiflow_faq_rebuilds_total",
+    "FAQ table rebuilds after an index generation change, by outcome",
+    ("outcome",)
+)
+
+# A lock older than this is left over from a crashed rebuild
+_STALE_LOCK_S = 3600
+
+
+def unit(vector: List[float]) -> List[float]:
+    """Vector scaled to length 1"""
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def intent_centroids(intents: List[Dict], embed) -> List[List[float]]:
+    """
+    Count-weighted mean embedding of each intent's member queries
+
+    Args:
+        intents: Intents with members [{"query", "count"}]
+        embed: Callable embedding a list of queries (RETRIEVAL_QUERY)
+
+    Returns:
+        Unit-length centroid per intent
+    """
+    queries = [member["query"] for intent in intents for member in intent["members"]]
+    vectors = []
+    for start in range(0, len(queries), 100):
+        vectors.extend(embed(queries[start:start + 100]))
+
+    centroids = []
+    position = 0
+    for intent in intents:
+        total = None
+        for member in intent["members"]:
+            weighted = [v * member["count"] for v in unit(vectors[position])]
+            total = weighted if total is None else [a + b for a, b in zip(total, weighted)]
+            position += 1
+        centroids.append(unit(total))
+    return centroids
+
+
+def precompute_answers(generator, intents: List[Dict], workers: int = 1) -> Dict[Tuple[int, str], Dict]:
+    """
+    Generate each intent's answer for each of its tone labels
+
+    Every answer runs the full pipeline (retrieval, extractive or Gemini)
+    on a private generator copy, so no conversation history leaks into
+    the prompt. Degraded answers (budget ran out, retrieval failed) are
+    left out and served live instead.
+
+    Args:
+        generator: ResponseGenerator over the knowledge base to answer from
+        intents: Intents with a representative query and tones
+            {label: {"score", "emotion"}}
+        workers: Concurrent generations
+
+    Returns:
+        (intent index, label) -> answer dict
+    """
+    def answer(task: Tuple[int, str]) -> Optional[Dict]:
+        index, label = task
+        intent = intents[index]
+        tone = intent["tones"][label]
+        worker = generator.for_retriever(generator.retriever)
+        result = worker.generate(
+            query=intent["query"],
+            retrieve_context=True,
+            k=3,
+            sentiment_data={
+                "label": label,
+                "score": tone["score"],
+                "emotion": tone["emotion"],
+                "confidence": 1.0
+            }
+        )
+        metadata = result["metadata"]
+        if metadata["degradations"]:
+            return None
+        return {
+            "response": result["response"],
+            "sources": [
+                {"title": doc.get("title", "Untitled"), "source": doc.get("source", "Unknown")}
+                for doc in result["context"]["documents"]
+            ],
+            "query": intent["query"],
+            "model": metadata["model"],
+            "extractive": metadata["extractive"]
+        }
+
+    tasks = [(index, label) for index, intent in enumerate(intents) for label in sorted(intent["tones"])]
+    answers = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for task, result in zip(tasks, pool.map(answer, tasks)):
+            if result is not None:
+                answers[task] = result
+    logger.info(f"📇 Precomputed {len(answers)}/{len(tasks)} FAQ answers for {len(intents)} intents")
+    return answers
+
+
+def compile_faq_table(
+    path: str,
+    intents: List[Dict],
+    generator,
+    centroids: Optional[List[List[float]]] = None,
+    workers: int = 1
+) -> Dict:
+    """
+    Answer the intents against the serving index and write the table
+
+    Args:
+        path: Table file (replaced atomically)
+        intents: Intents (query, count, members, tones) in table order
+        generator: ResponseGenerator used for answers and embeddings
+        centroids: Unit-length centroid per intent (embedded from the
+            members if None)
+        workers: Concurrent generations
+
+    Returns:
+        The table header
+    """
+    generation = generator.retriever.es_client.alias_targets()
+    if centroids is None:
+        centroids = intent_centroids(intents, generator.retriever.generate_query_embeddings)
+    answers = precompute_answers(generator, intents, workers=workers)
+    header = write_faq_table(path, centroids, answers, intents, generation, embedding_signature())
+    logger.info(f"💾 FAQ table {path}: {header['intents']} intents, {header['entries']} answers ({', '.join(generation)})")
+    return header
+
+
+class FaqAnswers:
+    """
+    Precomputed answers for frequent questions
+
+    A query is served from the table when its embedding is within
+    FAQ_MIN_SIMILARITY (cosine) of an intent centroid and the table holds
+    that intent's answer for the customer's sentiment label. The table is
+    only served while it was built from the index generation currently
+    behind the alias and with the configured embeddings; otherwise it is
+    regenerated in the background (FAQ_AUTO_REBUILD) from the intents
+    stored in it. One worker process rebuilds (lock file), the others
+    reload the file when it changes.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Table file (FAQ_TABLE_PATH if None; may not exist yet)
+        """
+        self.path = path or Config.FAQ_TABLE_PATH
+        self.min_similarity = Config.FAQ_MIN_SIMILARITY
+        self.table: Optional[FaqTable] = None
+        self.generation: Optional[List[str]] = None
+        self.rebuilding = False
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> bool:
+        """
+        Map the table file again if it changed on disk
+
+        Returns:
+            bool: True if a new table was loaded
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            table = FaqTable(self.path)
+        except Exception as e:
+            logger.error(f"❌ Could not load FAQ table {self.path}: {str(e)}")
+            return False
+        # The previous map is released once in-flight lookups drop their reference
+        self.table, self._mtime = table, mtime
+        logger.info(f"📇 Loaded FAQ table: {table.size} intents, {len(table.labels)} tones ({table.built_at})")
+        return True
+
+    @property
+    def serving(self) -> bool:
+        """Whether the loaded table matches the serving index and embeddings"""
+        table = self.table
+        return (
+            table is not None
+            and self.generation is not None
+            and table.generation == self.generation
+            and table.embedding == embedding_signature()
+        )
+
+    def lookup(self, embedding: List[float], label: str) -> Optional[Dict]:
+        """
+        Precomputed answer for a query embedding and sentiment label
+
+        Args:
+            embedding: Query embedding (RETRIEVAL_QUERY)
+            label: Customer's sentiment label
+
+        Returns:
+            Answer dict plus intent and similarity, or None on a miss
+        """
+        table = self.table
+        if table is None:
+            return None
+        if not self.serving:
+            FAQ_LOOKUPS.inc("stale")
+            return None
+        intent, similarity = table.nearest(unit(embedding))
+        if intent is None or similarity < self.min_similarity:
+            FAQ_LOOKUPS.inc("no_match")
+            return None
+        answer = table.answer(intent, label)
+        if answer is None:
+            FAQ_LOOKUPS.inc("no_tone")
+            return None
+        FAQ_LOOKUPS.inc("hit")
+        return {**answer, "intent": intent, "similarity": round(similarity, 4), "built_at": table.built_at}
+
+    def sync(self, generation: List[str], generator) -> None:
+        """
+        Follow the serving index generation (called by the index watcher)
+
+        Args:
+            generation: Concrete index(es) behind the alias now
+            generator: ResponseGenerator to regenerate answers with
+        """
+        self.generation = list(generation)
+        self.reload()
+        if self.table is None or self.serving or not Config.FAQ_AUTO_REBUILD:
+            return
+        with self._lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+        logger.info(f"♻️  FAQ table was built for {', '.join(self.table.generation)}; regenerating")
+        threading.Thread(target=self._rebuild, args=(generator,), name="faq-rebuild", daemon=True).start()
+
+    def _rebuild(self, generator) -> None:
+        lock_path = f"{self.path}.lock"
+        try:
+            try:
+                if time.time() - os.stat(lock_path).st_mtime > _STALE_LOCK_S:
+                    os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                # Another worker is rebuilding; its file is picked up by reload()
+                FAQ_REBUILDS.inc("skipped")
+                return
+            try:
+                compile_faq_table(self.path, self.table.intents(), generator, workers=Config.FAQ_REBUILD_WORKERS)
+            finally:
+                os.remove(lock_path)
+            self.reload()
+            FAQ_REBUILDS.inc("ok")
+        except Exception as e:
+            FAQ_REBUILDS.inc("error")
+            logger.error(f"❌ FAQ table rebuild failed: {str(e)}")
+        finally:
+            with self._lock:
+                self.rebuilding = False
+
+    def stats(self) -> Dict:
+        return {
+            "table": self.table.stats() if self.table else None,
+            "serving": self.serving,
+            "rebuilding": self.rebuilding,
+            "min_similarity": self.min_similarity
+        }
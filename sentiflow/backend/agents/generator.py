@@ -3,24 +3,49 @@ Response Generator Module
 Uses RAG pattern to generate context-aware, sentiment-adaptive responses
 """
 
-import vertexai
-from vertexai.generative_models import GenerativeModel
 import time
 import sys
 import os
+import copy
 import logging
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from agents.context_packer import ContextPacker, truncate_history
+from agents.extractive import ExtractiveAnswerer
+from agents.faq import FaqAnswers
+from agents.model_router import ModelRouter
+from agents.prompts import SUPPORT_SYSTEM_INSTRUCTION, assemble, build_support_suffix
 from agents.retriever import HybridRetriever
 from agents.sentiment import SentimentAnalyzer
+from utils.cache import TTLCache, cache_key, normalize_text
+from utils.deadline import DeadlineExceeded, current_deadline, deadline_scope, run_with_timeout, stage_timeout
+from utils.metrics import REGISTRY, span
+from utils.singleflight import SingleFlight
+from utils.tokens import estimate_tokens
+from utils.vertex import create_generative_model, init_vertex
 from config import Config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PROMPT_TOKENS = REGISTRY.histogram(
+    "sentiflow_prompt_tokens",
+    "Estimated generation prompt size in tokens",
+    buckets=(250, 500, 750, 1000, 1500, 2000, 3000, 4000, 6000, 8000)
+)
+GENERATION_LATENCY = REGISTRY.histogram(
+    "sentiflow_generation_seconds",
+    "Gemini generation call latency by model and outcome",
+    ("model", "outcome")
+)
+CACHE_INVALIDATIONS = REGISTRY.counter(
+    "sentiflow_answer_cache_invalidations_total",
+    "Answer caches dropped because the knowledge base index was swapped"
+)
+
 
 class ResponseGenerator:
     """
@@ -30,27 +55,62 @@ class ResponseGenerator:
     3. Generate response adapted to sentiment + context
     """
     
-    def __init__(self):
-        """Initialize Gemini model, retriever, and sentiment analyzer"""
+    def __init__(
+        self,
+        retriever: Optional[HybridRetriever] = None,
+        sentiment_analyzer: Optional[SentimentAnalyzer] = None,
+        model_factory: Optional[Callable[..., object]] = None
+    ):
+        """
+        Initialize Gemini model, retriever, and sentiment analyzer
+        
+        Args:
+            retriever: Shared HybridRetriever (created if None)
+            sentiment_analyzer: Shared SentimentAnalyzer (created if None)
+            model_factory: Callable (model_name, system_instruction=...) returning
+                           an object with generate_content() (Gemini if None)
+        """
         try:
-            # Initialize Vertex AI
-            vertexai.init(
-                project=Config.GCP_PROJECT_ID,
-                location=Config.VERTEX_AI_LOCATION
-            )
+            # Initialize Vertex AI only when real models will be created
+            if model_factory is None:
+                init_vertex()
+            self._model_factory = model_factory or create_generative_model
+            
+            # Static prompt prefix, attached to each model instance once
+            self._system_instruction, _ = assemble(SUPPORT_SYSTEM_INSTRUCTION, "")
+            self.prefix_tokens = estimate_tokens(SUPPORT_SYSTEM_INSTRUCTION)
             
-            # Candidate models - use simple names (not full resource paths) to avoid SDK bugs
-            self._model_names = [
-                "gemini-2.0-flash-exp",
-                "gemini-1.5-pro"
-            ]
+            # Per-request choice between the fast and strong model (the other
+            # one stays as fallback) - simple names, not full resource paths
+            self.router = ModelRouter()
+            
+            # LLM-free answers for questions one chunk clearly covers
+            self.extractive = ExtractiveAnswerer() if Config.EXTRACTIVE_ANSWERS else None
+            
+            # Answers precomputed offline for the most frequent questions
+            self.faq = FaqAnswers() if Config.FAQ_TABLE else None
 
-            # Lazy model init; we will instantiate per-attempt to allow fallback
+            # Lazy model init; instances are cached per name to allow fallback
             self.model = None
+            self._models: Dict[str, object] = {}
             
             # Initialize retriever and sentiment analyzer
-            self.retriever = HybridRetriever()
-            self.sentiment_analyzer = SentimentAnalyzer()
+            self.retriever = retriever or HybridRetriever()
+            self.sentiment_analyzer = sentiment_analyzer or SentimentAnalyzer()
+            
+            # Recent full answers, served when the budget is too short for Gemini
+            self.answer_cache = TTLCache(
+                maxsize=Config.ANSWER_CACHE_SIZE,
+                ttl_s=Config.ANSWER_CACHE_TTL_S
+            )
+            # Concrete index(es) the answers were generated from
+            self.index_generation = None
+            
+            # Concurrent identical questions share one pipeline run
+            self.answer_flights = SingleFlight("generate") if Config.SINGLEFLIGHT else None
+            
+            # Token-budgeted context assembly
+            self.context_packer = ContextPacker()
             
             # Conversation history (for context)
             self.conversation_history: List[Dict] = []
@@ -61,9 +121,69 @@ class ResponseGenerator:
             logger.error(f"❌ Failed to initialize ResponseGenerator: {str(e)}")
             raise
     
+    def for_retriever(self, retriever: HybridRetriever) -> "ResponseGenerator":
+        """
+        Generator for another knowledge base (e.g. a tenant's index)
+        
+        Shares the Gemini models and sentiment analyzer; conversation
+        history and the answer cache are separate, and the FAQ table
+        (built from the default knowledge base) is not used.
+        """
+        generator = copy.copy(self)
+        generator.retriever = retriever
+        generator.faq = None
+        generator.conversation_history = []
+        generator.answer_cache = TTLCache(
+            maxsize=Config.ANSWER_CACHE_SIZE,
+            ttl_s=Config.ANSWER_CACHE_TTL_S
+        )
+        generator.index_generation = None
+        if self.answer_flights is not None:
+            generator.answer_flights = SingleFlight("generate")
+        return generator
+    
+    def sync_index_generation(self) -> bool:
+        """
+        Drop cached answers if the knowledge base alias moved to a new index
+        
+        The FAQ table is checked on every call: it stops being served and
+        is regenerated when it was built for another index generation.
+        
+        Returns:
+            bool: True if the caches were invalidated
+        """
+        generation = tuple(self.retriever.es_client.alias_targets())
+        if self.faq is not None:
+            self.faq.sync(list(generation), self)
+        previous, self.index_generation = self.index_generation, generation
+        if previous is None or previous == generation:
+            return False
+        self.answer_cache.clear()
+        CACHE_INVALIDATIONS.inc()
+        logger.info(
+            f"♻️  {self.retriever.es_client.index_name} now serves {', '.join(generation)}; "
+            f"answer cache cleared"
+        )
+        return True
+    
+    def _get_model(self, model_name: str):
+        """Return a cached model instance for model_name"""
+        model = self._models.get(model_name)
+        if model is None:
+            model = self._model_factory(model_name, system_instruction=self._system_instruction)
+            self._models[model_name] = model
+        return model
+    
+    def warm_up(self) -> None:
+        """Instantiate the primary model and run a tiny generation"""
+        self._get_model(self.router.fast_model).generate_content("Reply with OK.")
+        for model_name in self.router.model_names[1:]:
+            self._get_model(model_name)
+        logger.info("🔥 ResponseGenerator warmed up")
+    
     def format_context(self, documents: List[Dict]) -> str:
         """
-        Format retrieved documents into context string
+        Format retrieved documents into context string within the token budget
         
         Args:
             documents: List of retrieved documents
@@ -71,17 +191,7 @@ class ResponseGenerator:
         Returns:
             Formatted context string
         """
-        if not documents:
-            return "No relevant information found in knowledge base."
-        
-        context_parts = []
-        for i, doc in enumerate(documents, 1):
-            context_parts.append(
-                f"[Document {i}: {doc.get('title', 'Untitled')}]\n"
-                f"{doc.get('text', '')}\n"
-            )
-        
-        return "\n".join(context_parts)
+        return self.context_packer.pack(documents)["text"]
     
     def build_prompt(
         self,
@@ -91,7 +201,11 @@ class ResponseGenerator:
         conversation_history: Optional[List[Dict]] = None
     ) -> str:
         """
-        Build the complete prompt for Gemini
+        Build the per-request prompt for Gemini
+        
+        The static instructions (SUPPORT_SYSTEM_INSTRUCTION) are the model's
+        system instruction when PROMPT_PREFIX_CACHE is enabled, otherwise
+        they are prepended here.
         
         Args:
             query: Customer's question
@@ -100,175 +214,433 @@ class ResponseGenerator:
             conversation_history: Previous messages
             
         Returns:
-            Complete prompt string
+            Prompt contents string
         """
         # Get tone instruction based on sentiment
         tone_instruction = self.sentiment_analyzer.get_tone_instruction(sentiment_data)
         
-        # Build conversation history section
-        history_section = ""
-        if conversation_history:
-            history_section = "\n## Previous Conversation:\n"
-            for msg in conversation_history[-3:]:  # Last 3 exchanges
-                role = msg.get('role', 'user')
-                content = msg.get('content', '')
-                history_section += f"{role.upper()}: {content}\n"
-        
-        # Build complete prompt
-        prompt = f"""You are a helpful customer support agent for an e-commerce company.
-
-## Your Task:
-Answer the customer's question using the provided context from the knowledge base.
-{tone_instruction}
-
-{history_section}
+        # Most recent conversation messages within the history budget
+        history = truncate_history(conversation_history or [])
+        
+        suffix = build_support_suffix(query, context, tone_instruction, history)
+        _, prompt = assemble(SUPPORT_SYSTEM_INSTRUCTION, suffix)
+        
+        return prompt
+    
+    def _generate_with_fallback(self, prompt: str, model_names: Optional[List[str]] = None) -> Dict:
+        """
+        Run the prompt through the first model, falling back on failure
+        
+        Args:
+            prompt: Complete prompt string
+            model_names: Models in the order to try (fast, then strong if None)
+            
+        Returns:
+            Dictionary with text, model used and prompt_tokens reported by
+            the model (None if unavailable)
+            
+        Raises:
+            DeadlineExceeded: if the request budget runs out
+        """
+        # Try primary + fallback models with basic backoff on 429s, all
+        # within the request deadline (DeadlineExceeded is never retried)
+        last_error: Optional[Exception] = None
+        response_text = None
+        for model_name in model_names or self.router.model_names:
+            try:
+                # Skip duplicates while preserving order
+                if model_name is None:
+                    continue
+                logger.info(f"🧠 Using model: {model_name}")
+                self.model = self._get_model(model_name)
 
-## Knowledge Base Context:
-{context}
+                # Up to 2 quick retries for transient quota issues
+                for attempt in range(1, 3):
+                    started = time.perf_counter()
+                    try:
+                        model = self.model
+                        response = run_with_timeout(
+                            "generation",
+                            lambda: model.generate_content(prompt, generation_config=None),
+                            stage_timeout()
+                        )
+                        response_text = response.text
+                        GENERATION_LATENCY.observe(time.perf_counter() - started, model_name, "ok")
+                        break
+                    except DeadlineExceeded:
+                        GENERATION_LATENCY.observe(time.perf_counter() - started, model_name, "deadline")
+                        raise
+                    except Exception as e:
+                        GENERATION_LATENCY.observe(time.perf_counter() - started, model_name, "error")
+                        msg = str(e)
+                        if "429" in msg or "Resource exhausted" in msg:
+                            wait_s = 1.5 * attempt
+                            last_error = e
+                            remaining = stage_timeout()
+                            if remaining is not None and remaining <= wait_s:
+                                # Backing off would use up the budget; try the next model
+                                break
+                            logger.warning(f"⏳ Rate limited on {model_name} (attempt {attempt}); retrying in {wait_s:.1f}s...")
+                            time.sleep(wait_s)
+                            continue
+                        else:
+                            last_error = e
+                            raise
 
-## Customer's Current Question:
-{query}
+                if response_text:
+                    # Successful generation
+                    break
 
-## Instructions:
-1. Use ONLY information from the knowledge base context above
-2. If the context doesn't contain the answer, politely say you don't have that information
-3. Be concise but thorough
-4. Use a friendly, professional tone
-5. Adapt your response style based on the customer's sentiment
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                last_error = e
+                logger.warning(f"⚠️ Model {model_name} failed: {e}")
+                # Try next fallback model
+                continue
 
-## Your Response:
-"""
+        if not response_text:
+            # All models failed
+            raise last_error if last_error else RuntimeError("Failed to generate response with available models")
         
-        return prompt
+        usage = getattr(response, 'usage_metadata', None)
+        return {
+            "text": response_text,
+            "model": model_name,
+            "prompt_tokens": getattr(usage, 'prompt_token_count', None)
+        }
     
     def generate(
         self,
         query: str,
         retrieve_context: bool = True,
-        k: int = 3
+        k: int = 3,
+        sentiment_data: Optional[Dict] = None
     ) -> Dict:
         """
         Generate a response to the customer query
         
+        Runs under the current request deadline (REQUEST_DEADLINE_MS if the
+        caller has none). When the budget runs low the answer degrades
+        instead of failing; metadata.degradations lists what fired:
+        - sentiment_skipped: neutral tone used, no sentiment call
+        - retrieval_skipped: answered without knowledge base context
+        - cached_answer: a recent full answer to the same question
+        - retrieval_only: top snippets without LLM synthesis
+        
+        metadata.extractive is True when the answer quotes a clearly winning
+        knowledge base chunk instead of calling Gemini (EXTRACTIVE_ANSWERS).
+        
+        Concurrent calls for the same question (normalized text, sentiment
+        label, k) share one run; the copies returned to the callers that
+        waited carry metadata.coalesced = True.
+        
         Args:
             query: Customer's question
             retrieve_context: Whether to retrieve context (set False for testing)
             k: Number of documents to retrieve
+            sentiment_data: Sentiment already computed by the caller (analyzed if None)
             
         Returns:
             Dictionary with response, sentiment, context, and metadata
         """
         try:
-            logger.info(f"💬 Generating response for: '{query[:50]}...'")
-            
-            # Step 1: Analyze sentiment
-            sentiment_data = self.sentiment_analyzer.analyze(query)
+            with deadline_scope(Config.REQUEST_DEADLINE_MS / 1000):
+                if self.answer_flights is None:
+                    return self._generate(query, retrieve_context, k, sentiment_data)
+                try:
+                    result, shared = self.answer_flights.do(
+                        self._flight_key(query, sentiment_data, retrieve_context, k),
+                        lambda: self._generate(query, retrieve_context, k, sentiment_data),
+                        timeout=stage_timeout(),
+                        label=query
+                    )
+                except DeadlineExceeded:
+                    # Only a waiting caller gets here (_generate degrades instead of raising)
+                    return self.generate_retrieval_only(
+                        query, sentiment_data or self.sentiment_analyzer._get_fallback_sentiment(), k=k
+                    )
+                if shared:
+                    result = copy.deepcopy(result)
+                    result["metadata"]["coalesced"] = True
+                return result
+        except Exception as e:
+            logger.error(f"❌ Error generating response: {str(e)}")
+            raise
+    
+    @staticmethod
+    def _flight_key(query: str, sentiment_data: Optional[Dict], retrieve_context: bool, k: int) -> str:
+        label = sentiment_data["label"] if sentiment_data else ""
+        return cache_key(normalize_text(query), label, str(retrieve_context), str(k))
+    
+    def is_generating(self, query: str, sentiment_data: Optional[Dict], k: int = 3) -> bool:
+        """Whether an identical generate() call is in flight (a new one would wait for it)"""
+        if self.answer_flights is None:
+            return False
+        return self.answer_flights.in_flight(self._flight_key(query, sentiment_data, True, k))
+    
+    def flight_stats(self) -> Dict:
+        """Singleflight counters for answers, retrievals and query embeddings"""
+        return {
+            "generate": self.answer_flights.stats() if self.answer_flights else None,
+            **self.retriever.flight_stats()
+        }
+    
+    def _generate(
+        self,
+        query: str,
+        retrieve_context: bool,
+        k: int,
+        sentiment_data: Optional[Dict]
+    ) -> Dict:
+        logger.info(f"💬 Generating response for: '{query[:50]}...'")
+        degradations: List[str] = []
+        
+        # Step 1: Analyze sentiment
+        if sentiment_data is None:
+            with span("generate.sentiment"):
+                sentiment_data, skipped = self.sentiment_analyzer.analyze_with_deadline(query)
+            if skipped:
+                degradations.append("sentiment_skipped")
+        logger.info(
+            f"😊 Sentiment: {sentiment_data['label']} "
+            f"({sentiment_data['emotion']}, {sentiment_data['confidence']:.2f})"
+        )
+        
+        # Step 2: Retrieve context
+        documents = []
+        packed = None
+        
+        if retrieve_context:
+            try:
+                with span("generate.retrieve"):
+                    documents = self.retriever.retrieve(query, k=k)
+            except DeadlineExceeded:
+                degradations.append("retrieval_skipped")
+            packed = self.context_packer.pack(documents)
+            context = packed["text"]
             logger.info(
-                f"😊 Sentiment: {sentiment_data['label']} "
-                f"({sentiment_data['emotion']}, {sentiment_data['confidence']:.2f})"
+                f"📚 Retrieved {len(documents)} documents "
+                f"({len(packed['documents'])} packed, {packed['tokens']} tokens)"
             )
-            
-            # Step 2: Retrieve context
-            documents = []
-            context = ""
-            
-            if retrieve_context:
-                documents = self.retriever.retrieve(query, k=k)
-                context = self.format_context(documents)
-                logger.info(f"📚 Retrieved {len(documents)} documents")
+        else:
+            context = "No context retrieval requested."
+        
+        # Step 3: Quote the knowledge base when one chunk clearly answers the question
+        extraction = None
+        if self.extractive is not None and documents:
+            with span("generate.extractive"):
+                extraction = self.extractive.answer(
+                    query, documents, sentiment_data, self.sentiment_analyzer.get_tone_template(sentiment_data)
+                )
+        
+        # Step 4: Build prompt
+        prompt_tokens = 0
+        if extraction is None:
+            with span("generate.prompt"):
+                prompt = self.build_prompt(
+                    query=query,
+                    context=context,
+                    sentiment_data=sentiment_data,
+                    conversation_history=self.conversation_history
+                )
+            prompt_tokens = estimate_tokens(prompt)
+            if self._system_instruction:
+                prompt_tokens += self.prefix_tokens
+            PROMPT_TOKENS.observe(prompt_tokens)
+        
+        # Step 5: Generate response (only if the budget still allows a model call)
+        answer_key = cache_key(normalize_text(query), sentiment_data["label"])
+        generation = None
+        route = None
+        deadline = current_deadline()
+        if extraction is None and deadline.remaining() >= Config.GENERATION_MIN_BUDGET_MS / 1000:
+            route = self.router.route(query, sentiment_data, documents, deadline.remaining())
+            logger.info(
+                f"🤖 Generating response with {route['model']} ({route['reason']}, "
+                f"{prompt_tokens} prompt tokens)..."
+            )
+            try:
+                with span("generate.llm"):
+                    generation = self._generate_with_fallback(prompt, [route["model"]] + route["fallbacks"])
+            except DeadlineExceeded:
+                logger.warning("⏱️  Generation abandoned: request budget exhausted")
+        
+        if extraction is not None:
+            generation = {"text": extraction["text"], "model": None, "prompt_tokens": 0}
+            response_text = extraction["text"]
+        elif generation is not None:
+            response_text = generation["text"]
+            self.answer_cache.set(answer_key, generation)
+        else:
+            cached = self.answer_cache.get(answer_key)
+            if cached is not None:
+                degradations.append("cached_answer")
+                generation = cached
+                response_text = cached["text"]
             else:
-                context = "No context retrieval requested."
-            
-            # Step 3: Build prompt
-            prompt = self.build_prompt(
-                query=query,
-                context=context,
-                sentiment_data=sentiment_data,
-                conversation_history=self.conversation_history
+                degradations.append("retrieval_only")
+                generation = {"text": None, "model": None, "prompt_tokens": None}
+                response_text = self._snippet_answer(documents)
+        
+        # Step 6: Update conversation history
+        self.conversation_history.append({
+            "role": "user",
+            "content": query
+        })
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": response_text
+        })
+        
+        # Keep only last 10 messages
+        if len(self.conversation_history) > 10:
+            self.conversation_history = self.conversation_history[-10:]
+        
+        logger.info(f"✅ Response generated ({len(response_text)} chars)")
+        
+        # Return complete result
+        return {
+            "response": response_text,
+            "sentiment": sentiment_data,
+            "context": {
+                "documents": documents,
+                "num_documents": len(documents)
+            },
+            "metadata": {
+                "query": query,
+                "model": generation["model"],
+                "routing": route,
+                "extractive": extraction is not None,
+                "extraction": extraction,
+                "retrieval_enabled": retrieve_context,
+                "degradations": degradations,
+                "deadline_remaining_ms": round(deadline.remaining() * 1000),
+                "usage": {
+                    "prompt_tokens": generation["prompt_tokens"] or prompt_tokens,
+                    "prompt_tokens_estimated": prompt_tokens,
+                    "prefix_tokens": self.prefix_tokens if self._system_instruction else 0,
+                    "context_tokens": packed["tokens"] if packed else 0,
+                    "documents_in_context": len(packed["documents"]) if packed else 0,
+                    "snippet_documents": packed["snippets"] if packed else 0
+                }
+            }
+        }
+    
+    @staticmethod
+    def _snippet_answer(documents: List[Dict]) -> str:
+        """Canned answer listing the best matching knowledge base snippets"""
+        if not documents:
+            return (
+                "We're handling a high volume of requests right now. Please try again "
+                "in a moment and we'll get you a full answer."
             )
-            # Step 4: Generate response
-            logger.info("🤖 Generating response with Gemini...")
-
-            # Try primary + fallback models with basic backoff on 429s
-            last_error: Optional[Exception] = None
-            response_text = None
-            for model_name in self._model_names:
-                try:
-                    # Skip duplicates while preserving order
-                    if model_name is None:
-                        continue
-                    logger.info(f"🧠 Using model: {model_name}")
-                    self.model = GenerativeModel(model_name)
-
-                    # Up to 2 quick retries for transient quota issues
-                    for attempt in range(1, 3):
-                        try:
-                            response = self.model.generate_content(
-                                prompt,
-                                generation_config=None
-                            )
-                            response_text = response.text
-                            break
-                        except Exception as e:
-                            msg = str(e)
-                            if "429" in msg or "Resource exhausted" in msg:
-                                wait_s = 1.5 * attempt
-                                logger.warning(f"⏳ Rate limited on {model_name} (attempt {attempt}); retrying in {wait_s:.1f}s...")
-                                time.sleep(wait_s)
-                                last_error = e
-                                continue
-                            else:
-                                last_error = e
-                                raise
-
-                    if response_text:
-                        # Successful generation
-                        break
-
-                except Exception as e:
-                    last_error = e
-                    logger.warning(f"⚠️ Model {model_name} failed: {e}")
-                    # Try next fallback model
-                    continue
-
-            if not response_text:
-                # All models failed
-                raise last_error if last_error else RuntimeError("Failed to generate response with available models")
-            
-            # Step 5: Update conversation history
-            self.conversation_history.append({
-                "role": "user",
-                "content": query
-            })
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": response_text
-            })
-            
-            # Keep only last 10 messages
-            if len(self.conversation_history) > 10:
-                self.conversation_history = self.conversation_history[-10:]
-            
-            logger.info(f"✅ Response generated ({len(response_text)} chars)")
+        lines = [
+            f"• {doc.get('title', 'Untitled')}: {ContextPacker._clean_snippet(doc) or doc.get('text', '')[:200]}"
+            for doc in documents
+        ]
+        return (
+            "We're handling a high volume of requests right now, so here is what "
+            "our help center says about your question:\n\n" + "\n".join(lines)
+        )
+    
+    def answer_from_faq(self, query: str, sentiment_data: Dict) -> Optional[Dict]:
+        """
+        Precomputed answer if the question matches a frequent intent
+        
+        Costs one query embedding (reused by retrieval on a miss) and a
+        nearest-centroid lookup; no search, no Gemini call.
+        
+        Args:
+            query: Customer's question
+            sentiment_data: Sentiment computed by the caller
             
-            # Return complete result
-            return {
-                "response": response_text,
-                "sentiment": sentiment_data,
-                "context": {
-                    "documents": documents,
-                    "num_documents": len(documents)
+        Returns:
+            Same structure as generate() with metadata.faq set, or None
+            when the full pipeline has to answer
+        """
+        if self.faq is None or self.faq.table is None:
+            return None
+        try:
+            with span("generate.faq"):
+                embedding = self.retriever.generate_query_embedding(query)
+                answer = self.faq.lookup(embedding, sentiment_data["label"])
+        except DeadlineExceeded:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ FAQ lookup failed: {str(e)}")
+            return None
+        if answer is None:
+            return None
+        
+        logger.info(f"📇 FAQ answer (intent {answer['intent']}, similarity {answer['similarity']:.3f})")
+        self.conversation_history.append({"role": "user", "content": query})
+        self.conversation_history.append({"role": "assistant", "content": answer["response"]})
+        if len(self.conversation_history) > 10:
+            self.conversation_history = self.conversation_history[-10:]
+        
+        return {
+            "response": answer["response"],
+            "sentiment": sentiment_data,
+            "context": {
+                "documents": answer["sources"],
+                "num_documents": len(answer["sources"])
+            },
+            "metadata": {
+                "query": query,
+                "model": answer["model"],
+                "extractive": answer["extractive"],
+                "faq": {
+                    "intent": answer["intent"],
+                    "query": answer["query"],
+                    "similarity": answer["similarity"],
+                    "built_at": answer["built_at"]
                 },
-                "metadata": {
-                    "query": query,
-                    "model": Config.GEMINI_MODEL,
-                    "retrieval_enabled": retrieve_context
-                }
+                "retrieval_enabled": True,
+                "degradations": [],
+                "usage": {}
             }
+        }
+    
+    def generate_retrieval_only(self, query: str, sentiment_data: Dict, k: int = 3) -> Dict:
+        """
+        Degraded answer without LLM synthesis (used when load is shed)
+        
+        Lists the best matching knowledge base snippets under a short canned
+        introduction. Costs one embedding and one search, no Gemini call.
+        
+        Args:
+            query: Customer's question
+            sentiment_data: Sentiment computed by the caller
+            k: Number of documents to retrieve
             
-        except Exception as e:
-            logger.error(f"❌ Error generating response: {str(e)}")
-            raise
+        Returns:
+            Same structure as generate(), with metadata.degradations set
+        """
+        degradations = ["retrieval_only"]
+        documents = []
+        try:
+            with deadline_scope(Config.REQUEST_DEADLINE_MS / 1000):
+                with span("generate.retrieve"):
+                    documents = self.retriever.retrieve(query, k=k)
+        except DeadlineExceeded:
+            degradations.append("retrieval_skipped")
+        
+        return {
+            "response": self._snippet_answer(documents),
+            "sentiment": sentiment_data,
+            "context": {
+                "documents": documents,
+                "num_documents": len(documents)
+            },
+            "metadata": {
+                "query": query,
+                "model": None,
+                "retrieval_enabled": True,
+                "degradations": degradations,
+                "usage": {}
+            }
+        }
     
     def reset_conversation(self):
         """Clear conversation history"""
@@ -279,6 +651,7 @@ Answer the customer's question using the provided context from the knowledge bas
 # Test function
 if __name__ == "__main__":
     """Test the response generator"""
+    Config.load()
     generator = ResponseGenerator()
     
     # Test queries with different sentiments
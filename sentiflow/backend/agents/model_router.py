@@ -0,0 +1,150 @@
+"""
+Model Router Module
+Picks the generation model per request: routine questions with a clear
+knowledge base answer go to the fast model, upset customers and ambiguous
+or complex questions to the stronger one
+"""
+
+import re
+import logging
+from typing import Dict, List, Optional
+
+from config import Config
+from utils.metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+STRONG = "strong"
+
+MODEL_ROUTES = REGISTRY.counter(
+    "sentiflow_model_routes_total",
+    "Generation routing decisions by tier and deciding reason",
+    ("tier", "reason")
+)
+
+_WORD_RE = re.compile(r"\w+")
+_CLAUSE_RE = re.compile(r"\?|\b(?:and also|but|however|although|whereas|compared to|versus|vs)\b", re.IGNORECASE)
+
+
+def query_complexity(query: str) -> Dict:
+    """
+    Cheap structural signals of a hard question
+
+    Returns:
+        Dictionary with words and clauses (questions / contrasting parts)
+    """
+    return {
+        "words": len(_WORD_RE.findall(query)),
+        "clauses": max(1, len(_CLAUSE_RE.findall(query)))
+    }
+
+
+def retrieval_margin(documents: List[Dict]) -> Optional[float]:
+    """
+    Relative lead of the top hit over the runner-up, (s1 - s2) / s1
+
+    Scale-free, so it works for exact and kNN scores alike. 1.0 for a
+    single hit, None without hits.
+    """
+    scores = sorted((doc.get("score") or 0.0 for doc in documents), reverse=True)
+    if not scores or scores[0] <= 0:
+        return None
+    if len(scores) == 1:
+        return 1.0
+    return (scores[0] - scores[1]) / scores[0]
+
+
+class ModelRouter:
+    """
+    Sentiment-, retrieval- and complexity-aware choice of generation model
+
+    The first matching rule decides:
+    1. budget: too little time left for the strong model -> fast
+    2. sentiment: label in ROUTING_STRONG_SENTIMENTS -> strong
+    3. ambiguous_sentiment: sentiment confidence below threshold -> strong
+    4. complex_query: long or multi-part question -> strong
+    5. weak_retrieval: no hit, or top hit barely ahead of the next -> strong
+    6. routine: everything else -> fast
+    The other tier's model stays as fallback if the chosen one fails.
+    """
+
+    def __init__(
+        self,
+        fast_model: Optional[str] = None,
+        strong_model: Optional[str] = None,
+        enabled: Optional[bool] = None
+    ):
+        """
+        Args:
+            fast_model: Cheap/low-latency model (GENERATION_FAST_MODEL if None)
+            strong_model: Higher-quality model (GENERATION_STRONG_MODEL if None)
+            enabled: Route per request (MODEL_ROUTING if None); when off the
+                fast model is always tried first
+        """
+        self.fast_model = fast_model or Config.GENERATION_FAST_MODEL
+        self.strong_model = strong_model or Config.GENERATION_STRONG_MODEL
+        self.enabled = Config.MODEL_ROUTING if enabled is None else enabled
+        self.strong_sentiments = {
+            label.strip() for label in Config.ROUTING_STRONG_SENTIMENTS.split(",") if label.strip()
+        }
+
+    @property
+    def model_names(self) -> List[str]:
+        """All models the router can pick, fast first"""
+        return [self.fast_model] + ([self.strong_model] if self.strong_model != self.fast_model else [])
+
+    def route(
+        self,
+        query: str,
+        sentiment_data: Dict,
+        documents: List[Dict],
+        remaining_s: Optional[float] = None
+    ) -> Dict:
+        """
+        Choose the model for one generation
+
+        Args:
+            query: Customer's question
+            sentiment_data: Sentiment analysis result
+            documents: Retrieved documents (with scores)
+            remaining_s: Request budget left in seconds (None = unlimited)
+
+        Returns:
+            Dictionary with tier, model, fallbacks, reason and the signals used
+        """
+        complexity = query_complexity(query)
+        margin = retrieval_margin(documents)
+        signals = {
+            "sentiment": sentiment_data.get("label"),
+            "sentiment_confidence": sentiment_data.get("confidence"),
+            "retrieval_margin": round(margin, 3) if margin is not None else None,
+            "query_words": complexity["words"],
+            "query_clauses": complexity["clauses"]
+        }
+
+        if not self.enabled:
+            tier, reason = FAST, "static"
+        elif remaining_s is not None and remaining_s * 1000 < Config.ROUTING_STRONG_MIN_BUDGET_MS:
+            tier, reason = FAST, "budget"
+        elif signals["sentiment"] in self.strong_sentiments:
+            tier, reason = STRONG, "sentiment"
+        elif (signals["sentiment_confidence"] or 0.0) < Config.ROUTING_MIN_SENTIMENT_CONFIDENCE:
+            tier, reason = STRONG, "ambiguous_sentiment"
+        elif complexity["words"] > Config.ROUTING_MAX_QUERY_WORDS or complexity["clauses"] > 1:
+            tier, reason = STRONG, "complex_query"
+        elif margin is None or margin < Config.ROUTING_MIN_MARGIN:
+            tier, reason = STRONG, "weak_retrieval"
+        else:
+            tier, reason = FAST, "routine"
+
+        model = self.fast_model if tier == FAST else self.strong_model
+        MODEL_ROUTES.inc(tier, reason)
+        return {
+            "tier": tier,
+            "model": model,
+            "fallbacks": [name for name in self.model_names if name != model],
+            "reason": reason,
+            "signals": signals
+        }
@@ -0,0 +1,125 @@
+"""
+Prompt Templates Module
+Splits every prompt into a static prefix (sent once as the model's system
+instruction, cacheable by Gemini) and a small per-request suffix
+"""
+
+import json
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+# ---------------------------------------------------------------------------
+# Response generation
+# ---------------------------------------------------------------------------
+
+SUPPORT_SYSTEM_INSTRUCTION = """You are a helpful customer support agent for an e-commerce company.
+
+## Your Task:
+Answer the customer's question using the provided context from the knowledge base.
+
+## Instructions:
+1. Use ONLY information from the knowledge base context provided with the question
+2. If the context doesn't contain the answer, politely say you don't have that information
+3. Be concise but thorough
+4. Use a friendly, professional tone
+5. Adapt your response style based on the customer's sentiment and the tone guidance"""
+
+
+@lru_cache(maxsize=32)
+def render_tone_block(tone_instruction: str) -> str:
+    """Rendered tone section (one cached string per tone label)"""
+    return f"## Tone:\n{tone_instruction}\n"
+
+
+def render_history_block(history: List[Dict]) -> str:
+    """Render previous conversation messages"""
+    if not history:
+        return ""
+    lines = [f"{msg.get('role', 'user').upper()}: {msg.get('content', '')}" for msg in history]
+    return "## Previous Conversation:\n" + "\n".join(lines) + "\n"
+
+
+def build_support_suffix(
+    query: str,
+    context: str,
+    tone_instruction: str,
+    history: Optional[List[Dict]] = None
+) -> str:
+    """
+    Per-request part of the generation prompt
+
+    Args:
+        query: Customer's question
+        context: Packed knowledge base context
+        tone_instruction: Tone guidance for the detected sentiment
+        history: Truncated conversation history
+
+    Returns:
+        Prompt suffix to send as the user content
+    """
+    return (
+        f"{render_tone_block(tone_instruction)}\n"
+        f"{render_history_block(history or [])}\n"
+        f"## Knowledge Base Context:\n{context}\n\n"
+        f"## Customer's Current Question:\n{query}\n\n"
+        f"## Your Response:\n"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Sentiment analysis
+# ---------------------------------------------------------------------------
+
+SENTIMENT_SYSTEM_INSTRUCTION = """You are a sentiment analysis expert. Analyze the sentiment and emotion in customer service messages.
+
+Analyze and return ONLY a JSON object (no markdown, no explanations) with this EXACT structure:
+{
+  "score": <float between 0.0 and 1.0, where 0=very negative, 0.5=neutral, 1=very positive>,
+  "label": "<one of: positive, neutral, negative, frustrated, urgent>",
+  "emotion": "<primary emotion: happy, satisfied, neutral, confused, disappointed, angry, frustrated, anxious, urgent>",
+  "confidence": <float between 0.0 and 1.0 indicating classification confidence>
+}
+
+Rules:
+- "frustrated" = customer is annoyed or impatient, showing irritation
+- "urgent" = customer needs immediate help or expresses time pressure
+- "negative" = unhappy but not yet frustrated
+- "neutral" = factual inquiry without strong emotion
+- "positive" = satisfied or happy tone"""
+
+
+def build_sentiment_suffix(message: str) -> str:
+    """Per-request part of the sentiment prompt"""
+    return f'Customer Message: "{message}"\n\nJSON output:'
+
+
+def build_sentiment_batch_suffix(messages: List[str]) -> str:
+    """Per-request part of a batched sentiment prompt (one result per message)"""
+    return (
+        "Analyze each of the following customer messages independently.\n"
+        f"Customer Messages (JSON array):\n{json.dumps(messages, ensure_ascii=False)}\n\n"
+        "JSON output (array with one object per message, in the same order):"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Assembly
+# ---------------------------------------------------------------------------
+
+def assemble(system_instruction: str, suffix: str) -> Tuple[Optional[str], str]:
+    """
+    Decide how a prompt is sent to the model
+
+    With PROMPT_PREFIX_CACHE enabled the static prefix travels as the
+    model's system instruction (created once per model, eligible for
+    Gemini context/implicit caching) and only the suffix is sent per call.
+    Disabled, the whole prompt is sent as one user message.
+
+    Returns:
+        (system_instruction for the model or None, contents for generate_content)
+    """
+    if Config.PROMPT_PREFIX_CACHE:
+        return system_instruction, suffix
+    return None, f"{system_instruction}\n\n{suffix}"
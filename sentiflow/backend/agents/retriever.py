@@ -3,17 +3,22 @@ Hybrid Search Retriever Module
 Combines semantic (vector) and keyword search for optimal retrieval
 """
 
-import vertexai
-from vertexai.language_models import TextEmbeddingModel, TextEmbeddingInput
 import sys
 import os
+import copy
 import logging
 from typing import List, Dict
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils.batching import MicroBatcher
+from utils.cache import TTLCache, cache_key, normalize_text
+from utils.deadline import run_with_timeout, stage_timeout, wait_for
 from utils.elastic_client import ElasticClient
+from utils.embeddings import build_embedding_provider
+from utils.metrics import span
+from utils.singleflight import SingleFlight
 from config import Config
 
 logging.basicConfig(level=logging.INFO)
@@ -28,22 +33,42 @@ class HybridRetriever:
     - RRF (Reciprocal Rank Fusion) for combining results
     """
     
-    def __init__(self):
-        """Initialize Vertex AI embedding model and Elasticsearch client"""
+    def __init__(self, embedder=None, es_client: ElasticClient = None):
+        """
+        Initialize embedding provider and Elasticsearch client
+        
+        Args:
+            embedder: Embedding provider (EMBEDDING_PROVIDER's, created if None)
+            es_client: Shared ElasticClient (created if None)
+        """
         try:
-            # Initialize Vertex AI
-            vertexai.init(
-                project=Config.GCP_PROJECT_ID,
-                location=Config.VERTEX_AI_LOCATION
-            )
-            
-            # Initialize embedding model
-            self.embedding_model = TextEmbeddingModel.from_pretrained(
-                Config.EMBEDDING_MODEL
-            )
+            # Initialize embedding provider
+            self.embedder = embedder or build_embedding_provider()
             
             # Initialize Elasticsearch client
-            self.es_client = ElasticClient()
+            self.es_client = es_client or ElasticClient()
+            
+            # Coalesce concurrent query embeddings into batched calls
+            self._embed_batcher = None
+            if Config.MICRO_BATCHING:
+                self._embed_batcher = MicroBatcher(
+                    self.generate_query_embeddings,
+                    name="embedding",
+                    max_batch=Config.EMBEDDING_BATCH_MAX,
+                    max_wait_ms=Config.BATCH_MAX_WAIT_MS
+                )
+            
+            # Recent query embeddings (a FAQ lookup miss reuses its embedding for retrieval)
+            self._embedding_cache = None
+            if Config.QUERY_EMBEDDING_CACHE_SIZE > 0:
+                self._embedding_cache = TTLCache(
+                    maxsize=Config.QUERY_EMBEDDING_CACHE_SIZE,
+                    ttl_s=Config.QUERY_EMBEDDING_CACHE_TTL_S
+                )
+            
+            # Share in-flight work between concurrent identical queries
+            self._embed_flights = SingleFlight("embedding") if Config.SINGLEFLIGHT else None
+            self._retrieve_flights = SingleFlight("retrieve") if Config.SINGLEFLIGHT else None
             
             logger.info(f"✅ Initialized HybridRetriever")
             
@@ -51,6 +76,27 @@ class HybridRetriever:
             logger.error(f"❌ Failed to initialize HybridRetriever: {str(e)}")
             raise
     
+    def for_es_client(self, es_client: ElasticClient) -> "HybridRetriever":
+        """Retriever over another index sharing the embedding provider and batcher"""
+        retriever = copy.copy(self)
+        retriever.es_client = es_client
+        if self._retrieve_flights is not None:
+            retriever._retrieve_flights = SingleFlight("retrieve")
+        return retriever
+    
+    def warm_up(self) -> None:
+        """
+        Run a dummy embedding and search to prime model and connection pools
+        
+        Raises:
+            ValueError: if the index was built with another embedding
+                provider, model or size
+        """
+        self.es_client.check_embedding_space()
+        embedding = self.generate_query_embedding("warm up")
+        self.es_client.warm_up(embedding)
+        logger.info("🔥 HybridRetriever warmed up")
+    
     def generate_query_embedding(self, query: str) -> List[float]:
         """
         Generate embedding for search query
@@ -60,18 +106,52 @@ class HybridRetriever:
             
         Returns:
             Embedding vector
+            
+        Raises:
+            DeadlineExceeded: if the request budget runs out first
         """
         try:
-            # Use RETRIEVAL_QUERY task type for queries
-            inputs = [TextEmbeddingInput(text=query, task_type="RETRIEVAL_QUERY")]
-            embeddings = self.embedding_model.get_embeddings(inputs)
+            key = None
+            if self._embedding_cache is not None:
+                key = cache_key(self.embedder.provider, self.embedder.model_name, str(self.embedder.dims), query)
+                embedding = self._embedding_cache.get(key)
+                if embedding is not None:
+                    return embedding
+            
+            if self._embed_flights is not None:
+                embedding, _ = self._embed_flights.do(
+                    query, lambda: self._embed_query(query), timeout=stage_timeout()
+                )
+            else:
+                embedding = self._embed_query(query)
             
-            return embeddings[0].values
+            if key is not None:
+                self._embedding_cache.set(key, embedding)
+            return embedding
             
         except Exception as e:
             logger.error(f"❌ Error generating query embedding: {str(e)}")
             raise
     
+    def _embed_query(self, query: str) -> List[float]:
+        timeout = stage_timeout()
+        if self._embed_batcher is not None:
+            return wait_for("embedding", self._embed_batcher.submit(query), timeout)
+        return run_with_timeout("embedding", lambda: self.generate_query_embeddings([query])[0], timeout)
+    
+    def generate_query_embeddings(self, queries: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for several queries in one provider call
+        
+        Args:
+            queries: Search query texts
+            
+        Returns:
+            Embedding vectors in input order
+        """
+        # Use RETRIEVAL_QUERY task type for queries
+        return self.embedder.embed(queries, "RETRIEVAL_QUERY")
+    
     def retrieve(
         self,
         query: str,
@@ -92,12 +172,31 @@ class HybridRetriever:
             List of documents with scores and snippets
         """
         try:
-            logger.info(f"🔍 Retrieving top {k} documents for: '{query[:50]}...'")
+            if self._retrieve_flights is not None:
+                # Concurrent identical queries (after normalization) share one search
+                key = cache_key(normalize_text(query), str(k), str(semantic_weight), str(keyword_weight))
+                results, shared = self._retrieve_flights.do(
+                    key,
+                    lambda: self._retrieve(query, k, semantic_weight, keyword_weight),
+                    timeout=stage_timeout(),
+                    label=query
+                )
+                return [dict(doc) for doc in results] if shared else results
+            return self._retrieve(query, k, semantic_weight, keyword_weight)
             
-            # Generate query embedding
+        except Exception as e:
+            logger.error(f"❌ Error retrieving documents: {str(e)}")
+            raise
+    
+    def _retrieve(self, query: str, k: int, semantic_weight: float, keyword_weight: float) -> List[Dict]:
+        logger.info(f"🔍 Retrieving top {k} documents for: '{query[:50]}...'")
+        
+        # Generate query embedding
+        with span("retrieve.embedding"):
             query_embedding = self.generate_query_embedding(query)
-            
-            # Perform hybrid search
+        
+        # Perform hybrid search
+        with span("retrieve.search"):
             results = self.es_client.hybrid_search(
                 query_text=query,
                 query_embedding=query_embedding,
@@ -105,20 +204,23 @@ class HybridRetriever:
                 semantic_weight=semantic_weight,
                 keyword_weight=keyword_weight
             )
-            
-            # Log results
-            if results:
-                logger.info(f"✅ Retrieved {len(results)} documents")
-                for i, doc in enumerate(results[:3], 1):
-                    logger.debug(f"  {i}. {doc.get('title', 'Untitled')} (score: {doc['score']:.2f})")
-            else:
-                logger.warning("⚠️  No documents found")
-            
-            return results
-            
-        except Exception as e:
-            logger.error(f"❌ Error retrieving documents: {str(e)}")
-            raise
+        
+        # Log results
+        if results:
+            logger.info(f"✅ Retrieved {len(results)} documents")
+            for i, doc in enumerate(results[:3], 1):
+                logger.debug(f"  {i}. {doc.get('title', 'Untitled')} (score: {doc['score']:.2f})")
+        else:
+            logger.warning("⚠️  No documents found")
+        
+        return results
+    
+    def flight_stats(self) -> Dict:
+        """Singleflight counters for retrieval and query embeddings"""
+        return {
+            "retrieve": self._retrieve_flights.stats() if self._retrieve_flights else None,
+            "embedding": self._embed_flights.stats() if self._embed_flights else None
+        }
     
     def retrieve_with_filter(
         self,
@@ -151,6 +253,7 @@ class HybridRetriever:
 # Test function
 if __name__ == "__main__":
     """Test the hybrid retriever"""
+    Config.load()
     retriever = HybridRetriever()
     
     # Test queries
@@ -3,16 +3,193 @@ Sentiment Analysis Module
 Real-time emotion detection using Google Cloud Gemini AI
 """
 
-import vertexai
-from vertexai.generative_models import GenerativeModel
-import json
 import logging
-from typing import Dict
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
 from config import Config
+from agents.prompts import (
+    SENTIMENT_SYSTEM_INSTRUCTION, assemble, build_sentiment_batch_suffix, build_sentiment_suffix
+)
+from utils.batching import MicroBatcher
+from utils.deadline import DeadlineExceeded, run_with_timeout, stage_timeout, wait_for
+from utils.cache import DiskCache, TTLCache, cache_key, normalize_text
+from utils.metrics import REGISTRY, span
+from utils.vertex import create_generative_model, json_generation_config
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _JSONDecodeError = orjson.JSONDecodeError
+except ImportError:  # pragma: no cover - stdlib fallback
+    import json
+    _json_loads = json.loads
+    _JSONDecodeError = json.JSONDecodeError
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+VALID_LABELS = ('positive', 'neutral', 'negative', 'frustrated', 'urgent')
+VALID_EMOTIONS = (
+    'happy', 'satisfied', 'neutral', 'confused', 'disappointed',
+    'angry', 'frustrated', 'anxious', 'urgent'
+)
+
+# Constrained decoding schema (Vertex AI OpenAPI subset)
+SENTIMENT_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "score": {"type": "NUMBER"},
+        "label": {"type": "STRING", "enum": list(VALID_LABELS)},
+        "emotion": {"type": "STRING", "enum": list(VALID_EMOTIONS)},
+        "confidence": {"type": "NUMBER"}
+    },
+    "required": ["score", "label", "emotion", "confidence"]
+}
+SENTIMENT_BATCH_SCHEMA = {"type": "ARRAY", "items": SENTIMENT_RESPONSE_SCHEMA}
+
+SENTIMENT_PARSE = REGISTRY.counter(
+    "sentiflow_sentiment_parse_total",
+    "Sentiment response parse outcomes (ok, recovered, or failure class)",
+    ("outcome",)
+)
+
+SENTIMENT_CACHE = REGISTRY.counter(
+    "sentiflow_sentiment_cache_total",
+    "Sentiment cache lookups by result (memory, disk, miss)",
+    ("result",)
+)
+SENTIMENT_CACHE_HIT_RATIO = REGISTRY.gauge(
+    "sentiflow_sentiment_cache_hit_ratio",
+    "Fraction of sentiment lookups served without a Gemini call"
+)
+
+
+class SentimentParseError(ValueError):
+    """Sentiment output that could not be parsed; failure_class labels the metric"""
+    
+    def __init__(self, failure_class: str, message: str):
+        super().__init__(message)
+        self.failure_class = failure_class
+
+
+def parse_sentiment(response_text: str) -> Tuple[Dict, str]:
+    """
+    Parse and validate a sentiment JSON object
+    
+    Fast path: JSON-mode output is a bare object and is handed straight to
+    the parser. Otherwise the outermost {...} is sliced out (markdown
+    fences, leading prose) without splitting or copying line by line.
+    
+    Args:
+        response_text: Raw model output
+        
+    Returns:
+        (validated sentiment dict, "ok" or "recovered")
+        
+    Raises:
+        SentimentParseError: with failure_class empty, no_object,
+            decode_error, not_object, missing_keys or bad_type
+    """
+    text = response_text.strip() if response_text else ""
+    if not text:
+        raise SentimentParseError("empty", "Empty sentiment response")
+    
+    outcome = "ok"
+    if text[0] != "{":
+        start = text.find("{")
+        end = text.rfind("}")
+        if start < 0 or end < start:
+            raise SentimentParseError("no_object", "No JSON object in sentiment response")
+        text = text[start:end + 1]
+        outcome = "recovered"
+    
+    try:
+        result = _json_loads(text)
+    except _JSONDecodeError as e:
+        raise SentimentParseError("decode_error", f"JSON decode error: {e}")
+    
+    return _validate_sentiment(result, outcome)
+
+
+def parse_sentiment_batch(response_text: str, expected: int) -> List[Tuple[Optional[Dict], str]]:
+    """
+    Parse a JSON array of sentiment objects from a batched call
+    
+    Args:
+        response_text: Raw model output
+        expected: Number of messages in the batch
+        
+    Returns:
+        One (sentiment dict or None, outcome) per message; invalid items
+        are None with their failure class as outcome
+        
+    Raises:
+        SentimentParseError: if the array itself is unusable (empty,
+            no_array, decode_error, count_mismatch)
+    """
+    text = response_text.strip() if response_text else ""
+    if not text:
+        raise SentimentParseError("empty", "Empty sentiment response")
+    
+    outcome = "ok"
+    if text[0] != "[":
+        start = text.find("[")
+        end = text.rfind("]")
+        if start < 0 or end < start:
+            raise SentimentParseError("no_array", "No JSON array in sentiment response")
+        text = text[start:end + 1]
+        outcome = "recovered"
+    
+    try:
+        items = _json_loads(text)
+    except _JSONDecodeError as e:
+        raise SentimentParseError("decode_error", f"JSON decode error: {e}")
+    
+    if not isinstance(items, list) or len(items) != expected:
+        count = len(items) if isinstance(items, list) else "no"
+        raise SentimentParseError("count_mismatch", f"Expected {expected} results, got {count}")
+    
+    results = []
+    for item in items:
+        try:
+            results.append(_validate_sentiment(item, outcome))
+        except SentimentParseError as e:
+            results.append((None, e.failure_class))
+    return results
+
+
+def _validate_sentiment(result, outcome: str) -> Tuple[Dict, str]:
+    """Check a decoded sentiment object and clamp/normalize its fields"""
+    if not isinstance(result, dict):
+        raise SentimentParseError("not_object", "Sentiment response is not an object")
+    
+    missing = [key for key in SENTIMENT_RESPONSE_SCHEMA["required"] if key not in result]
+    if missing:
+        raise SentimentParseError("missing_keys", f"Missing keys: {', '.join(missing)}")
+    
+    try:
+        score = max(0.0, min(1.0, float(result['score'])))
+        confidence = max(0.0, min(1.0, float(result['confidence'])))
+    except (TypeError, ValueError):
+        raise SentimentParseError("bad_type", "score/confidence must be numbers")
+    
+    label = result['label']
+    if label not in VALID_LABELS:
+        label = 'neutral'
+        outcome = "invalid_label"
+    
+    emotion = result['emotion']
+    if emotion not in VALID_EMOTIONS:
+        emotion = 'neutral'
+        outcome = "invalid_emotion"
+    
+    return {
+        "score": score,
+        "label": label,
+        "emotion": emotion,
+        "confidence": confidence
+    }, outcome
+
 
 class SentimentAnalyzer:
     """
@@ -20,17 +197,58 @@ class SentimentAnalyzer:
     Detects emotions and classifies sentiment for personalized responses
     """
     
-    def __init__(self):
-        """Initialize Vertex AI and Gemini model"""
+    def __init__(
+        self,
+        model_factory: Optional[Callable[..., object]] = None,
+        cache: Optional[TTLCache] = None,
+        disk_cache: Optional[DiskCache] = None
+    ):
+        """
+        Initialize Vertex AI and Gemini model
+        
+        Args:
+            model_factory: Callable (model_name, system_instruction=...) returning
+                           an object with generate_content() (Gemini if None)
+            cache: In-process result cache (built from SENTIMENT_CACHE_* if None)
+            disk_cache: Shared on-disk cache (SENTIMENT_CACHE_PATH if None and set)
+        """
         try:
-            # Initialize Vertex AI
-            vertexai.init(
-                project=Config.GCP_PROJECT_ID,
-                location=Config.VERTEX_AI_LOCATION
-            )
+            # Static instructions travel as the system instruction when enabled
+            system_instruction, _ = assemble(SENTIMENT_SYSTEM_INSTRUCTION, "")
+            factory = model_factory or create_generative_model
             
             # Initialize Gemini model - use simple name to avoid SDK path bugs
-            self.model = GenerativeModel(Config.GEMINI_MODEL)
+            self.model = factory(Config.GEMINI_MODEL, system_instruction=system_instruction)
+            
+            # Constrained JSON output with a minimal token cap
+            self.generation_config = None
+            if Config.SENTIMENT_JSON_MODE:
+                self.generation_config = json_generation_config(
+                    SENTIMENT_RESPONSE_SCHEMA,
+                    max_output_tokens=Config.SENTIMENT_MAX_OUTPUT_TOKENS
+                )
+            
+            # Memoized results keyed on normalized message text
+            self.cache = cache if cache is not None else TTLCache(
+                maxsize=Config.SENTIMENT_CACHE_SIZE,
+                ttl_s=Config.SENTIMENT_CACHE_TTL_S
+            )
+            self.disk_cache = disk_cache
+            if self.disk_cache is None and Config.SENTIMENT_CACHE_PATH:
+                self.disk_cache = DiskCache(Config.SENTIMENT_CACHE_PATH, ttl_s=Config.SENTIMENT_CACHE_TTL_S)
+            self._lookups = 0
+            self._hits = 0
+            self._stats_lock = threading.Lock()
+            
+            # Concurrent cache misses are classified together in one call
+            self._batcher = None
+            if Config.MICRO_BATCHING and Config.SENTIMENT_BATCH_MAX > 1:
+                self._batcher = MicroBatcher(
+                    self._analyze_batch,
+                    name="sentiment",
+                    max_batch=Config.SENTIMENT_BATCH_MAX,
+                    max_wait_ms=Config.BATCH_MAX_WAIT_MS
+                )
             
             logger.info(f"✅ Initialized SentimentAnalyzer with {Config.GEMINI_MODEL}")
             
@@ -52,92 +270,205 @@ class SentimentAnalyzer:
             - emotion: str (primary emotion detected)
             - confidence: float (0-1, model's confidence in classification)
         """
+        return self.analyze_with_deadline(message)[0]
+    
+    def analyze_with_deadline(self, message: str) -> Tuple[Dict, bool]:
+        """
+        Analyze sentiment within the current request deadline
+        
+        The model call gets at most SENTIMENT_TIMEOUT_MS and never eats into
+        the GENERATION_MIN_BUDGET_MS kept for answering the customer.
+        
+        Args:
+            message: Customer's message text
+            
+        Returns:
+            (sentiment dict, skipped) - skipped is True when the budget did
+            not allow a model call and the neutral fallback was returned
+        """
+        key = self.cache_key(message)
+        cached = self._cache_lookup(key)
+        if cached is not None:
+            return cached, False
+        
+        timeout = stage_timeout(
+            cap=Config.SENTIMENT_TIMEOUT_MS / 1000,
+            reserve=Config.GENERATION_MIN_BUDGET_MS / 1000
+        )
         try:
-            # Build prompt for sentiment analysis
-            prompt = f"""You are a sentiment analysis expert. Analyze the sentiment and emotion in this customer service message.
+            if self._batcher is not None:
+                result = wait_for("sentiment", self._batcher.submit(message), timeout)
+            else:
+                result = run_with_timeout("sentiment", lambda: self._analyze_one(message), timeout)
+        except DeadlineExceeded:
+            logger.warning("⏱️  Sentiment skipped: request budget exhausted")
+            return self._get_fallback_sentiment(), True
+        except Exception as e:
+            logger.error(f"❌ Error analyzing sentiment: {str(e)}")
+            result = None
+        
+        if result is None:
+            # Fallbacks are not cached so the next attempt can succeed
+            return self._get_fallback_sentiment(), False
+        
+        logger.debug(f"💭 Sentiment: {result['label']} (score: {result['score']:.2f})")
+        self.cache.set(key, result)
+        if self.disk_cache is not None:
+            self.disk_cache.set(key, result)
+        return dict(result), False
+    
+    def analyze_many(self, messages: List[str]) -> List[Optional[Dict]]:
+        """
+        Classify a list of messages (offline/bulk use, no deadline)
 
-Customer Message: "{message}"
+        Cached messages are answered from the cache; the rest are sent in
+        batches of SENTIMENT_BATCH_MAX per model call.
 
-Analyze and return ONLY a JSON object (no markdown, no explanations) with this EXACT structure:
-{{
-  "score": <float between 0.0 and 1.0, where 0=very negative, 0.5=neutral, 1=very positive>,
-  "label": "<one of: positive, neutral, negative, frustrated, urgent>",
-  "emotion": "<primary emotion: happy, satisfied, neutral, confused, disappointed, angry, frustrated, anxious, urgent>",
-  "confidence": <float between 0.0 and 1.0 indicating classification confidence>
-}}
+        Args:
+            messages: Customer message texts
 
-Rules:
-- "frustrated" = customer is annoyed or impatient, showing irritation
-- "urgent" = customer needs immediate help or expresses time pressure
-- "negative" = unhappy but not yet frustrated
-- "neutral" = factual inquiry without strong emotion
-- "positive" = satisfied or happy tone
+        Returns:
+            Sentiment dicts in input order, None where classification failed
+        """
+        results: List[Optional[Dict]] = [None] * len(messages)
+        misses = []
+        for i, message in enumerate(messages):
+            results[i] = self._cache_lookup(self.cache_key(message))
+            if results[i] is None:
+                misses.append(i)
 
-JSON output:"""
+        size = max(1, Config.SENTIMENT_BATCH_MAX)
+        for start in range(0, len(misses), size):
+            chunk = misses[start:start + size]
+            for i, result in zip(chunk, self._analyze_batch([messages[i] for i in chunk])):
+                if result is None:
+                    continue
+                key = self.cache_key(messages[i])
+                self.cache.set(key, result)
+                if self.disk_cache is not None:
+                    self.disk_cache.set(key, result)
+                results[i] = dict(result)
+        return results
+
+    def _analyze_one(self, message: str) -> Optional[Dict]:
+        """Classify a single message; None if the model call or parsing failed"""
+        try:
+            # Build per-request prompt (static instructions are the system prefix)
+            _, prompt = assemble(SENTIMENT_SYSTEM_INSTRUCTION, build_sentiment_suffix(message))
             
             # Generate response
-            response = self.model.generate_content(
-                prompt
-            )
+            with span("sentiment.llm"):
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=self.generation_config
+                )
             
             # Parse JSON from response
-            result = self._parse_sentiment_json(response.text)
+            with span("sentiment.parse"):
+                return self._parse_sentiment_json(response.text)
             
-            logger.debug(f"💭 Sentiment: {result['label']} (score: {result['score']:.2f})")
+        except Exception as e:
+            SENTIMENT_PARSE.inc("model_error")
+            logger.error(f"❌ Error analyzing sentiment: {str(e)}")
+            return None
+    
+    def _analyze_batch(self, messages: List[str]) -> List[Optional[Dict]]:
+        """
+        Classify several messages with one Gemini call
+        
+        Messages whose item could not be used (or the whole batch, if the
+        array is unusable) are retried one by one.
+        """
+        if len(messages) == 1:
+            return [self._analyze_one(messages[0])]
+        
+        results: List[Optional[Dict]] = [None] * len(messages)
+        try:
+            _, prompt = assemble(SENTIMENT_SYSTEM_INSTRUCTION, build_sentiment_batch_suffix(messages))
+            generation_config = None
+            if Config.SENTIMENT_JSON_MODE:
+                generation_config = json_generation_config(
+                    SENTIMENT_BATCH_SCHEMA,
+                    max_output_tokens=Config.SENTIMENT_MAX_OUTPUT_TOKENS * len(messages)
+                )
             
-            return result
+            with span("sentiment.llm"):
+                response = self.model.generate_content(prompt, generation_config=generation_config)
             
+            with span("sentiment.parse"):
+                parsed = parse_sentiment_batch(response.text, len(messages))
+            for i, (result, outcome) in enumerate(parsed):
+                SENTIMENT_PARSE.inc(outcome)
+                results[i] = result
+                
+        except SentimentParseError as e:
+            SENTIMENT_PARSE.inc(e.failure_class)
+            logger.error(f"Error parsing sentiment batch ({e.failure_class}): {str(e)}")
         except Exception as e:
-            logger.error(f"❌ Error analyzing sentiment: {str(e)}")
-            # Return neutral sentiment as fallback
-            return self._get_fallback_sentiment()
+            SENTIMENT_PARSE.inc("model_error")
+            logger.error(f"❌ Error analyzing sentiment batch: {str(e)}")
+        
+        return [
+            result if result is not None else self._analyze_one(message)
+            for message, result in zip(messages, results)
+        ]
+    
+    @staticmethod
+    def cache_key(message: str) -> str:
+        """Cache key: model name plus normalized message text"""
+        return cache_key(Config.GEMINI_MODEL, normalize_text(message))
+    
+    def _cache_lookup(self, key: str) -> Optional[Dict]:
+        """Check memory, then the shared disk store; records hit metrics"""
+        result = self.cache.get(key)
+        outcome = "memory"
+        if result is None and self.disk_cache is not None:
+            result = self.disk_cache.get(key)
+            outcome = "disk"
+            if result is not None:
+                self.cache.set(key, result)
+        if result is None:
+            outcome = "miss"
+        
+        with self._stats_lock:
+            self._lookups += 1
+            self._hits += outcome != "miss"
+            hit_ratio = self._hits / self._lookups
+        SENTIMENT_CACHE.inc(outcome)
+        SENTIMENT_CACHE_HIT_RATIO.set(hit_ratio)
+        return dict(result) if result is not None else None
+    
+    def cache_stats(self) -> Dict:
+        """Cache size and hit ratio (memory and disk hits combined)"""
+        stats = self.cache.stats()
+        with self._stats_lock:
+            hits, lookups = self._hits, self._lookups
+        stats["hit_ratio"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["disk"] = str(self.disk_cache.path) if self.disk_cache is not None else None
+        return stats
+    
+    def warm_up(self) -> None:
+        """Issue a tiny generation to establish the Gemini connection"""
+        self.model.generate_content("Reply with OK.")
+        logger.info("🔥 SentimentAnalyzer warmed up")
     
     def _parse_sentiment_json(self, response_text: str) -> Dict:
         """
         Parse JSON from Gemini response
-        Handles various response formats (with or without markdown)
+        Counts every outcome in SENTIMENT_PARSE by failure class
+        
+        Returns:
+            Sentiment dict, or None if the response could not be parsed
         """
         try:
-            # Clean the response
-            text = response_text.strip()
-            
-            # Remove markdown code blocks if present
-            if text.startswith("```"):
-                # Find the JSON content between backticks
-                parts = text.split("```")
-                for part in parts:
-                    part = part.strip()
-                    if part.startswith("json"):
-                        part = part[4:].strip()
-                    if part.startswith("{"):
-                        text = part
-                        break
-            
-            # Parse JSON
-            result = json.loads(text)
-            
-            # Validate structure
-            required_keys = ['score', 'label', 'emotion', 'confidence']
-            if not all(key in result for key in required_keys):
-                raise ValueError("Missing required keys in sentiment response")
-            
-            # Validate values
-            result['score'] = max(0.0, min(1.0, float(result['score'])))
-            result['confidence'] = max(0.0, min(1.0, float(result['confidence'])))
-            
-            valid_labels = ['positive', 'neutral', 'negative', 'frustrated', 'urgent']
-            if result['label'] not in valid_labels:
-                result['label'] = 'neutral'
-            
+            result, outcome = parse_sentiment(response_text)
+            SENTIMENT_PARSE.inc(outcome)
             return result
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {str(e)}")
-            logger.error(f"Response text: {response_text}")
-            return self._get_fallback_sentiment()
-        except Exception as e:
-            logger.error(f"Error parsing sentiment: {str(e)}")
-            return self._get_fallback_sentiment()
+        except SentimentParseError as e:
+            SENTIMENT_PARSE.inc(e.failure_class)
+            logger.error(f"Error parsing sentiment ({e.failure_class}): {str(e)}")
+            logger.debug(f"Response text: {response_text}")
+            return None
     
     def _get_fallback_sentiment(self) -> Dict:
         """Return neutral sentiment when analysis fails"""
@@ -183,6 +514,49 @@ JSON output:"""
             return ("Maintain a professional, helpful, and friendly tone. "
                    "Be clear and informative.")
     
+    def get_tone_template(self, sentiment: Dict) -> Dict:
+        """
+        Customer-facing opening and closing lines for answers written without
+        the LLM (the tones of get_tone_instruction)
+        
+        Args:
+            sentiment: Sentiment analysis result
+            
+        Returns:
+            Dictionary with opening and closing
+        """
+        label = sentiment['label']
+        
+        if label == "frustrated":
+            return {
+                "opening": "I'm sorry for the trouble, and I understand how frustrating this is. Here's what applies:",
+                "closing": "If this doesn't solve it, reply here and we'll sort it out right away."
+            }
+        
+        elif label == "urgent":
+            return {
+                "opening": "Here's what you need to know right away:",
+                "closing": "Reply here if you need anything else and we'll prioritize it."
+            }
+        
+        elif label == "negative":
+            return {
+                "opening": "I'm sorry about your experience. Here's how we can help:",
+                "closing": "We're here if there's anything else we can do to make it right."
+            }
+        
+        elif label == "positive":
+            return {
+                "opening": "Great question! Here's the answer:",
+                "closing": "Happy to help with anything else!"
+            }
+        
+        else:  # neutral
+            return {
+                "opening": "Here's what our help center says:",
+                "closing": "Let me know if you have any other questions."
+            }
+    
     def is_high_priority(self, sentiment: Dict) -> bool:
         """
         Determine if message should be high priority
@@ -199,6 +573,7 @@ JSON output:"""
 # Test function
 if __name__ == "__main__":
     """Test the sentiment analyzer"""
+    Config.load()
     analyzer = SentimentAnalyzer()
     
     # Test messages with different sentiments
@@ -3,11 +3,16 @@ SentiFlow Flask Application
 REST API for customer sentiment intelligence platform
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, g
 from flask_cors import CORS
+import atexit
+import hmac
 import logging
+import threading
+import time
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Optional
 import sys
 import os
 
@@ -15,8 +20,17 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from agents.generator import ResponseGenerator
+from agents.retriever import HybridRetriever
 from agents.sentiment import SentimentAnalyzer
 from utils.elastic_client import ElasticClient
+from utils.embeddings import build_embedding_provider
+from utils.deadline import deadline_scope, stage_timeout
+from utils.events import EventLog
+from utils.ingest_jobs import IngestJobRunner, JobRejected
+from utils.lifecycle import Lifecycle
+from utils.metrics import REGISTRY, span, start_trace, end_trace
+from utils.scheduler import HIGH, NORMAL, PRIORITY_NAMES, Overloaded, PriorityScheduler
+from utils.tenants import InvalidTenant, TenantPool, UnknownTenant, normalize_tenant_id, tenant_index_name
 from config import Config
 
 # Configure logging
@@ -34,6 +48,19 @@ CORS(app)
 response_generator = None
 sentiment_analyzer = None
 es_client = None
+lifecycle = Lifecycle()
+scheduler = PriorityScheduler.from_config(Config)
+tenant_template_ready = False
+index_watcher = None
+event_log = None
+ingest_jobs = None
+
+# HTTP request metrics
+HTTP_LATENCY = REGISTRY.histogram(
+    "sentiflow_http_request_duration_seconds",
+    "HTTP request latency by endpoint and status",
+    ("endpoint", "status")
+)
 
 # Analytics storage (in-memory for demo, use database in production)
 analytics_data = {
@@ -49,21 +76,238 @@ analytics_data = {
 }
 
 
-@app.before_request
-def initialize_components():
-    """Initialize AI components on first request (lazy loading)"""
-    global response_generator, sentiment_analyzer, es_client
+def startup(
+    warm_up: bool = None,
+    components: Optional[Dict[str, Callable[[], Any]]] = None,
+    model_factory: Optional[Callable[..., Any]] = None
+) -> bool:
+    """
+    Create and warm all AI components before the server accepts traffic
+    
+    Phases:
+    1. import: load heavy SDKs (timed individually)
+    2. init: Elasticsearch client, sentiment model and embedding model in parallel
+    3. warmup: dummy embedding + ES search, dummy generations in parallel
+    
+    Args:
+        warm_up: Run the warm-up phase (defaults to Config.STARTUP_WARMUP)
+        components: Optional factories replacing the default init components
+            by name ("elasticsearch", "sentiment_analyzer", "embedder")
+        model_factory: Optional generative model factory for the response generator
+        
+    Returns:
+        bool: True if the service is ready
+    """
+    global response_generator, sentiment_analyzer, es_client, lifecycle, scheduler, tenant_generators, event_log, ingest_jobs
+    
+    Config.load()
+    lifecycle = Lifecycle(max_workers=Config.STARTUP_WORKERS)
+    scheduler = PriorityScheduler.from_config(Config)
+    tenant_generators = TenantPool(build_tenant_generator, max_tenants=Config.TENANT_POOL_SIZE)
+    if event_log is None:
+        try:
+            event_log = EventLog.from_config(Config)
+            if event_log is not None:
+                atexit.register(event_log.close)
+        except Exception as e:
+            # Analytics persistence is optional; serving is not blocked by it
+            logger.error(f"❌ Event log unavailable: {str(e)}")
+    if warm_up is None:
+        warm_up = Config.STARTUP_WARMUP
+    
+    logger.info("🚀 Initializing SentiFlow components...")
+    lifecycle.import_modules([
+        "vertexai",
+        "vertexai.generative_models",
+        "vertexai.language_models",
+        "elasticsearch"
+    ])
+    
+    factories = {
+        "elasticsearch": ElasticClient,
+        "sentiment_analyzer": SentimentAnalyzer,
+        "embedder": build_embedding_provider
+    }
+    factories.update(components or {})
+    created = lifecycle.run_parallel("init", factories)
+    
+    missing = [name for name, component in created.items() if component is None]
+    if missing:
+        lifecycle.mark_failed(f"Failed to initialize: {', '.join(missing)}")
+        return False
+    
+    try:
+        # Query shapes live server-side; searches only send their params
+        created["elasticsearch"].put_search_templates()
+        retriever = HybridRetriever(
+            embedder=created["embedder"],
+            es_client=created["elasticsearch"]
+        )
+        generator = ResponseGenerator(
+            retriever=retriever,
+            sentiment_analyzer=created["sentiment_analyzer"],
+            model_factory=model_factory
+        )
+    except Exception as e:
+        lifecycle.mark_failed(str(e))
+        return False
+    
+    if warm_up:
+        # Warm-up failures are recorded but do not block readiness
+        lifecycle.run_parallel("warmup", {
+            "retrieval": retriever.warm_up,
+            "sentiment": created["sentiment_analyzer"].warm_up,
+            "generation": generator.warm_up
+        })
     
-    if response_generator is None:
+    es_client = created["elasticsearch"]
+    sentiment_analyzer = created["sentiment_analyzer"]
+    response_generator = generator
+    start_index_watcher()
+    if ingest_jobs is None and Config.INGEST_API_TOKEN:
         try:
-            logger.info("🚀 Initializing SentiFlow components...")
-            response_generator = ResponseGenerator()
-            sentiment_analyzer = SentimentAnalyzer()
-            es_client = ElasticClient()
-            logger.info("✅ All components initialized successfully")
+            ingest_jobs = IngestJobRunner.from_config(
+                Config,
+                build_tenant_ingestor,
+                on_finished=refresh_knowledge_base
+            )
+            atexit.register(ingest_jobs.close)
         except Exception as e:
-            logger.error(f"❌ Failed to initialize components: {str(e)}")
-            # Don't raise - let individual endpoints handle missing components
+            # Chat serving does not depend on the ingestion API
+            logger.error(f"❌ Ingestion job runner unavailable: {str(e)}")
+    lifecycle.mark_ready()
+    logger.info("✅ All components initialized successfully")
+    return True
+
+
+def build_tenant_generator(tenant_id: str) -> ResponseGenerator:
+    """
+    Generator for a tenant's existing knowledge base
+    
+    Serving never creates indexes: a tenant must be in TENANT_ALLOWLIST or
+    already have an index (created by ingestion).
+    
+    Raises:
+        UnknownTenant: if neither is the case
+    """
+    client = es_client.for_index(tenant_index_name(tenant_id))
+    if tenant_id not in Config.TENANT_ALLOWLIST and not client.alias_targets():
+        raise UnknownTenant(f"Unknown tenant: {tenant_id}")
+    retriever = response_generator.retriever.for_es_client(client)
+    generator = response_generator.for_retriever(retriever)
+    generator.sync_index_generation()
+    return generator
+
+
+def watch_index_generations() -> None:
+    """Drop answer caches of knowledge bases whose alias was swapped (blue/green rebuild)"""
+    while True:
+        time.sleep(Config.INDEX_WATCH_INTERVAL_S)
+        generators = [response_generator] + [generator for _, generator in tenant_generators.items()]
+        for generator in generators:
+            try:
+                generator.sync_index_generation()
+            except Exception as e:
+                logger.warning(f"⚠️ Index generation check failed: {str(e)}")
+
+
+def start_index_watcher() -> None:
+    """Record the serving index generation and start polling it"""
+    global index_watcher
+    
+    try:
+        response_generator.sync_index_generation()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read the serving index generation: {str(e)}")
+    if Config.INDEX_WATCH_INTERVAL_S > 0 and index_watcher is None:
+        index_watcher = threading.Thread(target=watch_index_generations, name="index-watcher", daemon=True)
+        index_watcher.start()
+
+
+tenant_generators = TenantPool(build_tenant_generator, max_tenants=Config.TENANT_POOL_SIZE)
+
+
+def provision_tenant_index(tenant_id: str) -> None:
+    """Create a tenant's index from the index template (authenticated ingest path only)"""
+    global tenant_template_ready
+    
+    if tenant_id == Config.DEFAULT_TENANT:
+        return
+    if not tenant_template_ready:
+        es_client.put_tenant_template()
+        tenant_template_ready = True
+    es_client.for_index(tenant_index_name(tenant_id)).ensure_index()
+
+
+def build_tenant_ingestor(tenant_id: str):
+    """DocumentIngestor writing to a tenant's knowledge base (shares the embedding provider)"""
+    from pipelines.ingest import DocumentIngestor
+    
+    provision_tenant_index(tenant_id)
+    retriever = generator_for(tenant_id).retriever
+    return DocumentIngestor(embedder=retriever.embedder, es_client=retriever.es_client)
+
+
+def refresh_knowledge_base(job: Dict) -> None:
+    """Drop answers cached from a knowledge base an ingestion job changed"""
+    if job["status"] not in ("succeeded", "cancelled"):
+        return
+    generator = generator_for(job["tenant"])
+    if job["mode"] == "rebuild":
+        # The alias moved: same path as the index watcher, without waiting for it
+        generator.sync_index_generation()
+    else:
+        generator.answer_cache.clear()
+        logger.info(f"♻️  {generator.retriever.es_client.index_name} updated by ingestion job {job['job_id']}; answer cache cleared")
+
+
+def generator_for(tenant_id: str) -> ResponseGenerator:
+    """
+    ResponseGenerator serving a tenant's knowledge base
+    
+    Raises:
+        UnknownTenant: for tenants that are not allow-listed and have no index
+    """
+    if tenant_id == Config.DEFAULT_TENANT:
+        return response_generator
+    return tenant_generators.get(tenant_id)
+
+
+def request_tenant(data: Dict = None) -> str:
+    """Tenant from the X-Tenant-ID header or a tenant_id body field"""
+    return normalize_tenant_id(
+        request.headers.get('X-Tenant-ID') or (data or {}).get('tenant_id')
+    )
+
+
+@app.before_request
+def start_request_timer():
+    """Record request start time for latency metrics"""
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_latency(response):
+    """Observe request latency (API endpoints only)"""
+    start = getattr(g, 'request_start', None)
+    if start is not None and request.path.startswith('/api/'):
+        HTTP_LATENCY.observe(
+            time.perf_counter() - start,
+            request.endpoint or 'unknown',
+            response.status_code
+        )
+    return response
+
+
+def create_app() -> Flask:
+    """
+    WSGI factory that finishes startup before returning the app
+    
+    Usage:
+        gunicorn 'app:create_app()'
+    """
+    startup()
+    return app
 
 
 @app.route('/')
@@ -92,6 +336,19 @@ def health_check():
     })
 
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 200 once startup and warm-up have finished"""
+    status = lifecycle.status()
+    return jsonify(status), (200 if lifecycle.is_ready else 503)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """
@@ -100,7 +357,9 @@ def chat():
     Request body:
     {
         "message": "User's question",
-        "conversation_id": "optional-conversation-id"
+        "conversation_id": "optional-conversation-id",
+        "tenant_id": "optional-tenant" (or X-Tenant-ID header; default tenant if absent),
+        "debug": false  (optional; also ?debug=1)
     }
     
     Response:
@@ -108,9 +367,16 @@ def chat():
         "response": "AI response",
         "sentiment": {...},
         "context": {...},
-        "timestamp": "..."
+        "tenant": "default",
+        "priority": "high" | "normal",
+        "degradations": [],  (e.g. ["sentiment_skipped", "retrieval_only"])
+        "extractive": false,  (true: quoted from the knowledge base, no Gemini call)
+        "faq": false,  (true: precomputed answer for a frequent question)
+        "timestamp": "...",
+        "debug": {"spans": [...]}  (only when debug is set)
     }
     """
+    trace = None
     try:
         # Validate request
         data = request.get_json()
@@ -129,18 +395,60 @@ def chat():
         
         logger.info(f"💬 Received chat message: '{user_message[:50]}...'")
         
+        # Collect per-stage spans for this request when debugging
+        if data.get('debug') or request.args.get('debug'):
+            trace = start_trace()
+        
         # Check if components are initialized
         if response_generator is None:
             return jsonify({
                 "error": "Service initializing, please try again"
             }), 503
         
-        # Generate response
-        result = response_generator.generate(
-            query=user_message,
-            retrieve_context=True,
-            k=3
-        )
+        # Route to the tenant's knowledge base
+        try:
+            tenant_id = request_tenant(data)
+            generator = generator_for(tenant_id)
+        except InvalidTenant as e:
+            return jsonify({
+                "error": str(e)
+            }), 400
+        except UnknownTenant as e:
+            return jsonify({
+                "error": str(e)
+            }), 404
+        
+        # The whole answer shares one time budget
+        with deadline_scope(Config.REQUEST_DEADLINE_MS / 1000):
+            # Classify first so at-risk customers are scheduled ahead of routine traffic
+            analyzer = generator.sentiment_analyzer
+            with span("generate.sentiment"):
+                sentiment_data, sentiment_skipped = analyzer.analyze_with_deadline(user_message)
+            priority = HIGH if analyzer.is_high_priority(sentiment_data) else NORMAL
+            
+            # Frequent questions are answered from the precomputed FAQ table
+            result = generator.answer_from_faq(user_message, sentiment_data)
+            
+            # Generate response (retrieval-only answer if shed under overload)
+            if result is None:
+                slot_timeout = stage_timeout(reserve=Config.GENERATION_MIN_BUDGET_MS / 1000)
+                try:
+                    # An identical question already running is joined without taking a slot
+                    joining = generator.is_generating(user_message, sentiment_data, k=3)
+                    with nullcontext() if joining else scheduler.slot(priority, timeout=slot_timeout):
+                        result = generator.generate(
+                            query=user_message,
+                            retrieve_context=True,
+                            k=3,
+                            sentiment_data=sentiment_data
+                        )
+                except Overloaded as e:
+                    logger.warning(f"🚦 {str(e)}")
+                    result = generator.generate_retrieval_only(user_message, sentiment_data, k=3)
+        
+        degradations = result.get('metadata', {}).get('degradations', [])
+        if sentiment_skipped:
+            degradations = ["sentiment_skipped"] + degradations
         
         # Update analytics
         analytics_data["total_queries"] += 1
@@ -160,22 +468,54 @@ def chat():
             analytics_data["recent_queries"].pop(0)
         
         # Build response
+        sources = [
+            {
+                "title": doc.get('title', 'Untitled'),
+                "source": doc.get('source', 'Unknown')
+            }
+            for doc in result.get('context', {}).get('documents', [])
+        ]
         response = {
             "response": result.get('response', 'Unable to generate response'),
             "sentiment": result.get('sentiment', {"label": "neutral", "score": 0.5, "emotion": "unknown", "confidence": 0}),
             "context": {
                 "num_documents": result.get('context', {}).get('num_documents', 0),
-                "sources": [
-                    {
-                        "title": doc.get('title', 'Untitled'),
-                        "source": doc.get('source', 'Unknown')
-                    }
-                    for doc in result.get('context', {}).get('documents', [])
-                ]
+                "sources": sources
             },
+            "usage": result.get('metadata', {}).get('usage', {}),
+            "tenant": tenant_id,
+            "priority": PRIORITY_NAMES[priority],
+            "degradations": degradations,
+            "extractive": result.get('metadata', {}).get('extractive', False),
+            "faq": result.get('metadata', {}).get('faq') is not None,
             "timestamp": datetime.utcnow().isoformat()
         }
         
+        if trace is not None:
+            response["debug"] = {"spans": trace}
+        
+        # Persist the conversation turn (queued; written by the background writer)
+        if event_log is not None:
+            sentiment = response["sentiment"]
+            event_log.emit(
+                "chat",
+                tenant=tenant_id,
+                query=user_message,
+                response=response["response"],
+                sentiment_label=sentiment.get('label'),
+                sentiment_score=sentiment.get('score'),
+                emotion=sentiment.get('emotion'),
+                priority=response["priority"],
+                latency_ms=round((time.perf_counter() - g.request_start) * 1000, 1),
+                sources=sources,
+                degradations=degradations,
+                usage=response["usage"],
+                model=result.get('metadata', {}).get('model'),
+                extractive=response["extractive"],
+                faq=response["faq"],
+                routing=result.get('metadata', {}).get('routing')
+            )
+        
         logger.info(f"✅ Response generated successfully")
         
         return jsonify(response)
@@ -186,6 +526,9 @@ def chat():
             "error": "Internal server error",
             "message": str(e)
         }), 500
+    finally:
+        if trace is not None:
+            end_trace()
 
 
 @app.route('/api/sentiment', methods=['POST'])
@@ -248,7 +591,12 @@ def analytics_overview():
     {
         "total_queries": 123,
         "sentiment_distribution": {...},
-        "avg_sentiment_score": 0.75
+        "avg_sentiment_score": 0.75,
+        "sentiment_cache": {"size": 42, "hit_ratio": 0.61, ...},
+        "event_log": {"sink": "jsonl", "queued": 0, "written": 120, "dropped": 0, ...},
+        "singleflight": {"generate": {"followers": 310, "top_keys": [...], ...}, ...},
+        "faq": {"table": {"intents": 300, "entries": 540, ...}, "serving": true, ...},
+        "ingest_jobs": {"max_concurrent": 1, "jobs": {"running": 1, "succeeded": 4}, ...}
     }
     """
     try:
@@ -267,6 +615,11 @@ def analytics_overview():
             "total_queries": total,
             "sentiment_distribution": analytics_data["sentiment_distribution"],
             "avg_sentiment_score": round(avg_score, 2),
+            "sentiment_cache": sentiment_analyzer.cache_stats() if sentiment_analyzer else None,
+            "event_log": event_log.stats() if event_log else None,
+            "singleflight": response_generator.flight_stats() if response_generator else None,
+            "faq": response_generator.faq.stats() if response_generator and response_generator.faq else None,
+            "ingest_jobs": ingest_jobs.stats() if ingest_jobs else None,
             "timestamp": datetime.utcnow().isoformat()
         })
         
@@ -310,12 +663,153 @@ def analytics_recent():
         }), 500
 
 
+def ingest_access_error():
+    """Error response unless the request carries INGEST_API_TOKEN (None if allowed)"""
+    if not Config.INGEST_API_TOKEN:
+        return jsonify({
+            "error": "Ingestion API disabled (set INGEST_API_TOKEN)"
+        }), 403
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {Config.INGEST_API_TOKEN}".encode()):
+        return jsonify({
+            "error": "Invalid or missing ingestion API token"
+        }), 401
+    if ingest_jobs is None:
+        return jsonify({
+            "error": "Service initializing, please try again"
+        }), 503
+    return None
+
+
+@app.route('/api/ingest', methods=['POST'])
+def submit_ingest_job():
+    """
+    Start a background ingestion job
+    
+    Headers: Authorization: Bearer <INGEST_API_TOKEN>, optional X-Tenant-ID
+    
+    Request body (one of folder / documents):
+    {
+        "folder": "kb/help-center"  (below INGEST_ROOT),
+        "documents": [{"name": "returns.md", "content": "..."},
+                      {"name": "manual.pdf", "content_base64": "..."}],
+        "mode": "update" | "rebuild"  (default update: add chunks to the serving
+                                       index; rebuild: blue/green replace it),
+        "category": "knowledge_base",
+        "pattern": "*.html"  (optional; default every supported format)
+    }
+    
+    Response (202): the job, polled at /api/ingest/<job_id>
+    """
+    denied = ingest_access_error()
+    if denied is not None:
+        return denied
+    try:
+        max_upload_bytes = Config.INGEST_UPLOAD_MAX_MB * 1024 * 1024
+        # Base64 and JSON escaping grow documents by about a third
+        if (request.content_length or 0) > max_upload_bytes * 1.5:
+            return jsonify({
+                "error": f"Request exceeds {Config.INGEST_UPLOAD_MAX_MB} MB of documents"
+            }), 413
+        
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({
+                "error": "Request body must be a JSON object"
+            }), 400
+        
+        job = ingest_jobs.submit(request_tenant(data), data, max_upload_bytes)
+        return jsonify(job), 202, {"Location": f"/api/ingest/{job['job_id']}"}
+        
+    except (InvalidTenant, ValueError) as e:
+        return jsonify({
+            "error": str(e)
+        }), 400
+    except JobRejected as e:
+        return jsonify({
+            "error": str(e)
+        }), 429
+    except Exception as e:
+        logger.error(f"❌ Error submitting ingestion job: {str(e)}")
+        return jsonify({
+            "error": "Internal server error"
+        }), 500
+
+
+@app.route('/api/ingest', methods=['GET'])
+def list_ingest_jobs():
+    """Recent ingestion jobs, newest first (?limit=20; X-Tenant-ID filters by tenant)"""
+    denied = ingest_access_error()
+    if denied is not None:
+        return denied
+    try:
+        tenant = request.headers.get('X-Tenant-ID')
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        jobs = ingest_jobs.recent(normalize_tenant_id(tenant) if tenant else None, limit=limit)
+        return jsonify({
+            "jobs": jobs,
+            "count": len(jobs),
+            "runner": ingest_jobs.stats()
+        })
+        
+    except InvalidTenant as e:
+        return jsonify({
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"❌ Error listing ingestion jobs: {str(e)}")
+        return jsonify({
+            "error": "Internal server error"
+        }), 500
+
+
+@app.route('/api/ingest/<job_id>', methods=['GET'])
+def get_ingest_job(job_id):
+    """
+    Ingestion job status and progress
+    
+    Response:
+    {
+        "job_id": "...",
+        "status": "queued" | "running" | "succeeded" | "failed" | "cancelled" | "interrupted",
+        "progress": {"files_done": 12, "files_total": 40, "percent": 30.0, "chunks": 210,
+                     "embeddings": 35, "embeddings_per_s": 14.2, "chunks_per_s": 85.1,
+                     "bulk_errors": 0, "failed_files": 0, "file": "returns.md", ...},
+        "result": {...}  (ingestion or rebuild statistics once finished),
+        "error": null
+    }
+    """
+    denied = ingest_access_error()
+    if denied is not None:
+        return denied
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            "error": "Ingestion job not found"
+        }), 404
+    return jsonify(job)
+
+
+@app.route('/api/ingest/<job_id>', methods=['DELETE'])
+def cancel_ingest_job(job_id):
+    """Cancel an ingestion job (queued: never starts; running: stops before its next file)"""
+    denied = ingest_access_error()
+    if denied is not None:
+        return denied
+    job = ingest_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({
+            "error": "Ingestion job not found"
+        }), 404
+    return jsonify(job), 202
+
+
 @app.route('/api/reset', methods=['POST'])
 def reset_conversation():
-    """Reset conversation history"""
+    """Reset conversation history (of the X-Tenant-ID tenant, if given)"""
     try:
         if response_generator:
-            response_generator.reset_conversation()
+            generator_for(request_tenant(request.get_json(silent=True))).reset_conversation()
             return jsonify({
                 "message": "Conversation reset successfully"
             })
@@ -324,6 +818,14 @@ def reset_conversation():
                 "error": "Service not initialized"
             }), 503
             
+    except InvalidTenant as e:
+        return jsonify({
+            "error": str(e)
+        }), 400
+    except UnknownTenant as e:
+        return jsonify({
+            "error": str(e)
+        }), 404
     except Exception as e:
         logger.error(f"❌ Error resetting conversation: {str(e)}")
         return jsonify({
@@ -352,6 +854,9 @@ if __name__ == '__main__':
     """Run the Flask application"""
     port = int(os.environ.get('PORT', 8080))
     
+    # Initialize and warm components before accepting traffic
+    startup()
+    
     logger.info(f"🚀 Starting SentiFlow on port {port}")
     logger.info(f"📍 Main interface: http://localhost:{port}/")
     logger.info(f"📊 Analytics dashboard: http://localhost:{port}/dashboard")
@@ -0,0 +1,133 @@
+"""
+Embedding Dimension Benchmark
+Ingests the sample documents at several EMBEDDING_DIMENSIONS settings and
+reports retrieval agreement with the first (full-size) setting, scoring cost,
+vector memory and ingestion payload per dimension
+
+Usage:
+    python benchmarks/embedding_dims.py --dims 768,256,128
+"""
+
+import argparse
+import json
+import logging
+import sys
+import os
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run_benchmarks import QUERIES, Stack, percentile
+from benchmarks.vector_quantization import vector_memory_bytes
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_OUTPUT = BACKEND_DIR / "benchmarks" / "results" / "embedding_dims.json"
+
+# (label, semantic_weight, keyword_weight)
+MODES = [("hybrid", 0.6, 0.4), ("semantic", 1.0, 0.0)]
+
+
+def overlap(found: List[str], reference: List[str]) -> float:
+    return len(set(found) & set(reference)) / len(reference) if reference else 1.0
+
+
+def measure(dims: int, k: int, repeat: int, seed: int, chunk_words: int) -> Dict:
+    """Build an index at `dims` and run every query in each search mode"""
+    from config import Config
+
+    Config.EMBEDDING_DIMENSIONS = dims
+    stack = Stack("zero", 0.0, seed)
+    # Small chunks so the five sample documents give a corpus worth ranking
+    ingestor = stack.ingestor
+    ingestor.chunk_text = lambda text: type(ingestor).chunk_text(
+        ingestor, text, chunk_size=chunk_words, overlap=chunk_words // 5
+    )
+    stack.seed_index()
+
+    rankings = {}
+    latencies = []
+    for label, semantic_weight, keyword_weight in MODES:
+        rankings[label] = []
+        for query in QUERIES:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                results = stack.retriever.retrieve(
+                    query, k=k, semantic_weight=semantic_weight, keyword_weight=keyword_weight
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+            rankings[label].append([doc.get("title") for doc in results])
+
+    stored = [doc["_source"] for doc in stack.es.indexes[Config.ELASTIC_INDEX_NAME]]
+    payload = sum(len(json.dumps(doc["embedding"])) for doc in stored) / len(stored)
+    latencies.sort()
+    return {
+        "rankings": rankings,
+        "retrieve_ms": {"p50": round(percentile(latencies, 50), 3),
+                        "p95": round(percentile(latencies, 95), 3)},
+        "payload_bytes_per_vector": round(payload),
+        "memory_per_million_vectors": vector_memory_bytes(1_000_000, dims),
+        "chunks": len(stored),
+    }
+
+
+def main(argv=None) -> Dict:
+    parser = argparse.ArgumentParser(description="Retrieval quality vs. embedding size")
+    parser.add_argument("--dims", default="768,256,128",
+                        help="Comma-separated sizes; the first is the quality reference")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--chunk-words", type=int, default=40, help="Words per indexed chunk")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Results JSON path")
+    parser.add_argument("--verbose", action="store_true", help="Keep component INFO logging")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    from config import Config
+    Config.MICRO_BATCHING = False
+
+    sizes = [int(size) for size in args.dims.split(",") if size.strip()]
+    runs = {dims: measure(dims, args.k, args.repeat, args.seed, args.chunk_words) for dims in sizes}
+    reference = runs[sizes[0]]["rankings"]
+
+    results = {"meta": {"k": args.k, "reference_dims": sizes[0], "queries": len(QUERIES)}, "dims": {}}
+    print(f"▶️  {len(QUERIES)} queries, k={args.k}, reference = {sizes[0]} dims")
+    for dims in sizes:
+        run = runs[dims]
+        agreement = {
+            label: round(sum(
+                overlap(found, ref) for found, ref in zip(run["rankings"][label], reference[label])
+            ) / len(QUERIES), 4)
+            for label, _, _ in MODES
+        }
+        top1 = round(sum(
+            found[:1] == ref[:1] for found, ref in zip(run["rankings"]["semantic"], reference["semantic"])
+        ) / len(QUERIES), 4)
+        results["dims"][str(dims)] = {
+            f"overlap_at_{args.k}": agreement,
+            "semantic_top1_agreement": top1,
+            "retrieve_ms": run["retrieve_ms"],
+            "payload_bytes_per_vector": run["payload_bytes_per_vector"],
+            "memory_per_million_vectors": run["memory_per_million_vectors"],
+            "chunks": run["chunks"],
+        }
+        memory = run["memory_per_million_vectors"]
+        print(f"   {dims:>4} dims  overlap hybrid={agreement['hybrid']:.2f} "
+              f"semantic={agreement['semantic']:.2f} top1={top1:.2f}  retrieve p50={run['retrieve_ms']['p50']:.2f}ms  "
+              f"payload={run['payload_bytes_per_vector']}B  "
+              f"memory/1M={memory['float'] / 2**30:.2f} GiB (int8 {memory['int8_hnsw'] / 2**30:.2f})")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\n💾 Results written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
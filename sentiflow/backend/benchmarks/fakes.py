@@ -0,0 +1,561 @@
+"""
+Offline Stand-ins for Gemini, Vertex AI Embeddings and Elasticsearch
+Deterministic fakes with configurable latency distributions, used by the
+benchmark harness to measure SentiFlow without cloud credentials
+"""
+
+import fnmatch
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i i'm in is it my of on or "
+    "our so that the this to was what when where which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase content-word tokens (shared by fake embeddings and fake BM25)"""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough model token count (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+class LatencyModel:
+    """
+    Log-normal latency distribution with a deterministic seed
+
+    median_ms is the 50th percentile; sigma controls the tail
+    (sigma=0 gives a fixed latency). per_item_ms is added per batch item.
+    """
+
+    def __init__(self, median_ms: float = 0.0, sigma: float = 0.0,
+                 per_item_ms: float = 0.0, seed: int = 0):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.per_item_ms = per_item_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_ms(self, items: int = 1) -> float:
+        if self.median_ms <= 0 and self.per_item_ms <= 0:
+            return 0.0
+        with self._lock:
+            noise = self._rng.gauss(0.0, self.sigma) if self.sigma else 0.0
+        return self.median_ms * math.exp(noise) + self.per_item_ms * max(0, items - 1)
+
+    def wait(self, items: int = 1) -> float:
+        """Sleep for one sampled latency; returns the latency in ms"""
+        ms = self.sample_ms(items)
+        if ms > 0:
+            time.sleep(ms / 1000)
+        return ms
+
+
+# Per-service latency profiles (median ms, sigma, per-item ms).
+# For Gemini, an "item" is 100 prompt tokens (prefill cost grows with prompt size).
+LATENCY_PROFILES = {
+    "zero": {
+        "generation": (0, 0, 0),
+        "sentiment": (0, 0, 0),
+        "embedding": (0, 0, 0),
+        "search": (0, 0, 0),
+    },
+    "realistic": {
+        "generation": (900, 0.35, 5),
+        "sentiment": (350, 0.30, 5),
+        "embedding": (70, 0.25, 2),
+        "search": (25, 0.40, 0),
+    },
+}
+
+
+def build_latencies(profile: str = "realistic", scale: float = 1.0, seed: int = 0) -> Dict[str, LatencyModel]:
+    """
+    Build LatencyModel objects for each service in a profile
+
+    Args:
+        profile: Key of LATENCY_PROFILES
+        scale: Multiplier applied to all latencies (e.g. 0.1 for quick runs)
+        seed: Base random seed
+    """
+    spec = LATENCY_PROFILES[profile]
+    return {
+        name: LatencyModel(median * scale, sigma, per_item * scale, seed=seed + i)
+        for i, (name, (median, sigma, per_item)) in enumerate(sorted(spec.items()))
+    }
+
+
+class CallStats:
+    """Thread-safe counters for backend calls and input tokens"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.items = 0
+            self.input_tokens = 0
+            self.cached_tokens = 0
+            self.output_tokens = 0
+
+    def record(self, items: int = 1, input_tokens: int = 0, output_tokens: int = 0,
+               cached_tokens: int = 0):
+        with self._lock:
+            self.calls += 1
+            self.items += items
+            self.input_tokens += input_tokens
+            self.cached_tokens += cached_tokens
+            self.output_tokens += output_tokens
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "items": self.items,
+                "input_tokens": self.input_tokens,
+                "cached_tokens": self.cached_tokens,
+                "output_tokens": self.output_tokens,
+            }
+
+
+# ---------------------------------------------------------------------------
+# Gemini
+# ---------------------------------------------------------------------------
+
+class FakeUsage:
+    def __init__(self, prompt_tokens: int, output_tokens: int, cached_tokens: int = 0):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.cached_content_token_count = cached_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt_tokens: int, cached_tokens: int = 0):
+        self.text = text
+        self.usage_metadata = FakeUsage(prompt_tokens, estimate_tokens(text), cached_tokens)
+
+
+_SENTIMENT_RULES = [
+    ("urgent", "urgent", 0.25, ("urgent", "asap", "immediately", " now", "right away")),
+    ("frustrated", "frustrated", 0.15, ("ridiculous", "unacceptable", "terrible", "!!!", "waiting")),
+    ("negative", "disappointed", 0.3, ("not happy", "broken", "late", "disappointed", "damaged")),
+    ("positive", "happy", 0.9, ("thank", "love", "great", "excellent", "awesome")),
+]
+
+
+def fake_sentiment(message: str) -> Dict:
+    """Keyword-based deterministic sentiment used by FakeGenerativeModel"""
+    lowered = f" {message.lower()}"
+    for label, emotion, score, keywords in _SENTIMENT_RULES:
+        if any(keyword in lowered for keyword in keywords):
+            return {"score": score, "label": label, "emotion": emotion, "confidence": 0.9}
+    return {"score": 0.5, "label": "neutral", "emotion": "neutral", "confidence": 0.8}
+
+
+def _contents_to_text(contents) -> str:
+    """Flatten generate_content() contents into plain text"""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(_contents_to_text(part) for part in contents)
+    return str(getattr(contents, "text", contents))
+
+
+class FakeGenerativeModel:
+    """
+    Stand-in for vertexai GenerativeModel
+
+    Sentiment prompts (containing 'Customer Message:') get a JSON answer,
+    batched ones ('Customer Messages (JSON array):') a JSON array;
+    everything else gets a short canned support reply. A system instruction
+    is treated like Gemini prefix caching: after the first call its tokens
+    are served from cache and cost no prefill latency. An optional shared
+    semaphore caps concurrent calls, like a per-project quota.
+    """
+
+    _MESSAGE_RE = re.compile(r'Customer Message:\s*"(.*?)"\s*$', re.S | re.M)
+    _BATCH_RE = re.compile(r'Customer Messages \(JSON array\):\n(.*?)\n\nJSON output', re.S)
+
+    def __init__(self, model_name: str = "fake-gemini", latency: Optional[LatencyModel] = None,
+                 sentiment_latency: Optional[LatencyModel] = None, stats: Optional[CallStats] = None,
+                 system_instruction=None, capacity: Optional[threading.Semaphore] = None, **kwargs):
+        self.model_name = model_name
+        self.capacity = capacity
+        self.latency = latency or LatencyModel()
+        self.sentiment_latency = sentiment_latency or self.latency
+        self.stats = stats or CallStats()
+        self.system_instruction = system_instruction
+        self._prefix_cached = False
+
+    def generate_content(self, contents, *, generation_config=None, **kwargs) -> FakeResponse:
+        if self.capacity is None:
+            return self._generate(contents)
+        with self.capacity:
+            return self._generate(contents)
+
+    def _generate(self, contents) -> FakeResponse:
+        prompt = _contents_to_text(contents)
+        cached_tokens = 0
+        if self.system_instruction:
+            system_text = _contents_to_text(self.system_instruction)
+            if self._prefix_cached:
+                cached_tokens = estimate_tokens(system_text)
+            self._prefix_cached = True
+            prompt = system_text + "\n" + prompt
+
+        prompt_tokens = estimate_tokens(prompt)
+        prefill_items = 1 + (prompt_tokens - cached_tokens) // 100
+        batch = self._BATCH_RE.search(prompt)
+        match = self._MESSAGE_RE.search(prompt)
+        if batch:
+            messages = json.loads(batch.group(1))
+            self.sentiment_latency.wait(items=prefill_items + len(messages))
+            text = json.dumps([fake_sentiment(message) for message in messages])
+        elif match:
+            self.sentiment_latency.wait(items=prefill_items)
+            text = json.dumps(fake_sentiment(match.group(1)))
+        else:
+            self.latency.wait(items=prefill_items)
+            text = ("Thanks for reaching out! Based on our policies, here is what you need "
+                    "to know. Please let me know if there is anything else I can help with.")
+
+        self.stats.record(items=len(messages) if batch else 1, input_tokens=prompt_tokens - cached_tokens, cached_tokens=cached_tokens,
+                          output_tokens=estimate_tokens(text))
+        return FakeResponse(text, prompt_tokens, cached_tokens)
+
+
+# ---------------------------------------------------------------------------
+# Vertex AI embeddings
+# ---------------------------------------------------------------------------
+
+class FakeEmbedding:
+    def __init__(self, values: List[float]):
+        self.values = values
+
+
+def hashed_embedding(text: str, dims: int = 768) -> List[float]:
+    """
+    Deterministic hashed bag-of-words embedding (unit length)
+
+    Texts sharing words get positive cosine similarity, so retrieval
+    quality is meaningful in offline benchmarks.
+    """
+    vector = [0.0] * dims
+    for token in tokenize(text):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dims
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeEmbeddingModel:
+    """Stand-in for vertexai TextEmbeddingModel"""
+
+    def __init__(self, dims: int = 768, latency: Optional[LatencyModel] = None,
+                 stats: Optional[CallStats] = None):
+        self.dims = dims
+        self.latency = latency or LatencyModel()
+        self.stats = stats or CallStats()
+
+    def get_embeddings(self, texts, *, auto_truncate: bool = True,
+                       output_dimensionality: Optional[int] = None) -> List[FakeEmbedding]:
+        texts = [getattr(t, "text", t) for t in texts]
+        dims = output_dimensionality or self.dims
+        self.latency.wait(items=len(texts))
+        self.stats.record(items=len(texts), input_tokens=sum(estimate_tokens(t) for t in texts))
+        return [FakeEmbedding(hashed_embedding(text, dims)) for text in texts]
+
+
+# ---------------------------------------------------------------------------
+# Elasticsearch
+# ---------------------------------------------------------------------------
+
+def _find_key(obj, key):
+    """Depth-first search for the first value stored under key"""
+    if isinstance(obj, dict):
+        if key in obj:
+            return obj[key]
+        children = obj.values()
+    elif isinstance(obj, list):
+        children = obj
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    na = math.sqrt(sum(x * x for x in a)) or 1.0
+    nb = math.sqrt(sum(y * y for y in b)) or 1.0
+    return dot / (na * nb)
+
+
+class _FakeApiResponse(dict):
+    """dict that also exposes .body like elastic_transport's ObjectApiResponse"""
+
+    @property
+    def body(self) -> Dict:
+        return self
+
+
+class _FakeSerializer:
+    def dumps(self, data) -> bytes:
+        if isinstance(data, (bytes, str)):
+            return data.encode("utf-8") if isinstance(data, str) else data
+        return json.dumps(data).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class _FakeSerializers:
+    def __init__(self):
+        self._serializer = _FakeSerializer()
+
+    def get_serializer(self, mimetype: str) -> _FakeSerializer:
+        return self._serializer
+
+
+class _FakeTransport:
+    def __init__(self):
+        self.serializers = _FakeSerializers()
+
+
+class _FakeIndices:
+    """The subset of es.indices used by ElasticClient"""
+
+    def __init__(self, es: "FakeElasticsearch"):
+        self._es = es
+
+    def exists(self, index: str, **kwargs) -> bool:
+        return self._es.resolve(index) in self._es.indexes
+
+    def create(self, index: str, body: Optional[Dict] = None, **kwargs) -> Dict:
+        if index in self._es.indexes:
+            raise ValueError(f"resource_already_exists_exception: {index}")
+        body = body or {
+            key: kwargs[key] for key in ("settings", "mappings", "aliases") if key in kwargs
+        }
+        if not body:
+            body = self._es.template_for(index)
+        self._es.indexes[index] = []
+        self._es.index_bodies[index] = body
+        return {"acknowledged": True, "index": index}
+
+    def put_index_template(self, name: str, index_patterns: List[str], template: Dict,
+                           priority: int = 0, **kwargs) -> Dict:
+        self._es.templates[name] = (priority, index_patterns, template)
+        return {"acknowledged": True}
+
+    def delete(self, index: str, **kwargs) -> Dict:
+        self._es.indexes.pop(self._es.resolve(index), None)
+        return {"acknowledged": True}
+
+    def refresh(self, index: Optional[str] = None, **kwargs) -> Dict:
+        return {"_shards": {"failed": 0}}
+
+    def get(self, index: str, **kwargs) -> Dict:
+        return {
+            name: self._es.index_bodies.get(name, {})
+            for name in self._es.indexes if fnmatch.fnmatch(name, index)
+        }
+
+    def exists_alias(self, name: str, **kwargs) -> bool:
+        return name in self._es.aliases
+
+    def get_alias(self, name: str, **kwargs) -> Dict:
+        if name not in self._es.aliases:
+            raise ValueError(f"alias [{name}] missing")
+        return {self._es.aliases[name]: {"aliases": {name: {}}}}
+
+    def update_aliases(self, actions: List[Dict], **kwargs) -> Dict:
+        """Apply add/remove/remove_index actions (one index per alias)"""
+        for action in actions:
+            (op, spec), = action.items()
+            if op == "remove_index":
+                self._es.indexes.pop(spec["index"], None)
+            elif op == "remove":
+                if self._es.aliases.get(spec["alias"]) == spec["index"]:
+                    del self._es.aliases[spec["alias"]]
+            elif op == "add":
+                self._es.aliases[spec["alias"]] = spec["index"]
+        return {"acknowledged": True}
+
+    def put_settings(self, index: str, settings: Dict, **kwargs) -> Dict:
+        body = self._es.index_bodies.setdefault(self._es.resolve(index), {})
+        body.setdefault("settings", {}).setdefault("index", {}).update(settings.get("index", {}))
+        return {"acknowledged": True}
+
+    def forcemerge(self, index: str, **kwargs) -> Dict:
+        return {"_shards": {"failed": 0}}
+
+    def get_mapping(self, index: str, **kwargs) -> Dict:
+        name = self._es.resolve(index)
+        return {name: {"mappings": self._es.index_bodies.get(name, {}).get("mappings", {})}}
+
+
+class FakeElasticsearch:
+    """
+    In-memory stand-in for the elasticsearch.Elasticsearch client
+
+    Documents are scored with the hybrid formula used by ElasticClient:
+    semantic_weight * (cosine + 1) + keyword_weight * term overlap.
+    Compatible with elasticsearch.helpers.bulk.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, stats: Optional[CallStats] = None):
+        self.latency = latency or LatencyModel()
+        self.stats = stats or CallStats()
+        self.indexes: Dict[str, List[Dict]] = {}
+        self.index_bodies: Dict[str, Dict] = {}
+        self.aliases: Dict[str, str] = {}
+        self.templates: Dict[str, tuple] = {}
+        self.scripts: Dict[str, Dict] = {}
+        self.indices = _FakeIndices(self)
+        self.transport = _FakeTransport()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def resolve(self, index: str) -> str:
+        """Resolve an alias to its concrete index name"""
+        return self.aliases.get(index, index)
+
+    def template_for(self, index: str) -> Dict:
+        """Body of the highest-priority index template matching `index`"""
+        matches = [
+            (priority, template) for priority, patterns, template in self.templates.values()
+            if any(fnmatch.fnmatch(index, pattern) for pattern in patterns)
+        ]
+        return max(matches, key=lambda match: match[0])[1] if matches else {}
+
+    def options(self, **kwargs) -> "FakeElasticsearch":
+        return self
+
+    def ping(self, **kwargs) -> bool:
+        return True
+
+    def _new_id(self) -> str:
+        with self._lock:
+            self._next_id += 1
+            return f"doc-{self._next_id}"
+
+    def index(self, index: str, document: Dict, **kwargs) -> Dict:
+        self.latency.wait()
+        doc_id = kwargs.get("id") or self._new_id()
+        self.indexes.setdefault(self.resolve(index), []).append({"_id": doc_id, "_source": document})
+        return {"_id": doc_id, "result": "created"}
+
+    def bulk(self, operations, **kwargs) -> Dict:
+        """Accept NDJSON lines (bytes/str/dict) as produced by helpers.bulk"""
+        lines = [json.loads(op) if isinstance(op, (bytes, str)) else op for op in operations]
+        self.latency.wait(items=len(lines) // 2)
+        self.stats.record(items=len(lines) // 2)
+        items = []
+        i = 0
+        while i < len(lines):
+            action = lines[i]
+            op_type, meta = next(iter(action.items()))
+            source = lines[i + 1] if op_type != "delete" else None
+            i += 2 if source is not None else 1
+            doc_id = meta.get("_id") or self._new_id()
+            index = self.resolve(meta.get("_index", ""))
+            self.indexes.setdefault(index, []).append({"_id": doc_id, "_source": source})
+            items.append({op_type: {"_index": index, "_id": doc_id, "status": 201}})
+        return _FakeApiResponse(errors=False, items=items)
+
+    def count(self, index: str, **kwargs) -> Dict:
+        return {"count": len(self.indexes.get(self.resolve(index), []))}
+
+    def put_script(self, id: str, script: Dict, **kwargs) -> Dict:
+        self.scripts[id] = script
+        return {"acknowledged": True}
+
+    def get_script(self, id: str, **kwargs) -> Dict:
+        if id not in self.scripts:
+            raise ValueError(f"resource_not_found_exception: stored script [{id}]")
+        return {"_id": id, "found": True, "script": self.scripts[id]}
+
+    def render_search_template(self, id: str, params: Dict, **kwargs) -> Dict:
+        """Render a stored mustache template ({{x}}, "{{x}}" and toJson tags)"""
+        source = self.get_script(id)["script"]["source"]
+        source = re.sub(
+            r"\{\{#toJson\}\}(\w+)\{\{/toJson\}\}", lambda m: json.dumps(params[m.group(1)]), source
+        )
+        source = re.sub(r'"\{\{(\w+)\}\}"', lambda m: json.dumps(str(params[m.group(1)])), source)
+        source = re.sub(r"\{\{(\w+)\}\}", lambda m: json.dumps(params[m.group(1)]), source)
+        return {"template_output": json.loads(source)}
+
+    def search_template(self, index: str, id: str, params: Dict, **kwargs) -> Dict:
+        body = self.render_search_template(id=id, params=params)["template_output"]
+        return self.search(index=index, body=body)
+
+    def search(self, index: str, body: Optional[Dict] = None, **kwargs) -> Dict:
+        body = dict(body or {}, **{k: v for k, v in kwargs.items() if k != "request_timeout"})
+        self.latency.wait()
+        self.stats.record()
+
+        if body.get("sort") == ["_doc"]:
+            # Index-order scan (search_after pagination), full sources
+            docs = self.indexes.get(self.resolve(index), [])
+            start = body["search_after"][0] + 1 if body.get("search_after") else 0
+            page = docs[start:start + int(body.get("size", 10))]
+            hits = [
+                {"_id": doc["_id"], "_score": None, "_source": doc["_source"], "sort": [start + i]}
+                for i, doc in enumerate(page)
+            ]
+            return {"hits": {"total": {"value": len(docs)}, "hits": hits}}
+
+        query_vector = _find_key(body, "query_vector") or []
+        multi_match = _find_key(body, "multi_match")
+        params = _find_key(body, "params") or {}
+        if not isinstance(multi_match, dict):
+            multi_match = {}
+        knn = body.get("knn") or {}
+        semantic_weight = float(params.get("semantic_weight", knn.get("boost", 1.2) / 2))
+        keyword_weight = float(params.get("keyword_weight", multi_match.get("boost", 0.4)))
+        query_terms = set(tokenize(multi_match.get("query", "")))
+        size = int(body.get("size", 10))
+
+        scored = []
+        for doc in self.indexes.get(self.resolve(index), []):
+            source = doc["_source"]
+            score = 0.0
+            if query_vector and source.get("embedding"):
+                score += semantic_weight * (_cosine(query_vector, source["embedding"]) + 1.0)
+            if query_terms:
+                doc_terms = set(tokenize(f"{source.get('title', '')} {source.get('text', '')}"))
+                score += keyword_weight * len(query_terms & doc_terms) / len(query_terms)
+            scored.append((score, doc))
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+
+        hits = []
+        for score, doc in scored[:size]:
+            source = {k: v for k, v in doc["_source"].items() if k != "embedding"}
+            text = source.get("text", "")
+            hits.append({
+                "_id": doc["_id"],
+                "_score": score,
+                "_source": source,
+                "highlight": {"text": [text[:200]]} if text else {},
+            })
+        return {"hits": {"total": {"value": len(scored)}, "hits": hits}}
@@ -0,0 +1,424 @@
+"""
+Offline Benchmark Harness
+Drives SentiFlow components and Flask endpoints against deterministic
+fakes at controlled concurrency and reports throughput and latency
+percentiles to a JSON file that can be compared across commits
+
+Usage:
+    python benchmarks/run_benchmarks.py --requests 200 --concurrency 8
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import (
+    CallStats,
+    FakeElasticsearch,
+    FakeEmbeddingModel,
+    FakeGenerativeModel,
+    build_latencies,
+    LATENCY_PROFILES,
+)
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_DOCS = BACKEND_DIR.parent / "data" / "sample_docs"
+DEFAULT_OUTPUT = BACKEND_DIR / "benchmarks" / "results" / "latest.json"
+
+# Query workload: mix of topics and sentiments, cycled in order
+QUERIES = [
+    "What is your return policy?",
+    "How long does shipping take?",
+    "Can you help me understand the warranty terms?",
+    "I've been waiting 3 weeks for my order! This is unacceptable!",
+    "URGENT: my payment failed and I need it fixed right away",
+    "How do I reset my account password?",
+    "My order arrived broken and I'm not happy about it.",
+    "Thanks so much, the product is great!",
+    "Do you ship internationally?",
+    "How do I return a damaged item?",
+    "What does the warranty cover?",
+    "hello?",
+]
+
+# Thundering herd: one question asked by everyone at once, spelled differently
+HERD_QUERIES = [
+    "Is there a shipping outage? My order hasn't moved",
+    "is there a shipping outage?? my order hasn't moved",
+    "IS THERE A SHIPPING OUTAGE - my order hasn't moved",
+]
+
+# Frequent questions as customers retype them (served from the FAQ table built
+# from QUERIES traffic; the last two are not in it)
+FAQ_QUERIES = [
+    "what is your return policy",
+    "How long does shipping take??",
+    "do you ship internationally?",
+    "How do I return a damaged item",
+    "what does the warranty cover?",
+    "Can I change the delivery address after ordering?",
+    "Is gift wrapping available?",
+]
+
+SCENARIOS = ["sentiment", "retrieve", "generate", "ingest", "http_chat", "http_sentiment", "http_herd", "http_faq"]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Stack:
+    """SentiFlow components wired to fakes, plus per-service call stats"""
+
+    def __init__(self, profile: str, scale: float, seed: int, dims: int = 768,
+                 generation_capacity: int = 0):
+        # Component modules read Config at construction time
+        from agents.generator import ResponseGenerator
+        from agents.retriever import HybridRetriever
+        from agents.sentiment import SentimentAnalyzer
+        from pipelines.ingest import DocumentIngestor
+        from utils.elastic_client import ElasticClient
+        from utils.embeddings import VertexEmbeddingProvider
+        from utils.events import EventLog, JsonlSink
+
+        latencies = build_latencies(profile, scale, seed)
+        capacity = threading.Semaphore(generation_capacity) if generation_capacity > 0 else None
+        self.stats = {name: CallStats() for name in ("generation", "sentiment", "embedding", "search")}
+
+        self.embedder = VertexEmbeddingProvider(
+            FakeEmbeddingModel(dims, latencies["embedding"], self.stats["embedding"])
+        )
+        self.es = FakeElasticsearch(latencies["search"], self.stats["search"])
+        self.es_client = ElasticClient(es=self.es)
+        self.analyzer = SentimentAnalyzer(
+            model_factory=lambda name, **kwargs: FakeGenerativeModel(
+                name, latencies["sentiment"], stats=self.stats["sentiment"], **kwargs
+            )
+        )
+        self.retriever = HybridRetriever(embedder=self.embedder, es_client=self.es_client)
+        self.generation_factory = lambda name, **kwargs: FakeGenerativeModel(
+            name, latencies["generation"], stats=self.stats["generation"], capacity=capacity, **kwargs
+        )
+        self.generator = ResponseGenerator(
+            retriever=self.retriever,
+            sentiment_analyzer=self.analyzer,
+            model_factory=self.generation_factory
+        )
+        # Embedding store in a throwaway directory: seeding embeds everything,
+        # the ingest scenario then measures rebuilds of unchanged content
+        from config import Config
+        from utils.embedding_store import EmbeddingStore
+        self.embedding_store = (
+            EmbeddingStore(tempfile.mkdtemp(prefix="sentiflow-embeddings-")) if Config.EMBEDDING_STORE else None
+        )
+        self.ingestor = DocumentIngestor(
+            embedder=self.embedder,
+            es_client=self.es_client,
+            embedding_store=self.embedding_store
+        )
+
+        # FAQ table in a throwaway directory, only built for the http_faq scenario
+        from agents.faq import FaqAnswers
+        self.generator.faq = FaqAnswers(os.path.join(tempfile.mkdtemp(prefix="sentiflow-faq-"), "faq-table.bin"))
+
+        # Chat events go through the real queue/writer into a throwaway directory
+        self.event_log = EventLog(JsonlSink(tempfile.mkdtemp(prefix="sentiflow-events-")))
+
+        # Separate cluster for the ingest scenario so the query index stays stable
+        self.ingest_target = DocumentIngestor(
+            embedder=self.embedder,
+            embedding_store=self.embedding_store,
+            es_client=ElasticClient(es=FakeElasticsearch(latencies["search"], self.stats["search"]))
+        )
+
+    def seed_index(self) -> None:
+        """Create the index and ingest the sample documents"""
+        self.es_client.create_index()
+        self.ingestor.ingest_folder(str(SAMPLE_DOCS), category="knowledge_base")
+
+    def build_faq_table(self) -> Dict:
+        """Mine a FAQ table from synthetic traffic (each QUERIES entry asked 5 times)"""
+        from pipelines.build_faq_table import build_faq_table
+
+        events = []
+        for query in QUERIES:
+            sentiment = self.analyzer.analyze(query)
+            events.extend(
+                {"type": "chat", "query": query, "sentiment_label": sentiment["label"],
+                 "sentiment_score": sentiment["score"], "emotion": sentiment["emotion"]}
+                for _ in range(5)
+            )
+        stats = build_faq_table(self.generator, path=self.generator.faq.path, events=iter(events))
+        self.generator.faq.sync(self.es_client.alias_targets(), self.generator)
+        return stats
+
+    def drop_faq_table(self) -> None:
+        self.generator.faq.table = None
+
+    def reset_stats(self) -> None:
+        for stats in self.stats.values():
+            stats.reset()
+
+    def snapshot_stats(self) -> Dict:
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+
+def run_load(call: Callable[[int], object], requests: int, concurrency: int) -> Dict:
+    """
+    Issue `requests` calls at fixed concurrency and collect latencies
+
+    Args:
+        call: Function taking the request number
+        requests: Number of measured calls
+        concurrency: Number of concurrent workers
+
+    Returns:
+        Dictionary with throughput, latency percentiles and error count
+    """
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(i: int) -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            call(i)
+            ok = True
+        except Exception as e:
+            logger.debug(f"Request {i} failed: {e}")
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(requests)))
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(requests / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+    }
+
+
+def build_scenarios(stack: Stack) -> Dict[str, Callable[[int], object]]:
+    """Map scenario names to per-request callables"""
+    import app as app_module
+
+    # Boot the Flask app through the real startup path with fake-backed components
+    app_module.event_log = stack.event_log
+    ready = app_module.startup(
+        components={
+            "elasticsearch": lambda: stack.es_client,
+            "sentiment_analyzer": lambda: stack.analyzer,
+            "embedder": lambda: stack.embedder,
+        },
+        model_factory=stack.generation_factory
+    )
+    if not ready or not app_module.lifecycle.is_ready:
+        raise RuntimeError(f"App startup failed: {app_module.lifecycle.errors}")
+    # HTTP and in-process scenarios share the generator startup built
+    app_module.response_generator.faq = stack.generator.faq
+    stack.generator = app_module.response_generator
+    stack.retriever = stack.generator.retriever
+
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, "client"):
+            local.client = app_module.app.test_client()
+        return local.client
+
+    def post(path: str, payload: Dict) -> None:
+        response = client().post(path, json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}")
+
+    def query(i: int) -> str:
+        return QUERIES[i % len(QUERIES)]
+
+    return {
+        "sentiment": lambda i: stack.analyzer.analyze(query(i)),
+        "retrieve": lambda i: stack.retriever.retrieve(query(i), k=3),
+        "generate": lambda i: stack.generator.generate(query(i), retrieve_context=True, k=3),
+        "ingest": lambda i: stack.ingest_target.ingest_folder(str(SAMPLE_DOCS), category="knowledge_base"),
+        "http_chat": lambda i: post("/api/chat", {"message": query(i)}),
+        "http_sentiment": lambda i: post("/api/sentiment", {"text": query(i)}),
+        "http_herd": lambda i: post("/api/chat", {"message": HERD_QUERIES[i % len(HERD_QUERIES)]}),
+        "http_faq": lambda i: post("/api/chat", {"message": FAQ_QUERIES[i % len(FAQ_QUERIES)]}),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def compare(current: Dict, baseline: Dict) -> None:
+    """Print per-scenario deltas against a baseline results file"""
+    print(f"\n📊 Comparison vs {baseline['meta'].get('git_revision', '?')}")
+    print(f"{'scenario':<16}{'metric':<16}{'baseline':>12}{'current':>12}{'delta':>10}")
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        rows = [("throughput_rps", base["throughput_rps"], result["throughput_rps"])]
+        rows += [(p, base["latency_ms"][p], result["latency_ms"][p]) for p in ("p50", "p95", "p99")]
+        for metric, old, new in rows:
+            delta = ((new - old) / old * 100) if old else 0.0
+            print(f"{name:<16}{metric:<16}{old:>12.2f}{new:>12.2f}{delta:>9.1f}%")
+
+
+def main(argv=None) -> Dict:
+    parser = argparse.ArgumentParser(description="Offline SentiFlow benchmarks")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent workers")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per scenario")
+    parser.add_argument("--profile", default="realistic", choices=sorted(LATENCY_PROFILES),
+                        help="Backend latency profile")
+    parser.add_argument("--latency-scale", type=float, default=0.1,
+                        help="Multiplier for profile latencies (1.0 = production-like)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for latency sampling")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Results JSON path")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--no-prompt-cache", action="store_true",
+                        help="Disable PROMPT_PREFIX_CACHE (send full prompts every call)")
+    parser.add_argument("--no-sentiment-cache", action="store_true",
+                        help="Disable sentiment result memoization (every message calls the model)")
+    parser.add_argument("--no-batching", action="store_true",
+                        help="Disable micro-batching of concurrent embedding/sentiment calls")
+    parser.add_argument("--no-singleflight", action="store_true",
+                        help="Disable collapsing of concurrent identical answers/retrievals/embeddings")
+    parser.add_argument("--no-embedding-store", action="store_true",
+                        help="Embed every chunk on each ingest pass (no reuse of stored vectors)")
+    parser.add_argument("--generation-capacity", type=int, default=0,
+                        help="Max concurrent fake Gemini generations, like a quota (0 = unlimited)")
+    parser.add_argument("--embedding-dims", type=int, default=None,
+                        help="EMBEDDING_DIMENSIONS for the index and query embeddings (e.g. 256)")
+    parser.add_argument("--verbose", action="store_true", help="Keep component INFO logging")
+    args = parser.parse_args(argv)
+
+    # Per-request INFO logging would dominate the measurements
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    from config import Config
+    # Load .env first so startup() does not re-read it over the flags below
+    Config.load(validate=False)
+    if args.no_prompt_cache:
+        Config.PROMPT_PREFIX_CACHE = False
+    if args.no_sentiment_cache:
+        Config.SENTIMENT_CACHE_SIZE = 0
+    if args.no_batching:
+        Config.MICRO_BATCHING = False
+    if args.no_singleflight:
+        Config.SINGLEFLIGHT = False
+    if args.no_embedding_store:
+        Config.EMBEDDING_STORE = False
+    if args.embedding_dims:
+        Config.EMBEDDING_DIMENSIONS = args.embedding_dims
+
+    stack = Stack(args.profile, args.latency_scale, args.seed,
+                  generation_capacity=args.generation_capacity)
+    stack.seed_index()
+    scenarios = build_scenarios(stack)
+
+    results = {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "profile": args.profile,
+            "latency_scale": args.latency_scale,
+            "seed": args.seed,
+            "prompt_prefix_cache": Config.PROMPT_PREFIX_CACHE,
+            "sentiment_cache_size": Config.SENTIMENT_CACHE_SIZE,
+            "micro_batching": Config.MICRO_BATCHING,
+            "singleflight": Config.SINGLEFLIGHT,
+            "generation_capacity": args.generation_capacity,
+            "embedding_dims": Config.EMBEDDING_DIMENSIONS,
+        },
+        "scenarios": {},
+    }
+
+    for name in selected:
+        requests = args.requests if name != "ingest" else max(1, args.requests // 20)
+        if name == "http_faq":
+            faq = stack.build_faq_table()
+            print(f"📇 FAQ table: {faq['intents']} intents, {faq['answers']} answers, {faq['bytes']} bytes")
+        if name != "ingest":
+            for i in range(args.warmup):
+                scenarios[name](i)
+        stack.reset_stats()
+        print(f"▶️  {name}: {requests} requests @ concurrency {args.concurrency}")
+        result = run_load(scenarios[name], requests, args.concurrency)
+        result["backend_calls"] = stack.snapshot_stats()
+        results["scenarios"][name] = result
+        lat = result["latency_ms"]
+        print(f"   {result['throughput_rps']:.1f} req/s  p50={lat['p50']:.1f}ms  "
+              f"p95={lat['p95']:.1f}ms  p99={lat['p99']:.1f}ms  errors={result['errors']}")
+        if name == "http_faq":
+            stack.drop_faq_table()
+
+    stack.event_log.close()
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\n💾 Results written to {output}")
+
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text()))
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
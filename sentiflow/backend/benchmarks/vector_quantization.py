@@ -0,0 +1,233 @@
+"""
+Vector Quantization Benchmark
+Compares float32 and int8-quantized embedding storage: retrieval recall
+(with and without full-precision rescoring), vector memory and ingestion
+payload size. With --live the same corpus is indexed into a real cluster
+with both mappings to measure kNN latency and store size.
+
+Usage:
+    python benchmarks/vector_quantization.py --vectors 1000 --queries 30
+    python benchmarks/vector_quantization.py --live --vectors 5000
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run_benchmarks import percentile
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_OUTPUT = BACKEND_DIR / "benchmarks" / "results" / "vector_quantization.json"
+HNSW_M = 16
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def synthetic_corpus(count: int, dims: int, clusters: int, seed: int) -> List[List[float]]:
+    """Unit vectors around random topic centers (like chunks of a few documents)"""
+    rng = random.Random(seed)
+    centers = [_normalize([rng.gauss(0, 1) for _ in range(dims)]) for _ in range(clusters)]
+    corpus = []
+    for i in range(count):
+        center = centers[i % clusters]
+        corpus.append(_normalize([c + rng.gauss(0, 0.05) for c in center]))
+    return corpus
+
+
+def _dot(a: List[float], b: List[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+def quantize_int8(corpus: List[List[float]]) -> Tuple[List[List[int]], float, float]:
+    """
+    Scalar quantization as done by int8_hnsw: clip to the central
+    1 - 1/(dims + 1) quantile range, then map linearly to 0..127
+    """
+    dims = len(corpus[0])
+    values = sorted(v for vector in corpus for v in vector)
+    tail = 1.0 / (dims + 1) / 2
+    lo = values[int(tail * (len(values) - 1))]
+    hi = values[int((1 - tail) * (len(values) - 1))]
+    scale = 127.0 / (hi - lo)
+    quantized = [
+        [int(round((min(max(v, lo), hi) - lo) * scale)) for v in vector]
+        for vector in corpus
+    ]
+    return quantized, lo, scale
+
+
+def _dequantize(vector: List[int], lo: float, scale: float) -> List[float]:
+    return [lo + q / scale for q in vector]
+
+
+def top_k(query: List[float], corpus: List[List[float]], k: int) -> List[int]:
+    scores = sorted(((_dot(query, doc), i) for i, doc in enumerate(corpus)), reverse=True)
+    return [i for _, i in scores[:k]]
+
+
+def recall(found: List[int], truth: List[int]) -> float:
+    return len(set(found) & set(truth)) / len(truth)
+
+
+def vector_memory_bytes(count: int, dims: int) -> Dict[str, int]:
+    """Off-heap memory for HNSW search (Elasticsearch kNN tuning guide)"""
+    graph = count * 4 * HNSW_M
+    return {
+        "float": count * dims * 4 + graph,
+        "int8_hnsw": count * (dims + 4) + graph,
+    }
+
+
+def payload_bytes(corpus: List[List[float]], decimals: int) -> Tuple[int, float]:
+    """Bulk source size for the vectors and serialization time"""
+    start = time.perf_counter()
+    size = 0
+    for vector in corpus:
+        values = [round(v, decimals) for v in vector] if decimals > 0 else vector
+        size += len(json.dumps({"embedding": values}))
+    return size, (time.perf_counter() - start) * 1000
+
+
+def run_offline(args) -> Dict:
+    corpus = synthetic_corpus(args.vectors, args.dims, args.clusters, args.seed)
+    rng = random.Random(args.seed + 1)
+    queries = [
+        _normalize([v + rng.gauss(0, 0.05) for v in corpus[rng.randrange(len(corpus))]])
+        for _ in range(args.queries)
+    ]
+
+    quantized, lo, scale = quantize_int8(corpus)
+    dequantized = [_dequantize(vector, lo, scale) for vector in quantized]
+
+    recalls = {"int8": [], "int8_rescored": []}
+    for query in queries:
+        truth = top_k(query, corpus, args.k)
+        approx = top_k(query, dequantized, args.rescore_window)
+        recalls["int8"].append(recall(approx[:args.k], truth))
+        rescored = sorted(approx, key=lambda i: _dot(query, corpus[i]), reverse=True)[:args.k]
+        recalls["int8_rescored"].append(recall(rescored, truth))
+
+    payload = {}
+    for decimals in (0, 6):
+        size, ms = payload_bytes(corpus, decimals)
+        payload[f"decimals_{decimals}" if decimals else "full_precision"] = {
+            "bytes_per_vector": round(size / len(corpus)),
+            "serialize_ms": round(ms, 1),
+        }
+
+    return {
+        f"recall_at_{args.k}": {name: round(sum(values) / len(values), 4) for name, values in recalls.items()},
+        "vector_memory_bytes": {
+            "corpus": vector_memory_bytes(args.vectors, args.dims),
+            "per_million_vectors": vector_memory_bytes(1_000_000, args.dims),
+        },
+        "ingest_payload": payload,
+    }
+
+
+def run_live(args, corpus: List[List[float]], queries: List[List[float]]) -> Dict:
+    """Index the corpus with both mappings in a real cluster and time kNN queries"""
+    from config import Config
+    from utils.elastic_client import ElasticClient, compact_vector
+
+    Config.load()
+    Config.EMBEDDING_DIMENSIONS = args.dims
+    base = ElasticClient()
+    results = {}
+    for index_type in ("hnsw", "int8_hnsw"):
+        Config.VECTOR_INDEX_TYPE = index_type
+        client = base.for_index(f"{Config.ELASTIC_INDEX_NAME}-bench-{index_type.replace('_', '-')}")
+        client.create_index(delete_if_exists=True)
+        client.bulk_index_documents([
+            {"text": f"doc {i}", "title": f"doc {i}", "embedding": compact_vector(vector)}
+            for i, vector in enumerate(corpus)
+        ])
+        client.es.indices.forcemerge(index=client.index_name, max_num_segments=1)
+
+        latencies, hits = [], []
+        for query in queries:
+            body = {
+                "size": args.k,
+                "knn": {"field": "embedding", "query_vector": compact_vector(query),
+                        "k": args.k, "num_candidates": max(100, args.rescore_window)},
+                "_source": ["title"],
+            }
+            start = time.perf_counter()
+            response = client.es.search(index=client.index_name, body=body)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits.append([int(hit["_source"]["title"].split()[-1]) for hit in response["hits"]["hits"]])
+
+        stats = client.es.indices.stats(index=client.index_name, metric="store")
+        latencies.sort()
+        results[index_type] = {
+            "knn_latency_ms": {"p50": round(percentile(latencies, 50), 2),
+                               "p95": round(percentile(latencies, 95), 2)},
+            f"recall_at_{args.k}": round(sum(
+                recall(found, top_k(query, corpus, args.k)) for found, query in zip(hits, queries)
+            ) / len(queries), 4),
+            "store_bytes": stats["_all"]["primaries"]["store"]["size_in_bytes"],
+        }
+        if not args.keep:
+            client.delete_index()
+    return results
+
+
+def main(argv=None) -> Dict:
+    parser = argparse.ArgumentParser(description="Float vs int8 vector storage benchmark")
+    parser.add_argument("--vectors", type=int, default=1000, help="Corpus size")
+    parser.add_argument("--dims", type=int, default=768, help="Embedding dimensions")
+    parser.add_argument("--clusters", type=int, default=20, help="Topic clusters in the corpus")
+    parser.add_argument("--queries", type=int, default=30, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--rescore-window", type=int, default=50, help="Candidates rescored in float")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--live", action="store_true", help="Also measure against the configured cluster")
+    parser.add_argument("--keep", action="store_true", help="Keep the live benchmark indexes")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Results JSON path")
+    args = parser.parse_args(argv)
+
+    print(f"▶️  {args.vectors} x {args.dims}-dim vectors, {args.queries} queries, k={args.k}")
+    results = {"meta": vars(args).copy(), "offline": run_offline(args)}
+    results["meta"].pop("output")
+
+    offline = results["offline"]
+    for name, value in offline[f"recall_at_{args.k}"].items():
+        print(f"   recall@{args.k} {name:<14} {value:.4f}")
+    for name, value in offline["vector_memory_bytes"]["per_million_vectors"].items():
+        print(f"   memory / 1M vectors {name:<10} {value / 2**30:.2f} GiB")
+    for name, value in offline["ingest_payload"].items():
+        print(f"   payload {name:<15} {value['bytes_per_vector']} B/vector")
+
+    if args.live:
+        corpus = synthetic_corpus(args.vectors, args.dims, args.clusters, args.seed)
+        rng = random.Random(args.seed + 1)
+        queries = [
+            _normalize([v + rng.gauss(0, 0.05) for v in corpus[rng.randrange(len(corpus))]])
+            for _ in range(args.queries)
+        ]
+        results["live"] = run_live(args, corpus, queries)
+        for name, value in results["live"].items():
+            print(f"   live {name:<10} p50={value['knn_latency_ms']['p50']}ms "
+                  f"recall={value[f'recall_at_{args.k}']} store={value['store_bytes']}B")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\n💾 Results written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
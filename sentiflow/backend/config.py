@@ -1,44 +1,230 @@
 """
 Configuration Module for SentiFlow
 Loads and validates environment variables
+
+Importing this module only reads the process environment. Loading the
+.env file and validating required settings happen in Config.load(), which
+entry points (app startup, pipelines, CLI tests) call explicitly.
 """
 
 import os
-from dotenv import load_dotenv
 from pathlib import Path
+from typing import Optional
 
-# Load environment variables
-env_path = Path(__file__).parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
+# Default .env location (repository root of the sentiflow project)
+ENV_PATH = Path(__file__).parent.parent / '.env'
 
 
 class Config:
     """Application configuration class"""
-    
-    # Google Cloud
-    GCP_PROJECT_ID = os.getenv('GCP_PROJECT_ID')
-    GCP_REGION = os.getenv('GCP_REGION', 'us-central1')
-    VERTEX_AI_LOCATION = os.getenv('VERTEX_AI_LOCATION', 'us-central1')
-    GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash-exp')
-    EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'text-embedding-004')
-    
-    # Elastic
-    ELASTIC_CLOUD_ID = os.getenv('ELASTIC_CLOUD_ID')
-    ELASTIC_API_KEY = os.getenv('ELASTIC_API_KEY')
-    ELASTIC_INDEX_NAME = os.getenv('ELASTIC_INDEX_NAME', 'sentiflow-kb')
-    
-    # Application
-    FLASK_SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
-    PORT = int(os.getenv('PORT', 8080))
-    ENVIRONMENT = os.getenv('ENVIRONMENT', 'development')
-    
-    # Optional: BigQuery
-    BIGQUERY_DATASET = os.getenv('BIGQUERY_DATASET', 'sentiflow_analytics')
-    BIGQUERY_TABLE = os.getenv('BIGQUERY_TABLE', 'conversation_logs')
-    
-    # Optional: Pub/Sub
-    PUBSUB_TOPIC = os.getenv('PUBSUB_TOPIC', 'sentiflow-events')
-    
+
+    _loaded = False
+
+    @classmethod
+    def _read_environment(cls):
+        """(Re)read all settings from the process environment"""
+        # Google Cloud
+        cls.GCP_PROJECT_ID = os.getenv('GCP_PROJECT_ID')
+        cls.GCP_REGION = os.getenv('GCP_REGION', 'us-central1')
+        cls.VERTEX_AI_LOCATION = os.getenv('VERTEX_AI_LOCATION', 'us-central1')
+        cls.GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash-exp')
+        cls.EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'text-embedding-004')
+        # Embedding output size (text-embedding-004: 768 max, reducible to e.g. 256/128);
+        # changing it requires migrating the index (pipelines/migrate_embeddings.py)
+        cls.EMBEDDING_DIMENSIONS = int(os.getenv('EMBEDDING_DIMENSIONS', 768))
+        # Embeddings from Vertex AI (EMBEDDING_MODEL) or a local ONNX model on CPU;
+        # an index only serves the provider/model it was built with
+        cls.EMBEDDING_PROVIDER = os.getenv('EMBEDDING_PROVIDER', 'vertex').lower()
+        # Directory with model.onnx and tokenizer.json (EMBEDDING_PROVIDER=local)
+        cls.LOCAL_EMBEDDING_MODEL = os.getenv('LOCAL_EMBEDDING_MODEL', 'models/all-MiniLM-L6-v2')
+        cls.LOCAL_EMBEDDING_THREADS = int(os.getenv('LOCAL_EMBEDDING_THREADS', 2))
+        cls.LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv('LOCAL_EMBEDDING_BATCH_SIZE', 16))
+        cls.LOCAL_EMBEDDING_MAX_TOKENS = int(os.getenv('LOCAL_EMBEDDING_MAX_TOKENS', 256))
+        # Input prefixes for asymmetric models (e5: "query: " / "passage: ")
+        cls.LOCAL_EMBEDDING_QUERY_PREFIX = os.getenv('LOCAL_EMBEDDING_QUERY_PREFIX', '')
+        cls.LOCAL_EMBEDDING_DOCUMENT_PREFIX = os.getenv('LOCAL_EMBEDDING_DOCUMENT_PREFIX', '')
+
+        # Elastic
+        cls.ELASTIC_CLOUD_ID = os.getenv('ELASTIC_CLOUD_ID')
+        cls.ELASTIC_API_KEY = os.getenv('ELASTIC_API_KEY')
+        cls.ELASTIC_INDEX_NAME = os.getenv('ELASTIC_INDEX_NAME', 'sentiflow-kb')
+
+        # Vector storage/search: hnsw (float) or int8_hnsw (quantized, ES 8.12+);
+        # VECTOR_SEARCH auto = kNN for quantized indexes, exact script_score otherwise
+        cls.VECTOR_INDEX_TYPE = os.getenv('VECTOR_INDEX_TYPE', 'hnsw')
+        cls.VECTOR_SEARCH = os.getenv('VECTOR_SEARCH', 'auto')
+        cls.VECTOR_RESCORE_WINDOW = int(os.getenv('VECTOR_RESCORE_WINDOW', 50))
+        cls.VECTOR_NUM_CANDIDATES = int(os.getenv('VECTOR_NUM_CANDIDATES', 100))
+        cls.VECTOR_DECIMALS = int(os.getenv('VECTOR_DECIMALS', 6))
+
+        # Seconds between checks of the serving alias; a blue/green swap clears
+        # the answer caches (0 = no checks)
+        cls.INDEX_WATCH_INTERVAL_S = float(os.getenv('INDEX_WATCH_INTERVAL_S', 30))
+
+        # Ingestion: processes parsing HTML/PDF files while earlier files are
+        # embedded and indexed (0 = parse everything inline)
+        cls.INGEST_PARSE_WORKERS = int(os.getenv('INGEST_PARSE_WORKERS', min(4, os.cpu_count() or 1)))
+        # Document embeddings kept on disk by chunk text hash and reused by later
+        # ingestions and index rebuilds (utils/embedding_store.py)
+        cls.EMBEDDING_STORE = os.getenv('EMBEDDING_STORE', 'true').lower() == 'true'
+        cls.EMBEDDING_STORE_DIR = os.getenv('EMBEDDING_STORE_DIR', str(Path(__file__).resolve().parent.parent / 'data' / 'embeddings'))
+
+        # Ingestion job API (POST /api/ingest): disabled unless INGEST_API_TOKEN is set;
+        # jobs read folders below INGEST_ROOT or documents uploaded with the request
+        cls.INGEST_API_TOKEN = os.getenv('INGEST_API_TOKEN', '')
+        cls.INGEST_ROOT = os.getenv('INGEST_ROOT', str(Path(__file__).resolve().parent.parent / 'data'))
+        cls.INGEST_JOB_DIR = os.getenv('INGEST_JOB_DIR', str(Path(__file__).resolve().parent.parent / 'data' / 'ingest_jobs'))
+        cls.INGEST_JOB_WORKERS = int(os.getenv('INGEST_JOB_WORKERS', 1))
+        cls.INGEST_JOB_QUEUE_SIZE = int(os.getenv('INGEST_JOB_QUEUE_SIZE', 10))
+        cls.INGEST_JOB_HISTORY = int(os.getenv('INGEST_JOB_HISTORY', 100))
+        cls.INGEST_UPLOAD_MAX_MB = int(os.getenv('INGEST_UPLOAD_MAX_MB', 20))
+
+        # Multi-tenancy: the default tenant uses ELASTIC_INDEX_NAME, others
+        # get <TENANT_INDEX_PREFIX>-<tenant> created from an index template
+        # by ingestion. Chat serves allow-listed tenants and tenants whose
+        # index exists; requests never create indexes
+        cls.DEFAULT_TENANT = os.getenv('DEFAULT_TENANT', 'default')
+        cls.TENANT_INDEX_PREFIX = os.getenv('TENANT_INDEX_PREFIX', 'sentiflow-tenant')
+        cls.TENANT_POOL_SIZE = int(os.getenv('TENANT_POOL_SIZE', 100))
+        cls.TENANT_ALLOWLIST = [
+            tenant.strip().lower() for tenant in os.getenv('TENANT_ALLOWLIST', '').split(',') if tenant.strip()
+        ]
+
+        # Application
+        cls.FLASK_SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
+        cls.PORT = int(os.getenv('PORT', 8080))
+        cls.ENVIRONMENT = os.getenv('ENVIRONMENT', 'development')
+
+        # Prompt budgets (estimated tokens)
+        cls.CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', 1200))
+        cls.HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', 300))
+
+        # Prompt prefix caching: static instructions sent as system instruction
+        cls.PROMPT_PREFIX_CACHE = os.getenv('PROMPT_PREFIX_CACHE', 'true').lower() == 'true'
+        # Explicit Vertex AI context cache (only used above the service minimum size)
+        cls.GEMINI_CONTEXT_CACHE = os.getenv('GEMINI_CONTEXT_CACHE', 'false').lower() == 'true'
+        cls.CONTEXT_CACHE_MIN_TOKENS = int(os.getenv('CONTEXT_CACHE_MIN_TOKENS', 2048))
+        cls.CONTEXT_CACHE_TTL_S = int(os.getenv('CONTEXT_CACHE_TTL_S', 3600))
+        # Extend the cache's TTL once less than this is left
+        cls.CONTEXT_CACHE_REFRESH_S = int(os.getenv('CONTEXT_CACHE_REFRESH_S', 300))
+
+        # Sentiment: schema-constrained JSON output
+        cls.SENTIMENT_JSON_MODE = os.getenv('SENTIMENT_JSON_MODE', 'true').lower() == 'true'
+        cls.SENTIMENT_MAX_OUTPUT_TOKENS = int(os.getenv('SENTIMENT_MAX_OUTPUT_TOKENS', 64))
+
+        # Sentiment result cache (normalized message text -> result)
+        cls.SENTIMENT_CACHE_SIZE = int(os.getenv('SENTIMENT_CACHE_SIZE', 10000))
+        cls.SENTIMENT_CACHE_TTL_S = int(os.getenv('SENTIMENT_CACHE_TTL_S', 86400))
+        # Optional SQLite file shared by worker processes (empty = memory only)
+        cls.SENTIMENT_CACHE_PATH = os.getenv('SENTIMENT_CACHE_PATH', '')
+
+        # Micro-batching of concurrent embedding and sentiment calls
+        cls.MICRO_BATCHING = os.getenv('MICRO_BATCHING', 'true').lower() == 'true'
+        cls.BATCH_MAX_WAIT_MS = float(os.getenv('BATCH_MAX_WAIT_MS', 5))
+        cls.EMBEDDING_BATCH_MAX = int(os.getenv('EMBEDDING_BATCH_MAX', 32))
+        cls.SENTIMENT_BATCH_MAX = int(os.getenv('SENTIMENT_BATCH_MAX', 8))
+
+        # Recent query embeddings (exact text), shared by FAQ lookup and retrieval
+        cls.QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', 5000))
+        cls.QUERY_EMBEDDING_CACHE_TTL_S = int(os.getenv('QUERY_EMBEDDING_CACHE_TTL_S', 3600))
+
+        # Singleflight: concurrent identical answers/retrievals/embeddings share one call
+        cls.SINGLEFLIGHT = os.getenv('SINGLEFLIGHT', 'true').lower() == 'true'
+
+        # Priority scheduling for /api/chat (frustrated/urgent customers first)
+        cls.SCHED_MAX_CONCURRENCY = int(os.getenv('SCHED_MAX_CONCURRENCY', 8))
+        cls.SCHED_RESERVED_HIGH = int(os.getenv('SCHED_RESERVED_HIGH', 2))
+        cls.SCHED_MAX_QUEUE_HIGH = int(os.getenv('SCHED_MAX_QUEUE_HIGH', 64))
+        cls.SCHED_MAX_QUEUE_NORMAL = int(os.getenv('SCHED_MAX_QUEUE_NORMAL', 16))
+        cls.SCHED_MAX_WAIT_HIGH_MS = int(os.getenv('SCHED_MAX_WAIT_HIGH_MS', 10000))
+        cls.SCHED_MAX_WAIT_NORMAL_MS = int(os.getenv('SCHED_MAX_WAIT_NORMAL_MS', 2000))
+
+        # Request deadline and graceful degradation
+        cls.REQUEST_DEADLINE_MS = int(os.getenv('REQUEST_DEADLINE_MS', 10000))
+        cls.SENTIMENT_TIMEOUT_MS = int(os.getenv('SENTIMENT_TIMEOUT_MS', 3000))
+        cls.GENERATION_MIN_BUDGET_MS = int(os.getenv('GENERATION_MIN_BUDGET_MS', 1500))
+        cls.ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', 1000))
+        cls.ANSWER_CACHE_TTL_S = int(os.getenv('ANSWER_CACHE_TTL_S', 900))
+
+        # Generation model routing: fast model for routine questions, strong model for
+        # upset customers and ambiguous/complex questions (agents/model_router.py)
+        cls.MODEL_ROUTING = os.getenv('MODEL_ROUTING', 'true').lower() == 'true'
+        cls.GENERATION_FAST_MODEL = os.getenv('GENERATION_FAST_MODEL', cls.GEMINI_MODEL)
+        cls.GENERATION_STRONG_MODEL = os.getenv('GENERATION_STRONG_MODEL', 'gemini-1.5-pro')
+        cls.ROUTING_STRONG_SENTIMENTS = os.getenv('ROUTING_STRONG_SENTIMENTS', 'frustrated,urgent,negative')
+        cls.ROUTING_MIN_SENTIMENT_CONFIDENCE = float(os.getenv('ROUTING_MIN_SENTIMENT_CONFIDENCE', 0.6))
+        cls.ROUTING_MAX_QUERY_WORDS = int(os.getenv('ROUTING_MAX_QUERY_WORDS', 30))
+        # Relative lead of the top hit over the runner-up, (s1 - s2) / s1
+        cls.ROUTING_MIN_MARGIN = float(os.getenv('ROUTING_MIN_MARGIN', 0.05))
+        cls.ROUTING_STRONG_MIN_BUDGET_MS = int(os.getenv('ROUTING_STRONG_MIN_BUDGET_MS', 4000))
+
+        # Extractive answers: quote the best sentences of a clearly winning knowledge
+        # base hit instead of calling Gemini (agents/extractive.py)
+        cls.EXTRACTIVE_ANSWERS = os.getenv('EXTRACTIVE_ANSWERS', 'true').lower() == 'true'
+        # Hybrid score of the top hit (semantic_weight * (cos + 1) + keyword part)
+        cls.EXTRACTIVE_MIN_SCORE = float(os.getenv('EXTRACTIVE_MIN_SCORE', 1.0))
+        cls.EXTRACTIVE_MIN_MARGIN = float(os.getenv('EXTRACTIVE_MIN_MARGIN', 0.1))
+        cls.EXTRACTIVE_MIN_COVERAGE = float(os.getenv('EXTRACTIVE_MIN_COVERAGE', 0.6))
+        cls.EXTRACTIVE_MAX_SENTENCES = int(os.getenv('EXTRACTIVE_MAX_SENTENCES', 3))
+        cls.EXTRACTIVE_EXCLUDE_SENTIMENTS = os.getenv('EXTRACTIVE_EXCLUDE_SENTIMENTS', 'frustrated,urgent')
+
+        # Precomputed answers for frequent questions (pipelines/build_faq_table.py):
+        # served when a query's embedding is this close (cosine) to an intent centroid
+        cls.FAQ_TABLE = os.getenv('FAQ_TABLE', 'true').lower() == 'true'
+        cls.FAQ_TABLE_PATH = os.getenv('FAQ_TABLE_PATH', str(Path(__file__).resolve().parent.parent / 'data' / 'faq' / 'faq-table.bin'))
+        cls.FAQ_MIN_SIMILARITY = float(os.getenv('FAQ_MIN_SIMILARITY', 0.92))
+        # Regenerate the answers in the background when the index generation changes
+        cls.FAQ_AUTO_REBUILD = os.getenv('FAQ_AUTO_REBUILD', 'true').lower() == 'true'
+        cls.FAQ_REBUILD_WORKERS = int(os.getenv('FAQ_REBUILD_WORKERS', 2))
+
+        # Startup / warm-up
+        cls.STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', 'true').lower() == 'true'
+        cls.STARTUP_WORKERS = int(os.getenv('STARTUP_WORKERS', 4))
+
+        # Event log: chat events are queued in memory and written in batches by a
+        # background thread to EVENT_SINK (jsonl | columnar | bigquery | pubsub | none)
+        cls.EVENT_SINK = os.getenv('EVENT_SINK', 'jsonl')
+        cls.EVENT_LOG_DIR = os.getenv('EVENT_LOG_DIR', str(Path(__file__).resolve().parent.parent / 'data' / 'events'))
+        cls.EVENT_QUEUE_SIZE = int(os.getenv('EVENT_QUEUE_SIZE', 10000))
+        cls.EVENT_BATCH_SIZE = int(os.getenv('EVENT_BATCH_SIZE', 500))
+        cls.EVENT_FLUSH_INTERVAL_MS = int(os.getenv('EVENT_FLUSH_INTERVAL_MS', 1000))
+
+        # Optional: BigQuery (EVENT_SINK=bigquery)
+        cls.BIGQUERY_DATASET = os.getenv('BIGQUERY_DATASET', 'sentiflow_analytics')
+        cls.BIGQUERY_TABLE = os.getenv('BIGQUERY_TABLE', 'conversation_logs')
+
+        # Optional: Pub/Sub (EVENT_SINK=pubsub)
+        cls.PUBSUB_TOPIC = os.getenv('PUBSUB_TOPIC', 'sentiflow-events')
+
+    @classmethod
+    def load(cls, env_path: Optional[Path] = None, validate: bool = True):
+        """
+        Load the .env file and refresh settings (idempotent)
+
+        Args:
+            env_path: Optional path to a .env file (defaults to ENV_PATH)
+            validate: If True, warn about missing required variables
+
+        Returns:
+            The Config class
+        """
+        if cls._loaded:
+            return cls
+
+        from dotenv import load_dotenv
+
+        load_dotenv(dotenv_path=env_path or ENV_PATH)
+        cls._read_environment()
+        cls._loaded = True
+
+        if validate:
+            try:
+                cls.validate()
+            except ValueError as e:
+                print(f"⚠️  Configuration Warning: {e}")
+
+        return cls
+
     @classmethod
     def validate(cls):
         """Validate required configuration"""
@@ -47,21 +233,24 @@ class Config:
             'ELASTIC_CLOUD_ID',
             'ELASTIC_API_KEY'
         ]
-        
+
         missing = [var for var in required_vars if not getattr(cls, var)]
-        
+
         if missing:
             raise ValueError(
                 f"Missing required environment variables: {', '.join(missing)}\n"
                 f"Please create a .env file based on .env.example"
             )
-        
+
         return True
 
 
-# Validate configuration on import
-if __name__ != '__main__':
-    try:
-        Config.validate()
-    except ValueError as e:
-        print(f"⚠️  Configuration Warning: {e}")
+# Populate defaults from the process environment (no file I/O, no validation)
+Config._read_environment()
+
+
+if __name__ == '__main__':
+    Config.load()
+    for name in sorted(vars(Config)):
+        if name.isupper() and 'KEY' not in name:
+            print(f"{name} = {getattr(Config, name)}")
@@ -0,0 +1,300 @@
+"""
+FAQ Table Builder
+Mines the most frequent intents from recent chat events (clustered by
+query embedding), answers each intent once per observed tone with the
+full RAG pipeline and writes the memory-mapped table /api/chat checks
+before running the pipeline
+"""
+
+import sys
+import os
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from operator import mul
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.faq import compile_faq_table, unit
+from utils.cache import normalize_text
+from config import Config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _file_date(path: Path) -> Optional[datetime]:
+    # events-YYYYMMDD.jsonl (jsonl sink) / events-YYYYMMDDTHHMMSS-... (columnar sink)
+    try:
+        return datetime.strptime(path.name[len("events-"):len("events-") + 8], "%Y%m%d")
+    except ValueError:
+        return None
+
+
+def iter_chat_events(directory: str, days: int) -> Iterator[Dict]:
+    """
+    Chat events of the last `days` days from the event log directory
+
+    Reads the jsonl sink's daily files and the columnar sink's JSON
+    fallback files (Parquet batches need pyarrow and are read with it
+    when installed).
+
+    Args:
+        directory: EVENT_LOG_DIR
+        days: How far back to read
+
+    Yields:
+        Event dictionaries of type "chat"
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    cutoff = since.strftime("%Y%m%d")
+    for path in sorted(Path(directory).glob("events-*")):
+        date = _file_date(path)
+        if date is None or date.strftime("%Y%m%d") < cutoff:
+            continue
+        if path.suffix == ".jsonl":
+            with open(path, encoding="utf-8") as f:
+                rows = (json.loads(line) for line in f if line.strip())
+                for event in rows:
+                    if event.get("type") == "chat":
+                        yield event
+        elif path.name.endswith(".columns.json"):
+            with open(path, encoding="utf-8") as f:
+                columns = json.load(f)["columns"]
+            yield from _column_rows(columns)
+        elif path.suffix == ".parquet":
+            try:
+                import pyarrow.parquet
+            except ImportError:
+                logger.warning(f"⚠️ Skipping {path.name}: reading Parquet needs pyarrow")
+                continue
+            yield from _column_rows(pyarrow.parquet.read_table(path).to_pydict())
+
+
+def _column_rows(columns: Dict[str, List]) -> Iterator[Dict]:
+    names = list(columns)
+    for values in zip(*(columns[name] for name in names)):
+        event = dict(zip(names, values))
+        if event.get("type") == "chat":
+            yield event
+
+
+def mine_intents(
+    events: Iterator[Dict],
+    embed: Callable[[List[str]], List[List[float]]],
+    max_queries: int = 5000,
+    cluster_threshold: float = 0.88,
+    min_count: int = 3,
+    max_intents: int = 300,
+    max_members: int = 20
+) -> Tuple[List[Dict], List[List[float]], Dict]:
+    """
+    Cluster chat queries into intents, most frequent first
+
+    Identical questions (after normalize_text) are counted once; the
+    `max_queries` most frequent are embedded and clustered greedily in
+    frequency order: a query joins the closest cluster whose centroid is
+    within `cluster_threshold` (cosine), otherwise it starts a new one.
+
+    Args:
+        events: Chat events (query, sentiment_label, sentiment_score, emotion)
+        embed: Callable embedding a list of queries (RETRIEVAL_QUERY)
+        max_queries: Distinct questions to embed
+        cluster_threshold: Minimum cosine similarity to join a cluster
+        min_count: Minimum questions per intent
+        max_intents: Intents to keep
+        max_members: Member questions stored per intent (for rebuilds)
+
+    Returns:
+        (intents, centroids, stats)
+    """
+    groups: Dict[str, Dict] = {}
+    total = 0
+    for event in events:
+        query = (event.get("query") or "").strip()
+        if event.get("tenant") not in (None, Config.DEFAULT_TENANT) or not query:
+            continue
+        total += 1
+        group = groups.setdefault(normalize_text(query), {"count": 0, "forms": Counter(), "tones": {}})
+        group["count"] += 1
+        group["forms"][query] += 1
+        label = event.get("sentiment_label") or "neutral"
+        tone = group["tones"].setdefault(label, {"count": 0, "score": 0.0, "emotions": Counter()})
+        tone["count"] += 1
+        tone["score"] += event.get("sentiment_score") or 0.5
+        tone["emotions"][event.get("emotion") or "unknown"] += 1
+
+    ranked = sorted(groups.values(), key=lambda group: group["count"], reverse=True)[:max_queries]
+    texts = [group["forms"].most_common(1)[0][0] for group in ranked]
+    logger.info(f"🔎 {total} chat queries, {len(groups)} distinct; clustering the top {len(ranked)}")
+
+    vectors = []
+    for start in range(0, len(texts), 100):
+        vectors.extend(unit(vector) for vector in embed(texts[start:start + 100]))
+
+    clusters: List[Dict] = []
+    for index, vector in enumerate(vectors):
+        best, best_similarity = None, cluster_threshold
+        for cluster in clusters:
+            similarity = sum(map(mul, vector, cluster["centroid"]))
+            if similarity >= best_similarity:
+                best, best_similarity = cluster, similarity
+        weight = ranked[index]["count"]
+        if best is None:
+            clusters.append({"sum": [v * weight for v in vector], "centroid": vector, "members": [index]})
+        else:
+            best["sum"] = [a + v * weight for a, v in zip(best["sum"], vector)]
+            best["centroid"] = unit(best["sum"])
+            best["members"].append(index)
+
+    for cluster in clusters:
+        cluster["count"] = sum(ranked[i]["count"] for i in cluster["members"])
+    kept = sorted(
+        (cluster for cluster in clusters if cluster["count"] >= min_count),
+        key=lambda cluster: cluster["count"],
+        reverse=True
+    )[:max_intents]
+
+    intents = []
+    for cluster in kept:
+        members = cluster["members"]
+        tones: Dict[str, Dict] = {}
+        for i in members:
+            for label, tone in ranked[i]["tones"].items():
+                merged = tones.setdefault(label, {"count": 0, "score": 0.0, "emotions": Counter()})
+                merged["count"] += tone["count"]
+                merged["score"] += tone["score"]
+                merged["emotions"].update(tone["emotions"])
+        intents.append({
+            "query": texts[members[0]],
+            "count": cluster["count"],
+            "members": [{"query": texts[i], "count": ranked[i]["count"]} for i in members[:max_members]],
+            "tones": {
+                label: {
+                    "count": tone["count"],
+                    "score": round(tone["score"] / tone["count"], 3),
+                    "emotion": tone["emotions"].most_common(1)[0][0]
+                }
+                for label, tone in tones.items()
+            }
+        })
+
+    covered = sum(intent["count"] for intent in intents)
+    stats = {
+        "chat_queries": total,
+        "distinct_queries": len(groups),
+        "clusters": len(clusters),
+        "intents": len(intents),
+        "coverage": round(covered / total, 4) if total else 0.0
+    }
+    logger.info(f"🧭 {len(intents)} intents cover {stats['coverage']:.0%} of chat queries")
+    return intents, [cluster["centroid"] for cluster in kept], stats
+
+
+def build_faq_table(
+    generator,
+    path: Optional[str] = None,
+    events_dir: Optional[str] = None,
+    days: int = 14,
+    max_intents: int = 300,
+    min_count: int = 3,
+    cluster_threshold: float = 0.88,
+    workers: int = 4,
+    events: Optional[Iterator[Dict]] = None
+) -> Dict:
+    """
+    Mine intents from recent traffic and write the FAQ table
+
+    Args:
+        generator: ResponseGenerator over the default knowledge base
+        path: Table file (FAQ_TABLE_PATH if None)
+        events_dir: Event log directory (EVENT_LOG_DIR if None)
+        days: Days of chat events to mine
+        max_intents: Intents to precompute
+        min_count: Minimum questions per intent
+        cluster_threshold: Minimum cosine similarity within an intent
+        workers: Concurrent answer generations
+        events: Chat events to mine instead of reading events_dir
+
+    Returns:
+        Dictionary with mining and table statistics
+
+    Raises:
+        RuntimeError: if no intent reaches min_count
+    """
+    path = path or Config.FAQ_TABLE_PATH
+    try:
+        if events is None:
+            events = iter_chat_events(events_dir or Config.EVENT_LOG_DIR, days)
+        intents, centroids, stats = mine_intents(
+            events,
+            generator.retriever.generate_query_embeddings,
+            cluster_threshold=cluster_threshold,
+            min_count=min_count,
+            max_intents=max_intents
+        )
+        if not intents:
+            raise RuntimeError(f"No intent with at least {min_count} questions in the last {days} days")
+        header = compile_faq_table(path, intents, generator, centroids=centroids, workers=workers)
+        stats.update({
+            "path": path,
+            "answers": header["entries"],
+            "labels": header["labels"],
+            "generation": header["generation"],
+            "bytes": os.path.getsize(path)
+        })
+        return stats
+
+    except Exception as e:
+        logger.error(f"❌ FAQ table build failed: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    """
+    Usage:
+        python build_faq_table.py --days 14 --max-intents 300
+        python build_faq_table.py --events-dir /mnt/events --min-count 5 --workers 8
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Precompute answers for the most frequent chat intents')
+    parser.add_argument('--output', default=None, help='Table file (default: FAQ_TABLE_PATH)')
+    parser.add_argument('--events-dir', default=None, help='Event log directory (default: EVENT_LOG_DIR)')
+    parser.add_argument('--days', type=int, default=14, help='Days of chat events to mine')
+    parser.add_argument('--max-intents', type=int, default=300, help='Intents to precompute')
+    parser.add_argument('--min-count', type=int, default=3, help='Minimum questions per intent')
+    parser.add_argument(
+        '--cluster-threshold',
+        type=float,
+        default=0.88,
+        help='Minimum cosine similarity between a question and its intent'
+    )
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent answer generations')
+
+    args = parser.parse_args()
+    Config.load()
+
+    from agents.generator import ResponseGenerator
+
+    try:
+        stats = build_faq_table(
+            ResponseGenerator(),
+            path=args.output,
+            events_dir=args.events_dir,
+            days=args.days,
+            max_intents=args.max_intents,
+            min_count=args.min_count,
+            cluster_threshold=args.cluster_threshold,
+            workers=args.workers
+        )
+        print(json.dumps(stats, indent=2))
+    except Exception:
+        sys.exit(1)
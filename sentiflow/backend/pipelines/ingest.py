@@ -3,19 +3,24 @@ Document Ingestion Pipeline
 Processes documents, generates embeddings, and indexes them in Elasticsearch
 """
 
-import vertexai
-from vertexai.language_models import TextEmbeddingModel, TextEmbeddingInput
 import sys
 import os
+import time
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
 from datetime import datetime
 import logging
-from typing import List, Dict
+from typing import Callable, Iterator, List, Dict, Optional
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.elastic_client import ElasticClient
+from utils.document_parsers import parse_document, parser_for
+from utils.elastic_client import ElasticClient, compact_vector
+from utils.embedding_store import EmbeddingStore
+from utils.embeddings import build_embedding_provider
+from utils.metrics import REGISTRY, span
 from config import Config
 
 logging.basicConfig(
@@ -24,39 +29,74 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+PARSE_SECONDS = REGISTRY.histogram(
+    "sentiflow_parse_seconds",
+    "Time to extract text from one document, by format",
+    ("format",)
+)
+PARSED_PAGES = REGISTRY.counter(
+    "sentiflow_parsed_pages_total",
+    "Pages extracted by ingestion (1 per non-PDF file), by format",
+    ("format",)
+)
+
+# Parser processes are started fresh, never forked: ingestion runs inside the
+# multi-threaded server, and a forked child can inherit a lock another thread
+# held (logging, Elasticsearch client) and deadlock
+PARSE_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
 
 class DocumentIngestor:
     """
     Handles document ingestion pipeline:
-    1. Load documents from files
+    1. Parse documents (txt, Markdown, HTML, PDF; utils/document_parsers.py)
     2. Chunk text into manageable pieces
-    3. Generate embeddings using Vertex AI
+    3. Generate embeddings (Vertex AI or local model), reusing stored
+       vectors of unchanged chunks (utils/embedding_store.py)
     4. Index in Elasticsearch
     """
     
-    def __init__(self):
-        """Initialize Vertex AI and Elasticsearch clients"""
+    def __init__(self, embedder=None, es_client: ElasticClient = None, embedding_store: EmbeddingStore = None):
+        """
+        Initialize embedding provider and Elasticsearch client
+        
+        Args:
+            embedder: Embedding provider (EMBEDDING_PROVIDER's, created if None)
+            es_client: Shared ElasticClient (created if None)
+            embedding_store: Shared EmbeddingStore (created if None and
+                EMBEDDING_STORE is on)
+        """
         try:
-            # Initialize Vertex AI
-            vertexai.init(
-                project=Config.GCP_PROJECT_ID,
-                location=Config.VERTEX_AI_LOCATION
-            )
-            
-            # Initialize embedding model
-            self.embedding_model = TextEmbeddingModel.from_pretrained(
-                Config.EMBEDDING_MODEL
-            )
+            # Initialize embedding provider
+            self.embedder = embedder or build_embedding_provider()
             
             # Initialize Elasticsearch client
-            self.es_client = ElasticClient()
+            self.es_client = es_client or ElasticClient()
             
-            logger.info(f"✅ Initialized DocumentIngestor with {Config.EMBEDDING_MODEL}")
+            # Vectors of chunks embedded by earlier ingestions
+            self.embedding_store = embedding_store or (EmbeddingStore() if Config.EMBEDDING_STORE else None)
+            
+            # Running totals (progress reporting)
+            self.embedded = 0
+            self.bulk_errors = 0
+            
+            logger.info(f"✅ Initialized DocumentIngestor with {self.embedder.provider}/{self.embedder.model_name}")
             
         except Exception as e:
             logger.error(f"❌ Failed to initialize DocumentIngestor: {str(e)}")
             raise
     
+    @staticmethod
+    def _words(text: str) -> List[str]:
+        """Words with the separator that follows them (' ' or a line break)"""
+        words = []
+        for line in text.splitlines():
+            line_words = line.split()
+            if line_words:
+                words.extend(word + ' ' for word in line_words[:-1])
+                words.append(line_words[-1] + '\n')
+        return words
+    
     def chunk_text(
         self,
         text: str,
@@ -74,36 +114,70 @@ class DocumentIngestor:
         Returns:
             List of text chunks
         """
-        words = text.split()
+        # Line breaks survive so headings and list items stay recognizable
+        # (extractive answers)
+        words = self._words(text)
         chunks = []
         
         for i in range(0, len(words), chunk_size - overlap):
-            chunk = ' '.join(words[i:i + chunk_size])
+            chunk = ''.join(words[i:i + chunk_size]).strip()
             if chunk:  # Only add non-empty chunks
                 chunks.append(chunk)
         
         logger.debug(f"📄 Split text into {len(chunks)} chunks")
         return chunks
     
+    def chunk_document(
+        self,
+        parsed: Dict,
+        chunk_size: int = 500,
+        overlap: int = 50
+    ) -> List[Dict]:
+        """
+        Split a parsed document into overlapping chunks with section metadata
+        
+        Chunks are cut exactly like chunk_text over the whole document
+        (headings on their own lines); each chunk is labelled with the
+        section (and PDF page) its first word belongs to.
+        
+        Args:
+            parsed: Result of parse_document
+            chunk_size: Number of words per chunk
+            overlap: Number of words to overlap between chunks
+            
+        Returns:
+            List of {"text", "section", "page"}
+        """
+        words = []
+        owners = []
+        for index, section in enumerate(parsed["sections"]):
+            text = f"{section['heading']}\n{section['text']}" if section["heading"] else section["text"]
+            section_words = self._words(text)
+            words.extend(section_words)
+            owners.extend([index] * len(section_words))
+        
+        chunks = []
+        for i in range(0, len(words), chunk_size - overlap):
+            chunk = ''.join(words[i:i + chunk_size]).strip()
+            if chunk:
+                section = parsed["sections"][owners[i]]
+                chunks.append({"text": chunk, "section": section["heading"].rstrip(":"), "page": section.get("page")})
+        
+        logger.debug(f"📄 Split {parsed['path']} into {len(chunks)} chunks")
+        return chunks
+    
     def generate_embedding(self, text: str) -> List[float]:
         """
-        Generate embedding vector using Vertex AI
+        Generate embedding vector with the embedding provider
         
         Args:
             text: Text to embed
             
         Returns:
-            List of floats (embedding vector, 768 dimensions)
+            List of floats (embedding vector, EMBEDDING_DIMENSIONS long)
         """
         try:
-            # Create embedding input
-            inputs = [TextEmbeddingInput(text=text, task_type="RETRIEVAL_DOCUMENT")]
-            
-            # Generate embeddings
-            embeddings = self.embedding_model.get_embeddings(inputs)
-            
-            # Extract values
-            embedding_values = embeddings[0].values
+            embedding_values = self.generate_embeddings_batch([text])[0]
             
             logger.debug(f"🔢 Generated embedding with {len(embedding_values)} dimensions")
             
@@ -117,6 +191,8 @@ class DocumentIngestor:
         """
         Generate embeddings for multiple texts (more efficient)
         
+        Texts already in the embedding store are not sent to the provider.
+        
         Args:
             texts: List of texts to embed
             
@@ -124,19 +200,17 @@ class DocumentIngestor:
             List of embedding vectors
         """
         try:
-            # Create inputs
-            inputs = [
-                TextEmbeddingInput(text=text, task_type="RETRIEVAL_DOCUMENT")
-                for text in texts
-            ]
-            
-            # Generate embeddings (API handles batching)
-            embeddings = self.embedding_model.get_embeddings(inputs)
-            
-            # Extract values
-            embedding_values = [emb.values for emb in embeddings]
-            
-            logger.info(f"🔢 Generated {len(embedding_values)} embeddings")
+            # Provider handles batching (one Vertex call / parallel local batches)
+            if self.embedding_store is None:
+                embedding_values = self.embedder.embed(texts, "RETRIEVAL_DOCUMENT")
+                generated = len(embedding_values)
+                logger.info(f"🔢 Generated {generated} embeddings")
+            else:
+                misses = self.embedding_store.misses
+                embedding_values = self.embedding_store.embed(self.embedder, texts, "RETRIEVAL_DOCUMENT")
+                generated = self.embedding_store.misses - misses
+                logger.info(f"🔢 Generated {generated} embeddings, {len(texts) - generated} from the embedding store")
+            self.embedded += generated
             
             return embedding_values
             
@@ -153,46 +227,72 @@ class DocumentIngestor:
         Ingest a single document file
         
         Args:
-            file_path: Path to document file
+            file_path: Path to document file (any registered format)
             category: Document category
             
         Returns:
             Number of chunks indexed
         """
         try:
-            # Read file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            with span("ingest.parse"):
+                parsed = parse_document(file_path)
+            self._record_parse(parsed)
+            return self.ingest_parsed(parsed, category)
             
+        except Exception as e:
+            logger.error(f"❌ Error ingesting document {file_path}: {str(e)}")
+            raise
+    
+    def ingest_parsed(self, parsed: Dict, category: str = "general") -> int:
+        """
+        Chunk, embed and index an already parsed document
+        
+        Args:
+            parsed: Result of parse_document
+            category: Document category
+            
+        Returns:
+            Number of chunks indexed
+        """
+        file_path = parsed["path"]
+        try:
             logger.info(f"📖 Reading: {file_path}")
             
             # Chunk text
-            chunks = self.chunk_text(content)
+            with span("ingest.chunk"):
+                chunks = self.chunk_document(parsed)
             
             if not chunks:
                 logger.warning(f"⚠️  No chunks created for {file_path}")
                 return 0
             
             # Generate embeddings for all chunks (batch)
-            chunk_texts = chunks
-            embeddings = self.generate_embeddings_batch(chunk_texts)
+            chunk_texts = [chunk["text"] for chunk in chunks]
+            with span("ingest.embedding"):
+                embeddings = self.generate_embeddings_batch(chunk_texts)
             
             # Prepare documents for indexing
             documents = []
             for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
                 doc = {
-                    "text": chunk,
-                    "embedding": embedding,
+                    "text": chunk["text"],
+                    "embedding": compact_vector(embedding),
                     "source": Path(file_path).name,
                     "category": category,
                     "timestamp": datetime.utcnow().isoformat(),
-                    "title": f"{Path(file_path).stem} - Part {i+1}",
+                    "title": f"{parsed['title']} - Part {i+1}",
+                    "section": chunk["section"],
+                    "format": parsed["format"],
                     "chunk_index": i
                 }
+                if chunk["page"] is not None:
+                    doc["page"] = chunk["page"]
                 documents.append(doc)
             
             # Bulk index documents
-            success, failed = self.es_client.bulk_index_documents(documents)
+            with span("ingest.bulk_index"):
+                success, failed = self.es_client.bulk_index_documents(documents)
+            self.bulk_errors += failed
             
             logger.info(f"✅ Indexed {success} chunks from {Path(file_path).name}")
             
@@ -202,22 +302,102 @@ class DocumentIngestor:
             logger.error(f"❌ Error ingesting document {file_path}: {str(e)}")
             raise
     
+    @staticmethod
+    def _record_parse(parsed: Dict) -> None:
+        PARSE_SECONDS.observe(parsed["parse_s"], parsed["format"])
+        PARSED_PAGES.inc(parsed["format"], amount=parsed["pages"])
+    
+    def _parse_stream(self, files: List[Path], workers: int) -> Iterator[tuple]:
+        """
+        Parse files, yielding (path, parsed, error) as each one finishes
+        
+        CPU-heavy formats are parsed in a process pool (at most 2 files per
+        worker ahead of the consumer, so parsed text does not pile up);
+        light ones inline while the pool works. The time the consumer
+        spends waiting for parses is added to self._parse_wait_s.
+        """
+        heavy = [path for path in files if workers > 0 and parser_for(str(path))["cpu_heavy"]]
+        heavy_set = set(heavy)
+        light = [path for path in files if path not in heavy_set]
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(PARSE_START_METHOD)
+        ) if heavy else None
+        pending = {}
+        remaining = iter(heavy)
+        
+        def refill() -> None:
+            while len(pending) < workers * 2:
+                path = next(remaining, None)
+                if path is None:
+                    return
+                pending[pool.submit(parse_document, str(path))] = path
+        
+        try:
+            if pool is not None:
+                refill()
+            for path in light:
+                started = time.perf_counter()
+                try:
+                    parsed, error = parse_document(str(path)), None
+                except Exception as e:
+                    parsed, error = None, e
+                self._parse_wait_s += time.perf_counter() - started
+                yield path, parsed, error
+            while pending:
+                started = time.perf_counter()
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                self._parse_wait_s += time.perf_counter() - started
+                for future in done:
+                    path = pending.pop(future)
+                    refill()
+                    try:
+                        yield path, future.result(), None
+                    except Exception as e:
+                        yield path, None, e
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def find_files(folder: Path, file_pattern: Optional[str] = None) -> List[Path]:
+        """Files with a registered parser (matching file_pattern, else all recursively)"""
+        candidates = folder.glob(file_pattern) if file_pattern else folder.rglob("*")
+        return sorted(path for path in candidates if path.is_file() and parser_for(str(path)))
+    
     def ingest_folder(
         self,
         folder_path: str,
         category: str = "general",
-        file_pattern: str = "*.txt"
+        file_pattern: Optional[str] = None,
+        workers: Optional[int] = None,
+        progress: Optional[Callable[[Dict], None]] = None,
+        cancelled: Optional[Callable[[], bool]] = None
     ) -> Dict:
         """
         Ingest all documents from a folder
         
+        Parsed documents stream into chunking/embedding/indexing as their
+        parses finish, so parsing overlaps with the embedding calls.
+        
         Args:
             folder_path: Path to folder containing documents
             category: Category for all documents
-            file_pattern: File pattern to match (e.g., "*.txt", "*.md")
+            file_pattern: File pattern to match (e.g., "*.md"); all files
+                with a registered parser, recursively, if None
+            workers: Parser processes for HTML/PDF (INGEST_PARSE_WORKERS
+                if None; 0 parses everything inline)
+            progress: Called after each file with running totals
+                (files_total, files_done, failed_files, chunks, embeddings,
+                bulk_errors, elapsed_s, file)
+            cancelled: Checked before each file; when it returns True the
+                remaining files are skipped (chunks already indexed stay)
             
         Returns:
-            Dictionary with ingestion statistics
+            Dictionary with ingestion statistics, including per-format
+            parse throughput (pages/s per worker), the time spent
+            waiting for parses, embedding store hits and whether the
+            run was cancelled
         """
         try:
             folder = Path(folder_path)
@@ -226,33 +406,102 @@ class DocumentIngestor:
                 raise FileNotFoundError(f"Folder not found: {folder_path}")
             
             # Find matching files
-            files = list(folder.glob(file_pattern))
+            files = self.find_files(folder, file_pattern)
+            
+            workers = Config.INGEST_PARSE_WORKERS if workers is None else workers
+            store = self.embedding_store
             
             if not files:
-                logger.warning(f"⚠️  No files matching '{file_pattern}' in {folder_path}")
-                return {"total_files": 0, "total_chunks": 0, "failed_files": 0}
+                logger.warning(f"⚠️  No supported files matching '{file_pattern or '*'}' in {folder_path}")
+                stats = {
+                    "total_files": 0,
+                    "successful_files": 0,
+                    "failed_files": 0,
+                    "total_chunks": 0,
+                    "embeddings": 0,
+                    "bulk_errors": 0,
+                    "cancelled": False,
+                    "formats": {},
+                    "parse_workers": workers,
+                    "parse_wait_s": 0.0,
+                    "wall_s": 0.0
+                }
+                if store is not None:
+                    stats["embedding_store"] = {"hits": 0, "misses": 0, "hit_rate": None}
+                return stats
             
             logger.info(f"📁 Found {len(files)} files to ingest")
             
-            # Ingest each file
+            # Ingest each file as soon as it is parsed
             total_chunks = 0
             failed_files = 0
-            
-            for file_path in files:
+            formats: Dict[str, Dict] = {}
+            self._parse_wait_s = 0.0
+            store_before = (store.hits, store.misses) if store else (0, 0)
+            embedded_before, bulk_errors_before = self.embedded, self.bulk_errors
+            files_done = 0
+            was_cancelled = False
+            started = time.perf_counter()
+            
+            parse_stream = self._parse_stream(files, workers)
+            for file_path, parsed, error in parse_stream:
+                if cancelled is not None and cancelled():
+                    was_cancelled = True
+                    logger.warning(f"🛑 Ingestion cancelled after {files_done} of {len(files)} files")
+                    break
                 try:
-                    chunks = self.ingest_document(str(file_path), category)
-                    total_chunks += chunks
+                    if error is not None:
+                        raise error
+                    self._record_parse(parsed)
+                    stats = formats.setdefault(parsed["format"], {"files": 0, "pages": 0, "chars": 0, "parse_s": 0.0})
+                    stats["files"] += 1
+                    stats["pages"] += parsed["pages"]
+                    stats["chars"] += parsed["chars"]
+                    stats["parse_s"] += parsed["parse_s"]
+                    total_chunks += self.ingest_parsed(parsed, category)
                 except Exception as e:
                     logger.error(f"Failed to ingest {file_path.name}: {str(e)}")
                     failed_files += 1
+                files_done += 1
+                if progress is not None:
+                    progress({
+                        "files_total": len(files),
+                        "files_done": files_done,
+                        "failed_files": failed_files,
+                        "chunks": total_chunks,
+                        "embeddings": self.embedded - embedded_before,
+                        "bulk_errors": self.bulk_errors - bulk_errors_before,
+                        "elapsed_s": round(time.perf_counter() - started, 3),
+                        "file": str(file_path)
+                    })
+            # Stops the parser pool when cancelled
+            parse_stream.close()
+            
+            for stats in formats.values():
+                stats["pages_per_s"] = round(stats["pages"] / stats["parse_s"], 1) if stats["parse_s"] else None
+                stats["parse_s"] = round(stats["parse_s"], 3)
             
             # Summary
             stats = {
                 "total_files": len(files),
-                "successful_files": len(files) - failed_files,
+                "successful_files": files_done - failed_files,
                 "failed_files": failed_files,
-                "total_chunks": total_chunks
+                "total_chunks": total_chunks,
+                "embeddings": self.embedded - embedded_before,
+                "bulk_errors": self.bulk_errors - bulk_errors_before,
+                "cancelled": was_cancelled,
+                "formats": formats,
+                "parse_workers": workers,
+                "parse_wait_s": round(self._parse_wait_s, 3),
+                "wall_s": round(time.perf_counter() - started, 3)
             }
+            if store is not None:
+                hits, misses = store.hits - store_before[0], store.misses - store_before[1]
+                stats["embedding_store"] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None
+                }
             
             logger.info("=" * 60)
             logger.info("📊 Ingestion Summary:")
@@ -260,6 +509,17 @@ class DocumentIngestor:
             logger.info(f"  Successful: {stats['successful_files']}")
             logger.info(f"  Failed: {stats['failed_files']}")
             logger.info(f"  Total chunks indexed: {stats['total_chunks']}")
+            for name, format_stats in sorted(formats.items()):
+                logger.info(
+                    f"  {name}: {format_stats['files']} files, {format_stats['pages']} pages, "
+                    f"{format_stats['pages_per_s']} pages/s per worker"
+                )
+            logger.info(f"  Waiting on parsing: {stats['parse_wait_s']:.2f}s of {stats['wall_s']:.2f}s")
+            if store is not None:
+                logger.info(
+                    f"  Embeddings reused: {stats['embedding_store']['hits']} of "
+                    f"{stats['embedding_store']['hits'] + stats['embedding_store']['misses']}"
+                )
             logger.info("=" * 60)
             
             return stats
@@ -293,21 +553,43 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         '--pattern',
-        default='*.txt',
-        help='File pattern to match (default: *.txt)'
+        default=None,
+        help='File pattern to match (default: every supported format, recursively)'
+    )
+    parser.add_argument(
+        '--parse-workers',
+        type=int,
+        default=None,
+        help='Parser processes for HTML/PDF (default: INGEST_PARSE_WORKERS)'
+    )
+    parser.add_argument(
+        '--tenant',
+        default=None,
+        help='Tenant whose knowledge base receives the documents (default tenant if omitted)'
     )
     
     args = parser.parse_args()
+    Config.load()
     
-    # Create ingestor
-    ingestor = DocumentIngestor()
+    # Create ingestor (for a tenant: its own index, created from the template)
+    es_client = None
+    if args.tenant:
+        from utils.tenants import normalize_tenant_id, tenant_index_name
+        tenant = normalize_tenant_id(args.tenant)
+        es_client = ElasticClient().for_index(tenant_index_name(tenant))
+        if tenant != Config.DEFAULT_TENANT:
+            es_client.put_tenant_template()
+            es_client.ensure_index()
+    ingestor = DocumentIngestor(es_client=es_client)
+    ingestor.es_client.check_embedding_space()
     
     # Ingest documents
     try:
         stats = ingestor.ingest_folder(
             args.folder,
             category=args.category,
-            file_pattern=args.pattern
+            file_pattern=args.pattern,
+            workers=args.parse_workers
         )
         
         if stats['total_chunks'] > 0:
@@ -0,0 +1,180 @@
+"""
+Embedding Dimension Migration
+Copies a knowledge base index into a new index built for another embedding
+size or provider, either re-embedding every chunk or truncating the stored
+vectors
+"""
+
+import sys
+import os
+import math
+import logging
+from typing import Dict, List, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.elastic_client import ElasticClient, compact_vector
+from utils.embeddings import embedding_signature
+from utils.metrics import span
+from config import Config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def truncate_embedding(values: List[float], dims: int) -> List[float]:
+    """
+    First `dims` components of a vector, renormalized to unit length
+
+    text-embedding-004 is trained so that its leading components carry
+    most of the signal; output_dimensionality returns the same prefix.
+    """
+    head = list(values[:dims])
+    norm = math.sqrt(sum(v * v for v in head)) or 1.0
+    return [v / norm for v in head]
+
+
+def migrate_embeddings(
+    source: str,
+    target: str,
+    dims: int,
+    truncate: bool = False,
+    batch_size: int = 100,
+    ingestor=None,
+    es_client: Optional[ElasticClient] = None
+) -> Dict:
+    """
+    Rebuild `source` into `target` with `dims`-dimensional embeddings
+
+    Args:
+        source: Index (or alias) to read
+        target: Index to create and fill (must not exist)
+        dims: Embedding size of the target index
+        truncate: Reuse stored vectors (prefix + renormalize) instead of
+            calling the embedding model
+        batch_size: Chunks per embedding call / bulk request
+        ingestor: DocumentIngestor used to re-embed (created if None)
+        es_client: Shared ElasticClient (created if None)
+
+    Returns:
+        Dictionary with migration statistics
+
+    Raises:
+        ValueError: if the target exists, or truncation would grow vectors
+            or cross embedding providers/models
+    """
+    try:
+        es_client = es_client or ElasticClient()
+        source_client = es_client.for_index(source)
+        target_client = es_client.for_index(target)
+
+        source_dims = source_client.embedding_dims()
+        if source_dims is None:
+            raise ValueError(f"Source index not found: {source}")
+        if truncate and dims > source_dims:
+            raise ValueError(f"Cannot truncate {source_dims}-dim vectors to {dims} dims")
+        if truncate:
+            # Truncation keeps the source's embedding space; another provider needs re-embedding
+            source_meta = source_client.embedding_meta() or {}
+            source_model = (source_meta.get("embedding_provider", "vertex"), source_meta.get("embedding_model"))
+            expected = embedding_signature()
+            if source_model[1] and source_model != (expected["embedding_provider"], expected["embedding_model"]):
+                raise ValueError(
+                    f"Cannot truncate {'/'.join(source_model)} vectors into a "
+                    f"{expected['embedding_provider']}/{expected['embedding_model']} index; re-embed instead"
+                )
+        if target_client.es.indices.exists(index=target):
+            raise ValueError(f"Target index already exists: {target}")
+
+        # Mapping, ingestion and query embeddings all follow EMBEDDING_DIMENSIONS
+        Config.EMBEDDING_DIMENSIONS = dims
+        target_client.create_index()
+        if not truncate and ingestor is None:
+            from pipelines.ingest import DocumentIngestor
+            ingestor = DocumentIngestor(es_client=target_client)
+
+        logger.info(
+            f"🔁 Migrating {source} ({source_dims} dims) -> {target} ({dims} dims, "
+            f"{'truncate' if truncate else 're-embed'})"
+        )
+        migrated = 0
+        failed = 0
+        batch: List[Dict] = []
+
+        def flush() -> None:
+            nonlocal migrated, failed
+            if truncate:
+                vectors = [truncate_embedding(doc["embedding"], dims) for doc in batch]
+            else:
+                with span("migrate.embedding"):
+                    vectors = ingestor.generate_embeddings_batch([doc["text"] for doc in batch])
+            for doc, vector in zip(batch, vectors):
+                doc["embedding"] = compact_vector(vector)
+            with span("migrate.bulk_index"):
+                success, errors = target_client.bulk_index_documents(batch)
+            migrated += success
+            failed += errors
+            batch.clear()
+
+        for doc in source_client.iter_documents(batch_size=max(batch_size, 100)):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+        stats = {
+            "source": source,
+            "target": target,
+            "source_dims": source_dims,
+            "target_dims": dims,
+            "mode": "truncate" if truncate else "re-embed",
+            "migrated": migrated,
+            "failed": failed
+        }
+        logger.info(f"✅ Migrated {migrated} chunks ({failed} failed) into {target}")
+        return stats
+
+    except Exception as e:
+        logger.error(f"❌ Embedding migration failed: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    """
+    Usage:
+        python migrate_embeddings.py --dims 256
+        python migrate_embeddings.py --dims 128 --truncate --target sentiflow-kb-128d
+        EMBEDDING_PROVIDER=local python migrate_embeddings.py --dims 384 --target sentiflow-kb-minilm
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Migrate the knowledge base to another embedding size')
+    parser.add_argument('--dims', type=int, required=True, help='Target embedding dimensions')
+    parser.add_argument('--source', default=None, help='Source index (default: ELASTIC_INDEX_NAME)')
+    parser.add_argument('--target', default=None, help='Target index (default: <source>-<dims>d)')
+    parser.add_argument(
+        '--truncate',
+        action='store_true',
+        help='Truncate stored vectors instead of re-embedding (no embedding API calls)'
+    )
+    parser.add_argument('--batch-size', type=int, default=100, help='Chunks per batch')
+
+    args = parser.parse_args()
+    Config.load()
+
+    source = args.source or Config.ELASTIC_INDEX_NAME
+    target = args.target or f"{source}-{args.dims}d"
+    try:
+        migrate_embeddings(source, target, args.dims, truncate=args.truncate, batch_size=args.batch_size)
+    except Exception:
+        sys.exit(1)
+
+    logger.info(
+        f"🎯 Next: set EMBEDDING_PROVIDER={Config.EMBEDDING_PROVIDER}, EMBEDDING_DIMENSIONS={args.dims} "
+        f"and ELASTIC_INDEX_NAME={target}, then restart"
+    )
@@ -0,0 +1,206 @@
+"""
+Blue/Green Reindexing Pipeline
+Rebuilds the knowledge base into a new versioned index, warms it and
+atomically swaps the serving alias, so a full rebuild never takes search
+offline
+"""
+
+import sys
+import os
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.elastic_client import ElasticClient
+from config import Config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Representative customer questions used to warm a new index before it serves
+WARM_QUERIES = [
+    "What is your return policy?",
+    "How long does shipping take?",
+    "What does the warranty cover?",
+    "How do I reset my account password?",
+    "My order arrived damaged",
+    "Do you ship internationally?",
+]
+
+
+class RebuildCancelled(RuntimeError):
+    """The rebuild was cancelled while ingesting; the alias was not touched"""
+
+
+def warm_index(client: ElasticClient, retriever, queries: List[str], rounds: int = 2) -> float:
+    """
+    Run representative searches against an index before it takes traffic
+
+    Args:
+        client: Client for the new index
+        retriever: HybridRetriever providing query embeddings
+        queries: Warm-up questions
+        rounds: Times each question is searched
+
+    Returns:
+        Milliseconds spent warming
+    """
+    start = time.perf_counter()
+    embeddings = retriever.generate_query_embeddings(queries)
+    for _ in range(rounds):
+        for query, embedding in zip(queries, embeddings):
+            client.hybrid_search(query_text=query, query_embedding=embedding, k=5)
+    elapsed = (time.perf_counter() - start) * 1000
+    logger.info(f"🔥 Warmed {client.index_name} with {len(queries)} queries in {elapsed:.0f} ms")
+    return elapsed
+
+
+def rebuild_index(
+    folder: Optional[str] = None,
+    category: str = "knowledge_base",
+    file_pattern: Optional[str] = None,
+    alias: Optional[str] = None,
+    keep: int = 1,
+    warm_queries: Optional[List[str]] = None,
+    es_client: Optional[ElasticClient] = None,
+    ingestor=None,
+    retriever=None,
+    compact_embeddings: bool = False,
+    progress: Optional[Callable[[Dict], None]] = None,
+    cancelled: Optional[Callable[[], bool]] = None
+) -> Dict:
+    """
+    Build a new index version, then swap the alias to it
+
+    1. Create <alias>.v<timestamp> with bulk-load settings
+    2. Ingest the folder into it (skipped for an empty rebuild)
+    3. Restore serving settings, refresh, merge, warm
+    4. Swap the alias atomically; running apps notice the new version and
+       drop their answer caches (INDEX_WATCH_INTERVAL_S)
+    5. Delete older versions beyond `keep`
+    6. Optionally drop stored embeddings of chunks no longer in the folder
+
+    Args:
+        folder: Documents to ingest (None = empty knowledge base)
+        category: Category for the ingested documents
+        file_pattern: File pattern to match (every supported format if None)
+        alias: Serving alias (ELASTIC_INDEX_NAME if None)
+        keep: Previous versions kept for rollback
+        warm_queries: Warm-up questions (WARM_QUERIES if None)
+        es_client: Shared ElasticClient (created if None)
+        ingestor: DocumentIngestor whose embedding model is reused (created if None)
+        retriever: HybridRetriever used for warm-up (created if None)
+        compact_embeddings: Compact the embedding store to this rebuild's
+            chunks (only when EMBEDDING_STORE_DIR serves this knowledge
+            base alone)
+        progress: Per-file progress callback (see DocumentIngestor.ingest_folder)
+        cancelled: Checked before each file; cancelling discards the new index
+
+    Returns:
+        Dictionary with rebuild statistics
+
+    Raises:
+        RuntimeError: if documents were given but nothing was indexed
+            (the alias is left untouched)
+        RebuildCancelled: if `cancelled` returned True during ingestion
+    """
+    es_client = (es_client or ElasticClient()).for_index(alias or Config.ELASTIC_INDEX_NAME)
+    new_client = es_client.create_version()
+    try:
+        chunks = 0
+        ingested = {}
+        if folder:
+            from pipelines.ingest import DocumentIngestor
+            if ingestor is None:
+                ingestor = DocumentIngestor(es_client=new_client)
+            else:
+                ingestor = DocumentIngestor(
+                    embedder=ingestor.embedder,
+                    es_client=new_client,
+                    embedding_store=ingestor.embedding_store
+                )
+            ingested = ingestor.ingest_folder(
+                folder,
+                category=category,
+                file_pattern=file_pattern,
+                progress=progress,
+                cancelled=cancelled
+            )
+            chunks = ingested["total_chunks"]
+            if ingested.get("cancelled"):
+                raise RebuildCancelled(f"Rebuild of {es_client.index_name} cancelled; keeping the current index")
+            if chunks == 0:
+                raise RuntimeError(f"No documents indexed from {folder}; keeping the current index")
+
+        new_client.finish_bulk_load()
+
+        warm_ms = 0.0
+        if chunks:
+            if retriever is None:
+                from agents.retriever import HybridRetriever
+                retriever = HybridRetriever(embedder=ingestor.embedder, es_client=new_client)
+            warm_ms = warm_index(new_client, retriever, warm_queries or WARM_QUERIES)
+    except Exception as e:
+        logger.error(f"❌ Rebuild failed, removing {new_client.index_name}: {str(e)}")
+        new_client.delete_index()
+        raise
+
+    previous = es_client.swap_alias(new_client.index_name)
+    deleted = es_client.garbage_collect(keep=keep)
+    if compact_embeddings and folder and ingestor.embedding_store is not None:
+        ingestor.embedding_store.compact(used_only=True)
+
+    stats = {
+        "alias": es_client.index_name,
+        "index": new_client.index_name,
+        "previous": previous,
+        "deleted": deleted,
+        "chunks": chunks,
+        "formats": ingested.get("formats", {}),
+        "parse_wait_s": ingested.get("parse_wait_s", 0.0),
+        "embedding_store": ingested.get("embedding_store"),
+        "warm_ms": round(warm_ms, 1)
+    }
+    logger.info(f"✅ {es_client.index_name} now serves {new_client.index_name} ({chunks} chunks)")
+    return stats
+
+
+if __name__ == "__main__":
+    """
+    Usage:
+        python reindex.py ../../data/sample_docs
+        python reindex.py ../../data/sample_docs --tenant acme --keep 2
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Rebuild the knowledge base without downtime')
+    parser.add_argument('folder', help='Path to folder containing documents')
+    parser.add_argument('--category', default='knowledge_base', help='Category for documents')
+    parser.add_argument('--pattern', default=None, help='File pattern to match (default: every supported format)')
+    parser.add_argument('--tenant', default=None, help='Tenant whose knowledge base is rebuilt')
+    parser.add_argument('--keep', type=int, default=1, help='Previous versions kept for rollback')
+    parser.add_argument(
+        '--compact-embeddings',
+        action='store_true',
+        help='Drop stored embeddings of chunks that are no longer in the folder'
+    )
+
+    args = parser.parse_args()
+    Config.load()
+
+    alias = None
+    if args.tenant:
+        from utils.tenants import normalize_tenant_id, tenant_index_name
+        alias = tenant_index_name(normalize_tenant_id(args.tenant))
+
+    try:
+        rebuild_index(args.folder, category=args.category, file_pattern=args.pattern,
+                      alias=alias, keep=args.keep, compact_embeddings=args.compact_embeddings)
+    except Exception:
+        sys.exit(1)
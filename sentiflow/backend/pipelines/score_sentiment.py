@@ -0,0 +1,290 @@
+"""
+Bulk Sentiment Scoring Pipeline
+Scores historical tickets from a JSONL or CSV file with SentimentAnalyzer:
+streaming input, parallel batched model calls under a global rate limit,
+incremental output and checkpoints so an interrupted run resumes where it
+stopped
+"""
+
+import sys
+import os
+import csv
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket shared by all workers (rate = calls per second)"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a call is allowed"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _NoLimit:
+    def acquire(self) -> None:
+        pass
+
+
+class _RateLimitedModel:
+    """Gemini model wrapper: every generate_content call takes a limiter token"""
+
+    def __init__(self, model, limiter: RateLimiter):
+        self._model = model
+        self._limiter = limiter
+        self.calls = 0
+
+    def generate_content(self, *args, **kwargs):
+        self._limiter.acquire()
+        self.calls += 1
+        return self._model.generate_content(*args, **kwargs)
+
+
+def read_records(path: str, text_field: str, id_field: str) -> Iterator[Tuple[str, str]]:
+    """
+    Stream (id, text) pairs from a .jsonl or .csv file
+
+    Records without an id get their 1-based position as id.
+    """
+    suffix = Path(path).suffix.lower()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if suffix == '.csv':
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for position, row in enumerate(rows, 1):
+            yield str(row.get(id_field) or position), (row.get(text_field) or '').strip()
+
+
+def load_checkpoint(path: Path) -> Dict:
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"records": 0, "output_bytes": 0, "failed": 0}
+
+
+def save_checkpoint(path: Path, state: Dict) -> None:
+    """Write the checkpoint atomically (a crash leaves the previous one)"""
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    tmp.write_text(json.dumps(dict(state, updated_at=datetime.utcnow().isoformat())))
+    os.replace(tmp, path)
+
+
+def score_file(
+    input_path: str,
+    output_path: str,
+    analyzer=None,
+    text_field: str = "message",
+    id_field: str = "id",
+    workers: int = 8,
+    rate: float = 0.0,
+    checkpoint_every: int = 1000,
+    include_text: bool = False,
+    restart: bool = False
+) -> Dict:
+    """
+    Score every record of input_path into output_path (JSONL)
+
+    Work is split into batches of SENTIMENT_BATCH_MAX messages (one model
+    call each) run by `workers` threads; results are written in input
+    order. Every `checkpoint_every` records the output is fsynced and the
+    position saved to <output>.checkpoint, so a rerun skips the records
+    already written (and drops any partial tail written after the last
+    checkpoint).
+
+    Args:
+        input_path: .jsonl or .csv file with one ticket per record
+        output_path: JSONL file receiving {"id", "label", "score", ...}
+        analyzer: SentimentAnalyzer (created with micro-batching off if None)
+        text_field: Field holding the message text
+        id_field: Field holding the ticket ID
+        workers: Concurrent model calls
+        rate: Global limit on model calls per second (0 = unlimited)
+        checkpoint_every: Records between checkpoints
+        include_text: Copy the message text into the output
+        restart: Ignore an existing checkpoint and overwrite the output
+
+    Returns:
+        Dictionary with scoring statistics
+    """
+    output = Path(output_path)
+    checkpoint_path = output.with_name(output.name + '.checkpoint')
+    state = {"records": 0, "output_bytes": 0, "failed": 0} if restart else load_checkpoint(checkpoint_path)
+    resumed_from = state["records"]
+
+    if analyzer is None:
+        from agents.sentiment import SentimentAnalyzer
+        # Batches are formed here; the request-path coalescer would only add latency
+        Config.MICRO_BATCHING = False
+        analyzer = SentimentAnalyzer()
+    model = _RateLimitedModel(analyzer.model, RateLimiter(rate) if rate > 0 else _NoLimit())
+    analyzer.model = model
+
+    # Drop anything written after the last checkpoint
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'a+b') as f:
+        f.truncate(state["output_bytes"])
+
+    if resumed_from:
+        logger.info(f"⏩ Resuming {input_path} after {resumed_from} records")
+
+    batch_size = max(1, Config.SENTIMENT_BATCH_MAX)
+    records = read_records(input_path, text_field, id_field)
+    for _ in range(resumed_from):
+        next(records, None)
+
+    def score(batch: List[Tuple[str, str]]) -> List[Dict]:
+        texts = [text for _, text in batch]
+        results = analyzer.analyze_many([text for text in texts if text])
+        scored = iter(results)
+        rows = []
+        for record_id, text in batch:
+            result = next(scored) if text else None
+            row = {"id": record_id}
+            if result is None:
+                row["error"] = "empty_text" if not text else "classification_failed"
+            else:
+                row.update({key: result.get(key) for key in ("label", "score", "emotion", "confidence")})
+            if include_text:
+                row["text"] = text
+            rows.append(row)
+        return rows
+
+    start = time.perf_counter()
+    last_report = start
+    written = 0
+    since_checkpoint = 0
+    pending: deque = deque()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="score") as pool, \
+            open(output, 'a', encoding='utf-8') as out:
+
+        def drain(block_until: int) -> None:
+            """Write finished batches in input order while more than block_until are pending"""
+            nonlocal written, since_checkpoint, last_report
+            while pending and (len(pending) > block_until or pending[0].done()):
+                rows = pending.popleft().result()
+                out.write(''.join(json.dumps(row) + '\n' for row in rows))
+                written += len(rows)
+                since_checkpoint += len(rows)
+                state["records"] += len(rows)
+                state["failed"] += sum(1 for row in rows if "error" in row)
+                if since_checkpoint >= checkpoint_every:
+                    out.flush()
+                    os.fsync(out.fileno())
+                    state["output_bytes"] = out.tell()
+                    save_checkpoint(checkpoint_path, state)
+                    since_checkpoint = 0
+                now = time.perf_counter()
+                if now - last_report >= 10:
+                    logger.info(f"📈 {state['records']} records, {written / (now - start):.1f} msg/s")
+                    last_report = now
+
+        batch: List[Tuple[str, str]] = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == batch_size:
+                pending.append(pool.submit(score, batch))
+                batch = []
+                # Bounded read-ahead: memory stays flat for any input size
+                drain(block_until=workers * 2)
+        if batch:
+            pending.append(pool.submit(score, batch))
+        drain(block_until=0)
+
+        out.flush()
+        os.fsync(out.fileno())
+        state["output_bytes"] = out.tell()
+        save_checkpoint(checkpoint_path, state)
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "input": input_path,
+        "output": str(output),
+        "resumed_from": resumed_from,
+        "scored": written,
+        "total_records": state["records"],
+        "failed": state["failed"],
+        "model_calls": model.calls,
+        "elapsed_s": round(elapsed, 2),
+        "messages_per_s": round(written / elapsed, 1) if elapsed > 0 else 0.0,
+        "cache": analyzer.cache_stats()
+    }
+    logger.info(
+        f"✅ Scored {written} records in {elapsed:.1f}s ({stats['messages_per_s']} msg/s, "
+        f"{model.calls} model calls, {state['failed']} failed in total)"
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    """
+    Usage:
+        python score_sentiment.py tickets.jsonl scores.jsonl --workers 16 --rate 20
+        python score_sentiment.py tickets.csv scores.jsonl --text-field body --id-field ticket_id
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Bulk sentiment scoring for historical tickets')
+    parser.add_argument('input', help='Input .jsonl or .csv file')
+    parser.add_argument('output', help='Output .jsonl file (resumed from <output>.checkpoint if present)')
+    parser.add_argument('--text-field', default='message', help='Field with the message text')
+    parser.add_argument('--id-field', default='id', help='Field with the ticket ID')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent model calls')
+    parser.add_argument('--rate', type=float, default=0.0, help='Max model calls per second (0 = unlimited)')
+    parser.add_argument('--checkpoint-every', type=int, default=1000, help='Records between checkpoints')
+    parser.add_argument('--include-text', action='store_true', help='Copy message text into the output')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start over')
+
+    args = parser.parse_args()
+    Config.load()
+
+    try:
+        stats = score_file(
+            args.input,
+            args.output,
+            text_field=args.text_field,
+            id_field=args.id_field,
+            workers=args.workers,
+            rate=args.rate,
+            checkpoint_every=args.checkpoint_every,
+            include_text=args.include_text,
+            restart=args.restart
+        )
+        print(json.dumps(stats, indent=2))
+    except Exception as e:
+        logger.error(f"❌ Scoring failed: {str(e)}")
+        sys.exit(1)
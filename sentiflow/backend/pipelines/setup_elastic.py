@@ -10,6 +10,8 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.elastic_client import ElasticClient
+from pipelines.reindex import rebuild_index
+from config import Config
 import logging
 
 logging.basicConfig(
@@ -27,8 +29,10 @@ def setup_elasticsearch():
         # Create client
         client = ElasticClient()
         
-        # Create index (will skip if already exists)
-        client.create_index(delete_if_exists=False)
+        # First version behind the ELASTIC_INDEX_NAME alias (skipped if the
+        # alias or a plain index with that name already exists)
+        if not client.alias_targets():
+            rebuild_index(es_client=client)
         
         # Verify setup
         count = client.get_document_count()
@@ -45,10 +49,18 @@ def setup_elasticsearch():
         return False
 
 
-def reset_elasticsearch():
-    """Delete and recreate the index (WARNING: Deletes all data!)"""
+def reset_elasticsearch(folder: str = None):
+    """
+    Replace the knowledge base with a fresh index version (WARNING: Deletes all data!)
+    
+    The new version is built and warmed while the current one keeps serving,
+    then the alias is swapped, so searches never fail during a reset.
+    
+    Args:
+        folder: Documents to load into the new version (empty if None)
+    """
     try:
-        logger.warning("⚠️  RESETTING Elasticsearch index - ALL DATA WILL BE DELETED!")
+        logger.warning("⚠️  RESETTING Elasticsearch index - ALL DATA WILL BE REPLACED!")
         
         response = input("Are you sure? Type 'yes' to confirm: ")
         if response.lower() != 'yes':
@@ -57,8 +69,8 @@ def reset_elasticsearch():
         
         client = ElasticClient()
         
-        # Delete and recreate
-        client.create_index(delete_if_exists=True)
+        # Build, warm and swap in a new version; drop the old one
+        rebuild_index(folder, es_client=client, keep=0)
         
         logger.info("✅ Index reset complete!")
         return True
@@ -75,12 +87,18 @@ if __name__ == "__main__":
     parser.add_argument(
         '--reset',
         action='store_true',
-        help='Delete and recreate index (WARNING: Deletes all data!)'
+        help='Replace the index with a new, empty version (WARNING: Deletes all data!)'
+    )
+    parser.add_argument(
+        '--folder',
+        default=None,
+        help='With --reset: documents to load into the new version before the swap'
     )
     
     args = parser.parse_args()
+    Config.load()
     
     if args.reset:
-        reset_elasticsearch()
+        reset_elasticsearch(args.folder)
     else:
         setup_elasticsearch()
@@ -0,0 +1,135 @@
+"""
+Micro-batching Utilities
+Coalesces concurrent single-item calls into batched backend calls
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Generic, List, Optional, Sequence, TypeVar
+
+from utils.metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+BATCH_SIZE = REGISTRY.histogram(
+    "sentiflow_batch_size",
+    "Items per coalesced backend call",
+    ("batcher",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 250)
+)
+BATCH_WAIT = REGISTRY.histogram(
+    "sentiflow_batch_wait_seconds",
+    "Time an item waited in the coalescer before its batch was dispatched",
+    ("batcher",)
+)
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Collects items submitted by concurrent callers and runs them as batches
+
+    A dispatcher thread takes the first waiting item, keeps collecting for
+    up to max_wait_ms or until max_batch items are queued, then hands the
+    batch to a small worker pool (so one slow batch does not stop the next
+    one from forming). batch_fn must return one result per item, in order;
+    an exception fails every future of that batch.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[T]], Sequence[R]],
+        name: str,
+        max_batch: int = 16,
+        max_wait_ms: float = 5.0,
+        max_concurrent_batches: int = 4
+    ):
+        """
+        Args:
+            batch_fn: Function processing a list of items
+            name: Label for the batch metrics
+            max_batch: Maximum items per batch
+            max_wait_ms: Maximum time to hold the first item of a batch
+            max_concurrent_batches: Batches allowed in flight at once
+        """
+        self.batch_fn = batch_fn
+        self.name = name
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_batches,
+            thread_name_prefix=f"batch-{name}"
+        )
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: T) -> Future:
+        """Queue an item; the future resolves to its result"""
+        if self._closed:
+            raise RuntimeError(f"MicroBatcher {self.name} is closed")
+        future: Future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def call(self, item: T, timeout: Optional[float] = None) -> R:
+        """Submit an item and block until its result is available"""
+        return self.submit(item).result(timeout=timeout)
+
+    def close(self) -> None:
+        """Stop the dispatcher after the queued items are flushed"""
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.perf_counter() + self.max_wait_s
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._executor.submit(self._dispatch, batch)
+            if stop:
+                return
+
+    def _dispatch(self, batch: List[tuple]) -> None:
+        now = time.perf_counter()
+        BATCH_SIZE.observe(len(batch), self.name)
+        for _, _, queued_at in batch:
+            BATCH_WAIT.observe(now - queued_at, self.name)
+
+        items = [item for item, _, _ in batch]
+        try:
+            results = list(self.batch_fn(items))
+            if len(results) != len(items):
+                raise ValueError(
+                    f"{self.name} batch returned {len(results)} results for {len(items)} items"
+                )
+        except Exception as e:
+            logger.error(f"❌ Batch {self.name} failed ({len(items)} items): {str(e)}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
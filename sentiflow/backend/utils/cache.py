@@ -0,0 +1,159 @@
+"""
+Caching Utilities
+Text normalization/keys, an in-process LRU cache with TTL and an optional
+on-disk store shared by worker processes
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_PUNCT_RE = re.compile(r"[^\w\s!]")
+_BANG_RE = re.compile(r"!+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize a message for cache lookups
+
+    Lowercases, applies NFKC, drops punctuation except '!' (collapsed to
+    one, since it carries intensity) and collapses whitespace, so
+    "Hello?" / "hello" / "  HELLO ?? " share a key.
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _PUNCT_RE.sub(" ", text)
+    text = _BANG_RE.sub(" !", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def cache_key(*parts: str) -> str:
+    """Stable 128-bit hex key for the given parts"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class TTLCache:
+    """
+    Thread-safe bounded LRU cache whose entries expire after ttl_s seconds
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl_s: float = 3600):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires = entry
+            if expires < now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl_s)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class DiskCache:
+    """
+    JSON values in a local SQLite file with per-entry expiry
+
+    SQLite handles locking, so several gunicorn workers on one host can
+    share the same file.
+    """
+
+    def __init__(self, path: str, ttl_s: float = 3600):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value FROM cache WHERE key = ? AND expires >= ?",
+                    (key, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Disk cache read failed: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any) -> None:
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time() + self.ttl_s)
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Disk cache write failed: {e}")
+
+    def purge_expired(self) -> int:
+        """Delete expired rows; returns the number removed"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
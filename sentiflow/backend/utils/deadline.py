@@ -0,0 +1,204 @@
+"""
+Request Deadline Utilities
+A per-request time budget carried in a context variable, so every stage
+(sentiment, embedding, search, generation) can derive its own timeout from
+what is left instead of using fixed, unrelated timeouts
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, TypeVar
+
+from utils.metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+DEADLINE_EXCEEDED = REGISTRY.counter(
+    "sentiflow_deadline_exceeded_total",
+    "Calls abandoned because the request budget ran out",
+    ("stage",)
+)
+
+ABANDONED_IN_FLIGHT = REGISTRY.gauge(
+    "sentiflow_deadline_abandoned_in_flight",
+    "Timed-out calls still holding a deadline executor thread",
+    ("stage",)
+)
+
+_current: contextvars.ContextVar = contextvars.ContextVar("sentiflow_deadline", default=None)
+# Absolute expiry of the call run_with_timeout is running on this thread
+_call_expires: contextvars.ContextVar = contextvars.ContextVar("sentiflow_call_expires", default=None)
+
+# Runs calls whose SDK method has no timeout argument (Gemini, Vertex
+# embeddings). Clients also get the call's budget as their own request
+# timeout (client_timeout), so a timed-out call does not keep its pool
+# thread much longer than the request that abandoned it
+EXECUTOR_WORKERS = 32
+_executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="deadline")
+_abandoned: Dict[str, int] = {}
+_abandoned_lock = threading.Lock()
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request budget does not allow (or did not allow) a stage to finish"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """Absolute point in time by which a request must be answered"""
+
+    def __init__(self, budget_s: float):
+        self.budget_s = budget_s
+        self.expires_at = time.monotonic() + budget_s
+
+    def remaining(self) -> float:
+        """Seconds left (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, cap: Optional[float] = None, reserve: float = 0.0) -> float:
+        """
+        Timeout for one call: what is left after `reserve` seconds are kept
+        for later stages, capped at `cap`
+        """
+        available = self.remaining() - reserve
+        if cap is not None:
+            available = min(cap, available)
+        return max(0.0, available)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the request being handled on this thread/context, if any"""
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(budget_s: float):
+    """
+    Make a deadline current for the block
+
+    An already active deadline is kept (an inner scope cannot extend the
+    outer budget), so library code can open a scope for direct callers
+    without overriding the one set by the HTTP layer.
+    """
+    existing = _current.get()
+    if existing is not None:
+        yield existing
+        return
+    deadline = Deadline(budget_s)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def stage_timeout(cap: Optional[float] = None, reserve: float = 0.0) -> Optional[float]:
+    """
+    Timeout for a call under the current deadline
+
+    Returns:
+        Seconds, `cap` if no deadline is active (None = no limit)
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return cap
+    return deadline.timeout(cap, reserve)
+
+
+def client_timeout() -> Optional[float]:
+    """
+    Request timeout for a backend client call
+
+    Inside run_with_timeout this is what is left of that call's timeout,
+    otherwise what is left of the current deadline (None = no limit).
+    """
+    expires = _call_expires.get()
+    if expires is None:
+        return stage_timeout()
+    return max(0.0, expires - time.monotonic())
+
+
+def abandoned_calls() -> Dict[str, int]:
+    """Timed-out calls per stage that are still running on the executor"""
+    with _abandoned_lock:
+        return {stage: n for stage, n in _abandoned.items() if n}
+
+
+def _track_abandoned(stage: str, future: Future) -> None:
+    """Count a timed-out call until its thread is released"""
+    def release(_future: Future) -> None:
+        with _abandoned_lock:
+            _abandoned[stage] -= 1
+            ABANDONED_IN_FLIGHT.set(_abandoned[stage], stage)
+
+    with _abandoned_lock:
+        _abandoned[stage] = _abandoned.get(stage, 0) + 1
+        ABANDONED_IN_FLIGHT.set(_abandoned[stage], stage)
+        total = sum(_abandoned.values())
+    logger.warning(
+        f"⏳ Abandoned {stage} call still in flight "
+        f"({total} of {EXECUTOR_WORKERS} deadline workers held by timed-out calls)"
+    )
+    future.add_done_callback(release)
+
+
+def run_with_timeout(stage: str, fn: Callable[[], R], timeout: Optional[float]) -> R:
+    """
+    Run fn, giving up after `timeout` seconds
+
+    The call runs on a helper thread (with the caller's context, so spans
+    still land in the request trace, and client_timeout() returns the
+    call's budget). None runs it inline without a limit.
+
+    Raises:
+        DeadlineExceeded: if the timeout is zero or elapses
+    """
+    if timeout is None:
+        return fn()
+    if timeout <= 0:
+        DEADLINE_EXCEEDED.inc(stage)
+        raise DeadlineExceeded(stage)
+    expires = time.monotonic() + timeout
+
+    def call() -> R:
+        _call_expires.set(expires)
+        return fn()
+
+    future = _executor.submit(contextvars.copy_context().run, call)
+    try:
+        return wait_for(stage, future, timeout)
+    except DeadlineExceeded:
+        if not future.done():
+            _track_abandoned(stage, future)
+        raise
+
+
+def wait_for(stage: str, future: Future, timeout: Optional[float]):
+    """
+    Wait for a future within `timeout` seconds (None = no limit)
+
+    Raises:
+        DeadlineExceeded: if the timeout is zero or elapses
+    """
+    if timeout is not None and timeout <= 0:
+        DEADLINE_EXCEEDED.inc(stage)
+        raise DeadlineExceeded(stage)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        DEADLINE_EXCEEDED.inc(stage)
+        raise DeadlineExceeded(stage)
@@ -0,0 +1,335 @@
+"""
+Document Parsers
+Extract text, title and sections from knowledge base files: plain text,
+Markdown, HTML help-center exports and PDF text layers. Parsers are
+registered per file extension; CPU-heavy ones (HTML, PDF) are run in a
+process pool by the ingestion pipeline.
+"""
+
+import re
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# extension -> {"format", "parse", "cpu_heavy"}
+PARSERS: Dict[str, Dict] = {}
+
+
+def register_parser(format_name: str, *extensions: str, cpu_heavy: bool = False):
+    """
+    Register a parser function for file extensions
+
+    The function takes a path and returns {"title", "sections", "pages"};
+    sections are [{"heading", "text", "page"}] in document order.
+
+    Args:
+        format_name: Label for statistics (txt, md, html, pdf, ...)
+        extensions: File extensions including the dot (".md")
+        cpu_heavy: Run in the ingestion process pool instead of inline
+    """
+    def decorator(parse: Callable[[str], Dict]) -> Callable[[str], Dict]:
+        for extension in extensions:
+            PARSERS[extension.lower()] = {"format": format_name, "parse": parse, "cpu_heavy": cpu_heavy}
+        return parse
+    return decorator
+
+
+def parser_for(path: str) -> Optional[Dict]:
+    """Registered parser for a file (None if the extension is unsupported)"""
+    return PARSERS.get(Path(path).suffix.lower())
+
+
+def parse_document(path: str) -> Dict:
+    """
+    Parse one file with its registered parser
+
+    Args:
+        path: Document file
+
+    Returns:
+        Dictionary with path, format, title, sections, pages, chars and
+        parse_s (seconds spent parsing)
+
+    Raises:
+        ValueError: if no parser handles the file's extension
+    """
+    parser = parser_for(path)
+    if parser is None:
+        raise ValueError(f"No parser registered for {Path(path).suffix or 'files without extension'}: {path}")
+    started = time.perf_counter()
+    parsed = parser["parse"](path)
+    sections = [section for section in parsed["sections"] if section["text"].strip() or section["heading"]]
+    return {
+        "path": path,
+        "format": parser["format"],
+        "title": parsed.get("title") or Path(path).stem,
+        "sections": sections,
+        "pages": parsed.get("pages") or 1,
+        "chars": sum(len(section["text"]) for section in sections),
+        "parse_s": time.perf_counter() - started
+    }
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def _section(heading: str, lines: List[str], page: Optional[int] = None) -> Dict:
+    return {"heading": heading, "text": "\n".join(lines).strip(), "page": page}
+
+
+# ---------------------------------------------------------------------------
+# Plain text
+# ---------------------------------------------------------------------------
+
+_TEXT_HEADING_WORDS = 8
+
+
+def _is_text_heading(line: str) -> bool:
+    """ALL CAPS lines and short lead-ins ending with ':' ("Return Window:")"""
+    words = line.split()
+    if not words or len(words) > _TEXT_HEADING_WORDS or line.startswith(("-", "*", "•")):
+        return False
+    letters = [c for c in line if c.isalpha()]
+    return line.endswith(":") or (len(letters) > 2 and all(c.isupper() for c in letters))
+
+
+@register_parser("txt", ".txt", ".text")
+def parse_text(path: str) -> Dict:
+    """Plain text: the title is the file name, heading-like lines start sections"""
+    sections = []
+    heading, lines = "", []
+    for line in _read_text(path).splitlines():
+        stripped = line.strip()
+        if _is_text_heading(stripped):
+            sections.append(_section(heading, lines))
+            # Kept as written so chunks match the file; chunk metadata drops the colon
+            heading, lines = stripped, []
+        else:
+            lines.append(line.rstrip())
+    sections.append(_section(heading, lines))
+    return {"title": None, "sections": sections}
+
+
+# ---------------------------------------------------------------------------
+# Markdown
+# ---------------------------------------------------------------------------
+
+_MD_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_MD_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_MD_LINK_RE = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+_MD_EMPHASIS_RE = re.compile(r"(\*\*|__|`)")
+_MD_LIST_RE = re.compile(r"^(\s*)[*+]\s+")
+
+
+def _markdown_inline(line: str) -> str:
+    line = _MD_IMAGE_RE.sub("", line)
+    line = _MD_LINK_RE.sub(r"\1", line)
+    line = _MD_EMPHASIS_RE.sub("", line)
+    return _MD_LIST_RE.sub(r"\1- ", line)
+
+
+@register_parser("md", ".md", ".markdown")
+def parse_markdown(path: str) -> Dict:
+    """Markdown: '#' headings start sections; the front matter title or first H1 is the title"""
+    lines = _read_text(path).splitlines()
+    title = None
+    if lines and lines[0].strip() == "---":
+        # YAML front matter (title: ...)
+        for end in range(1, len(lines)):
+            if lines[end].strip() == "---":
+                for meta in lines[1:end]:
+                    if meta.lower().startswith("title:"):
+                        title = meta.split(":", 1)[1].strip().strip("\"'")
+                lines = lines[end + 1:]
+                break
+
+    sections = []
+    heading, body = "", []
+    in_code = False
+    for line in lines:
+        if line.strip().startswith("```"):
+            in_code = not in_code
+            continue
+        match = None if in_code else _MD_HEADING_RE.match(line)
+        if match:
+            sections.append(_section(heading, body))
+            heading, body = _markdown_inline(match.group(2)), []
+            if title is None and len(match.group(1)) == 1:
+                title = heading
+        else:
+            body.append(line.rstrip() if in_code else _markdown_inline(line.rstrip()))
+    sections.append(_section(heading, body))
+    return {"title": title, "sections": sections}
+
+
+# ---------------------------------------------------------------------------
+# HTML
+# ---------------------------------------------------------------------------
+
+_HTML_SKIP = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form", "button"}
+_HTML_HEADINGS = {"h1", "h2", "h3", "h4"}
+_HTML_BLOCKS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "tr", "table", "br", "hr",
+    "blockquote", "pre", "dd", "dt", "h5", "h6", "details", "summary", "figcaption"
+}
+_HTML_CONTENT = {"main", "article"}
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class _HelpCenterHTML(HTMLParser):
+    """
+    Text of an HTML page split at h1-h4, without navigation and page chrome
+
+    If the page has <main> or <article> elements only their content is
+    kept (help-center exports wrap the article in site navigation).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.first_h1 = ""
+        self._skip_depth = 0
+        self._content_depth = 0
+        self._saw_content = False
+        self._in_title = False
+        self._heading_tag = None
+        self._heading = []
+        # (in main/article, heading or None, line)
+        self.items = []
+        self._line = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _HTML_SKIP:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in _HTML_CONTENT:
+            self._content_depth += 1
+            self._saw_content = True
+        if tag in _HTML_HEADINGS and not self._skip_depth:
+            self._flush()
+            self._heading_tag, self._heading = tag, []
+        elif tag in _HTML_BLOCKS:
+            self._flush()
+            if tag == "li":
+                self._line.append("- ")
+
+    def handle_endtag(self, tag):
+        if tag in _HTML_SKIP:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in _HTML_CONTENT:
+            self._content_depth = max(0, self._content_depth - 1)
+        if tag == self._heading_tag:
+            heading = _WHITESPACE_RE.sub(" ", "".join(self._heading)).strip()
+            if heading:
+                self.items.append((self._content_depth > 0, heading, None))
+                if tag == "h1" and not self.first_h1:
+                    self.first_h1 = heading
+            self._heading_tag = None
+        elif tag in _HTML_BLOCKS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif self._skip_depth:
+            return
+        elif self._heading_tag:
+            self._heading.append(data)
+        else:
+            self._line.append(data)
+
+    def _flush(self):
+        line = _WHITESPACE_RE.sub(" ", "".join(self._line)).strip()
+        self._line = []
+        if line and line != "-":
+            self.items.append((self._content_depth > 0, None, line))
+
+    def sections(self) -> List[Dict]:
+        self._flush()
+        items = [item for item in self.items if item[0]] if self._saw_content else self.items
+        sections = []
+        heading, lines = "", []
+        for _, item_heading, line in items:
+            if item_heading is not None:
+                sections.append(_section(heading, lines))
+                heading, lines = item_heading, []
+            else:
+                lines.append(line)
+        sections.append(_section(heading, lines))
+        return sections
+
+
+@register_parser("html", ".html", ".htm", cpu_heavy=True)
+def parse_html(path: str) -> Dict:
+    """HTML: h1-h4 start sections; the first H1 (else <title>) is the title"""
+    parser = _HelpCenterHTML()
+    parser.feed(_read_text(path))
+    parser.close()
+    sections = parser.sections()
+    title = parser.first_h1 or _WHITESPACE_RE.sub(" ", parser.title).strip()
+    return {"title": title or None, "sections": sections}
+
+
+# ---------------------------------------------------------------------------
+# PDF (text layer only; scanned pages without text come out empty)
+# ---------------------------------------------------------------------------
+
+def _pdf_outline(reader) -> List[tuple]:
+    """(page index, title) of the outline (bookmarks), sorted by page"""
+    entries = []
+
+    def walk(items):
+        for item in items:
+            if isinstance(item, list):
+                walk(item)
+                continue
+            try:
+                entries.append((reader.get_destination_page_number(item), str(item.title).strip()))
+            except Exception:
+                continue
+
+    try:
+        walk(reader.outline)
+    except Exception:
+        return []
+    return sorted(entry for entry in entries if entry[1])
+
+
+@register_parser("pdf", ".pdf", cpu_heavy=True)
+def parse_pdf(path: str) -> Dict:
+    """PDF: one section per outline entry (per page without an outline), pages kept"""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    outline = _pdf_outline(reader)
+    sections = []
+    heading, lines, start_page = "", [], 1
+    position = 0
+    for index, page in enumerate(reader.pages):
+        page_headings = []
+        while position < len(outline) and outline[position][0] <= index:
+            page_headings.append(outline[position][1])
+            position += 1
+        if page_headings or not outline:
+            sections.append(_section(heading, lines, start_page))
+            heading = page_headings[-1] if page_headings else ""
+            lines, start_page = [], index + 1
+        text = page.extract_text() or ""
+        lines.extend(line.rstrip() for line in text.splitlines())
+    sections.append(_section(heading, lines, start_page))
+
+    title = None
+    try:
+        title = (reader.metadata.title or "").strip() if reader.metadata else None
+    except Exception:
+        pass
+    if not title:
+        first_lines = [line.strip() for section in sections for line in section["text"].splitlines() if line.strip()]
+        title = first_lines[0][:120] if first_lines else None
+    return {"title": title, "sections": sections, "pages": len(reader.pages)}
@@ -3,15 +3,210 @@ Elasticsearch Client Module
 Handles all Elasticsearch operations including index creation and hybrid search
 """
 
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+import copy
+import json
 import logging
+import re
+from datetime import datetime
 from typing import List, Dict, Optional
 from config import Config
+from utils.deadline import DEADLINE_EXCEEDED, DeadlineExceeded, stage_timeout
+from utils.embeddings import embedding_signature
+from utils.metrics import span
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upper bound for any single Elasticsearch request
+ES_REQUEST_TIMEOUT_S = 30
+
+# Index template applied to every lazily created tenant index
+TENANT_TEMPLATE_NAME = "sentiflow-tenants"
+
+# Versioned (blue/green) indexes behind an alias: <alias>.v<timestamp>;
+# tenant IDs cannot contain '.', so versions never collide with tenants
+VERSION_SEPARATOR = ".v"
+
+
+# Stored query shapes. Versioned IDs: bump the suffix when a shape changes so
+# old and new app versions can serve side by side during a deploy
+COSINE_SCRIPT_ID = "sentiflow-cosine-v1"
+RESCORE_SCRIPT_ID = "sentiflow-cosine-rescore-v1"
+EXACT_TEMPLATE_ID = "sentiflow-hybrid-exact-v1"
+KNN_TEMPLATE_ID = "sentiflow-hybrid-knn-v1"
+KNN_RESCORE_TEMPLATE_ID = "sentiflow-hybrid-knn-rescore-v1"
+
+_TEMPLATE_PARAM = re.compile(r'"<<(json:)?(\w+)>>"')
+
+
+def _param(name: str) -> str:
+    """Template placeholder for a number (rendered unquoted)"""
+    return f"<<{name}>>"
+
+
+def _json_param(name: str) -> str:
+    """Template placeholder for a list/object (rendered as JSON)"""
+    return f"<<json:{name}>>"
+
+
+def _template_source(body: Dict) -> str:
+    """
+    Mustache source for a search template body
+    
+    Strings are written as "{{name}}" (JSON-escaped by Elasticsearch);
+    _param/_json_param placeholders lose their quotes.
+    """
+    return _TEMPLATE_PARAM.sub(
+        lambda match: (
+            "{{#toJson}}" + match.group(2) + "{{/toJson}}" if match.group(1)
+            else "{{" + match.group(2) + "}}"
+        ),
+        json.dumps(body)
+    )
+
+
+def _keyword_clause() -> Dict:
+    """BM25 component of the hybrid score"""
+    return {
+        "multi_match": {
+            "query": "{{query_text}}",
+            "fields": ["text^2", "title"],
+            "type": "best_fields",
+            "fuzziness": "AUTO",
+            "boost": _param("keyword_weight")
+        }
+    }
+
+
+def _with_common_options(body: Dict) -> Dict:
+    body["size"] = _param("k")
+    body["_source"] = {
+        "excludes": ["embedding"]  # Don't return large embeddings
+    }
+    body["highlight"] = {
+        "fields": {
+            "text": {
+                "fragment_size": 200,
+                "number_of_fragments": 2
+            }
+        }
+    }
+    return body
+
+
+def _exact_template() -> Dict:
+    """Exact hybrid query: brute-force cosine over every document + BM25"""
+    return _with_common_options({
+        "query": {
+            "bool": {
+                "should": [
+                    # Semantic search component (vector similarity)
+                    {
+                        "script_score": {
+                            "query": {"match_all": {}},
+                            "script": {
+                                "id": COSINE_SCRIPT_ID,
+                                "params": {
+                                    "query_vector": _json_param("query_vector"),
+                                    "semantic_weight": _param("semantic_weight")
+                                }
+                            }
+                        }
+                    },
+                    # Keyword search component (BM25)
+                    _keyword_clause()
+                ]
+            }
+        }
+    })
+
+
+def _knn_template(rescore: bool) -> Dict:
+    """
+    Approximate hybrid query over the HNSW graph (quantized if configured)
+    
+    kNN scores cosine as (1 + cos) / 2, so a boost of 2 * semantic_weight
+    keeps the scale of the exact query. The rescore variant replaces the
+    approximate score of the top `window` candidates by keyword + exact
+    cosine.
+    """
+    body = {
+        "knn": {
+            "field": "embedding",
+            "query_vector": _json_param("query_vector"),
+            "k": _param("window"),
+            "num_candidates": _param("num_candidates"),
+            "boost": _param("knn_boost")
+        },
+        "query": _keyword_clause()
+    }
+    if rescore:
+        body["rescore"] = {
+            "window_size": _param("window"),
+            "query": {
+                "rescore_query": {
+                    "script_score": {
+                        "query": {
+                            "bool": {
+                                "should": [
+                                    _keyword_clause(),
+                                    {"match_all": {"boost": 0.0}}
+                                ]
+                            }
+                        },
+                        "script": {
+                            "id": RESCORE_SCRIPT_ID,
+                            "params": {
+                                "query_vector": _json_param("query_vector"),
+                                "semantic_weight": _param("semantic_weight")
+                            }
+                        }
+                    }
+                },
+                "query_weight": 0.0,
+                "rescore_query_weight": 1.0
+            }
+        }
+    return _with_common_options(body)
+
+
+# Registered with put_script: Painless scripts are compiled once per cluster
+# and search templates keep the query shape server-side, so a search sends
+# only its params (weights and vector)
+STORED_SCRIPTS = {
+    COSINE_SCRIPT_ID: {
+        "lang": "painless",
+        "source": "params.semantic_weight * (cosineSimilarity(params.query_vector, 'embedding') + 1.0)"
+    },
+    RESCORE_SCRIPT_ID: {
+        "lang": "painless",
+        "source": "_score + params.semantic_weight * (cosineSimilarity(params.query_vector, 'embedding') + 1.0)"
+    },
+    EXACT_TEMPLATE_ID: {"lang": "mustache", "source": _template_source(_exact_template())},
+    KNN_TEMPLATE_ID: {"lang": "mustache", "source": _template_source(_knn_template(rescore=False))},
+    KNN_RESCORE_TEMPLATE_ID: {"lang": "mustache", "source": _template_source(_knn_template(rescore=True))}
+}
+
+
+def compact_vector(values: List[float]) -> List[float]:
+    """
+    Round a vector to VECTOR_DECIMALS for transmission
+
+    Six decimals halve the JSON size of an embedding while changing cosine
+    similarities by less than 1e-6. 0 sends full repr floats.
+    """
+    decimals = Config.VECTOR_DECIMALS
+    if decimals <= 0:
+        return list(values)
+    return [round(value, decimals) for value in values]
+
+
+def uses_knn() -> bool:
+    """Whether the semantic part runs as approximate kNN (vs exact script_score)"""
+    if Config.VECTOR_SEARCH == "auto":
+        return Config.VECTOR_INDEX_TYPE != "hnsw"
+    return Config.VECTOR_SEARCH == "knn"
+
 
 class ElasticClient:
     """
@@ -19,14 +214,26 @@ class ElasticClient:
     Manages index creation and hybrid search operations
     """
     
-    def __init__(self):
-        """Initialize Elasticsearch connection"""
+    def __init__(self, es=None, index_name: Optional[str] = None):
+        """
+        Initialize Elasticsearch connection
+        
+        Args:
+            es: Pre-built Elasticsearch-compatible client (connects to
+                Elastic Cloud if None)
+            index_name: Index or alias to use (ELASTIC_INDEX_NAME if None)
+        """
         try:
-            self.es = Elasticsearch(
-                cloud_id=Config.ELASTIC_CLOUD_ID,
-                api_key=Config.ELASTIC_API_KEY,
-                request_timeout=30
-            )
+            if es is None:
+                # Deferred import keeps module import cheap
+                from elasticsearch import Elasticsearch
+                
+                es = Elasticsearch(
+                    cloud_id=Config.ELASTIC_CLOUD_ID,
+                    api_key=Config.ELASTIC_API_KEY,
+                    request_timeout=ES_REQUEST_TIMEOUT_S
+                )
+            self.es = es
             
             # Test connection
             if self.es.ping():
@@ -38,7 +245,191 @@ class ElasticClient:
             logger.error(f"❌ Failed to connect to Elasticsearch: {str(e)}")
             raise
         
-        self.index_name = Config.ELASTIC_INDEX_NAME
+        self.index_name = index_name or Config.ELASTIC_INDEX_NAME
+        # Shared by for_index copies: stored scripts are cluster-wide
+        self._stored_scripts = {"ready": False}
+    
+    def for_index(self, index_name: str) -> "ElasticClient":
+        """Client for another index sharing this connection pool"""
+        client = copy.copy(self)
+        client.index_name = index_name
+        return client
+    
+    def index_body(self, bulk_load: bool = False) -> Dict:
+        """
+        Settings and mappings for a SentiFlow knowledge base index
+        
+        Args:
+            bulk_load: No refreshes and no replicas while the index is being
+                filled (see finish_bulk_load)
+        """
+        return {
+            "settings": {
+                "number_of_shards": 1,
+                "number_of_replicas": 0 if bulk_load else 1,
+                "index": {
+                    "max_result_window": 10000,
+                    **({"refresh_interval": "-1"} if bulk_load else {})
+                }
+            },
+            "mappings": {
+                "_meta": embedding_signature(),
+                "properties": {
+                    "text": {
+                        "type": "text",
+                        "analyzer": "standard",
+                        "fields": {
+                            "keyword": {
+                                "type": "keyword"
+                            }
+                        }
+                    },
+                    "embedding": self._embedding_mapping(),
+                    "source": {
+                        "type": "keyword"
+                    },
+                    "category": {
+                        "type": "keyword"
+                    },
+                    "timestamp": {
+                        "type": "date"
+                    },
+                    "title": {
+                        "type": "text",
+                        "fields": {
+                            "keyword": {
+                                "type": "keyword"
+                            }
+                        }
+                    },
+                    "chunk_index": {
+                        "type": "integer"
+                    },
+                    "section": {
+                        "type": "text",
+                        "fields": {
+                            "keyword": {
+                                "type": "keyword"
+                            }
+                        }
+                    },
+                    "page": {
+                        "type": "integer"
+                    },
+                    "format": {
+                        "type": "keyword"
+                    }
+                }
+            }
+        }
+    
+    @staticmethod
+    def _embedding_mapping() -> Dict:
+        """
+        dense_vector mapping; VECTOR_INDEX_TYPE=int8_hnsw stores the HNSW
+        vectors scalar-quantized (~4x less memory) while keeping the float
+        vectors on disk for exact rescoring
+        """
+        mapping = {
+            "type": "dense_vector",
+            "dims": Config.EMBEDDING_DIMENSIONS,
+            "index": True,
+            "similarity": "cosine"
+        }
+        if Config.VECTOR_INDEX_TYPE != "hnsw":
+            mapping["index_options"] = {"type": Config.VECTOR_INDEX_TYPE}
+        return mapping
+    
+    def embedding_dims(self) -> Optional[int]:
+        """Dimensions of this index's embedding field (None if the index is missing)"""
+        if not self.es.indices.exists(index=self.index_name):
+            return None
+        response = self.es.indices.get_mapping(index=self.index_name)
+        for body in response.values():
+            embedding = body.get("mappings", {}).get("properties", {}).get("embedding", {})
+            if "dims" in embedding:
+                return int(embedding["dims"])
+        return None
+    
+    def embedding_meta(self) -> Optional[Dict]:
+        """Embedding provider/model/dims recorded in this index's mapping (None if the index is missing)"""
+        if not self.es.indices.exists(index=self.index_name):
+            return None
+        response = self.es.indices.get_mapping(index=self.index_name)
+        for body in response.values():
+            return dict(body.get("mappings", {}).get("_meta", {}))
+        return None
+    
+    def check_embedding_space(self) -> None:
+        """
+        Verify the index was built with the configured embedding provider,
+        model and EMBEDDING_DIMENSIONS
+        
+        Raises:
+            ValueError: if the index holds vectors of another size or from
+                another provider/model (not comparable with query vectors)
+        """
+        dims = self.embedding_dims()
+        if dims is not None and dims != Config.EMBEDDING_DIMENSIONS:
+            raise ValueError(
+                f"Index {self.index_name} stores {dims}-dim embeddings but "
+                f"EMBEDDING_DIMENSIONS={Config.EMBEDDING_DIMENSIONS}; run "
+                f"pipelines/migrate_embeddings.py or restore EMBEDDING_DIMENSIONS={dims}"
+            )
+        
+        meta = self.embedding_meta()
+        if not meta:
+            return
+        expected = embedding_signature()
+        # Indexes from before pluggable providers were all embedded by Vertex AI
+        provider = meta.get("embedding_provider", "vertex")
+        model = meta.get("embedding_model")
+        if provider != expected["embedding_provider"] or (model and model != expected["embedding_model"]):
+            raise ValueError(
+                f"Index {self.index_name} was embedded with {provider}/{model} but the configured "
+                f"embeddings are {expected['embedding_provider']}/{expected['embedding_model']}; "
+                f"re-embed it with pipelines/migrate_embeddings.py or switch back to {provider}/{model}"
+            )
+    
+    def put_search_templates(self) -> None:
+        """Store the Painless scripts and search templates used by hybrid_search"""
+        try:
+            for script_id, script in STORED_SCRIPTS.items():
+                self.es.put_script(id=script_id, script=script)
+            self._stored_scripts["ready"] = True
+            logger.info(f"✅ Stored {len(STORED_SCRIPTS)} search scripts/templates")
+        except Exception as e:
+            logger.error(f"❌ Error storing search templates: {str(e)}")
+            raise
+    
+    def put_tenant_template(self) -> None:
+        """Register the index template used by per-tenant indexes"""
+        self.es.indices.put_index_template(
+            name=TENANT_TEMPLATE_NAME,
+            index_patterns=[f"{Config.TENANT_INDEX_PREFIX}-*"],
+            template=self.index_body(),
+            priority=100
+        )
+        logger.info(f"✅ Index template {TENANT_TEMPLATE_NAME} -> {Config.TENANT_INDEX_PREFIX}-*")
+    
+    def ensure_index(self) -> bool:
+        """
+        Create this client's index from the tenant template if it is missing
+        
+        Returns:
+            bool: True if the index was created by this call
+        """
+        if self.es.indices.exists(index=self.index_name):
+            return False
+        try:
+            self.es.indices.create(index=self.index_name)
+        except Exception as e:
+            # Another worker provisioned the same tenant concurrently
+            if "resource_already_exists" in str(e):
+                return False
+            raise
+        logger.info(f"✅ Provisioned index: {self.index_name}")
+        return True
     
     def create_index(self, delete_if_exists: bool = False) -> bool:
         """
@@ -49,8 +440,19 @@ class ElasticClient:
             
         Returns:
             bool: True if successful
+            
+        Raises:
+            ValueError: if delete_if_exists is set and the name is an alias
+                (rebuild with pipelines/reindex.py instead)
         """
         try:
+            # A serving alias is replaced via create_version/swap_alias, never deleted in place
+            if delete_if_exists and self.es.indices.exists_alias(name=self.index_name):
+                raise ValueError(
+                    f"{self.index_name} is an alias for {', '.join(self.alias_targets())}; "
+                    f"rebuild it with pipelines/reindex.py instead of deleting it"
+                )
+            
             # Delete existing index if requested
             if delete_if_exists and self.es.indices.exists(index=self.index_name):
                 self.es.indices.delete(index=self.index_name)
@@ -62,58 +464,12 @@ class ElasticClient:
                 return True
             
             # Define index mapping
-            mapping = {
-                "settings": {
-                    "number_of_shards": 1,
-                    "number_of_replicas": 1,
-                    "index": {
-                        "max_result_window": 10000
-                    }
-                },
-                "mappings": {
-                    "properties": {
-                        "text": {
-                            "type": "text",
-                            "analyzer": "standard",
-                            "fields": {
-                                "keyword": {
-                                    "type": "keyword"
-                                }
-                            }
-                        },
-                        "embedding": {
-                            "type": "dense_vector",
-                            "dims": 768,  # text-embedding-004 dimension
-                            "index": True,
-                            "similarity": "cosine"
-                        },
-                        "source": {
-                            "type": "keyword"
-                        },
-                        "category": {
-                            "type": "keyword"
-                        },
-                        "timestamp": {
-                            "type": "date"
-                        },
-                        "title": {
-                            "type": "text",
-                            "fields": {
-                                "keyword": {
-                                    "type": "keyword"
-                                }
-                            }
-                        },
-                        "chunk_index": {
-                            "type": "integer"
-                        }
-                    }
-                }
-            }
+            mapping = self.index_body()
             
             # Create index
             self.es.indices.create(index=self.index_name, body=mapping)
             logger.info(f"✅ Created index: {self.index_name}")
+            self.put_search_templates()
             
             return True
             
@@ -168,7 +524,9 @@ class ElasticClient:
             ]
             
             # Perform bulk indexing
-            success, failed = bulk(self.es, actions, raise_on_error=False)
+            from elasticsearch.helpers import bulk
+            with span("es.bulk"):
+                success, failed = bulk(self.es, actions, raise_on_error=False)
             
             logger.info(f"📦 Bulk indexed: {success} successful, {len(failed)} failed")
             
@@ -181,6 +539,25 @@ class ElasticClient:
             logger.error(f"❌ Error in bulk indexing: {str(e)}")
             raise
     
+    def iter_documents(self, batch_size: int = 500):
+        """
+        Yield every document source (embedding included) in index order
+        
+        Args:
+            batch_size: Documents fetched per search_after page
+        """
+        search_after = None
+        while True:
+            body = {"size": batch_size, "sort": ["_doc"], "query": {"match_all": {}}}
+            if search_after is not None:
+                body["search_after"] = search_after
+            hits = self.es.search(index=self.index_name, body=body)["hits"]["hits"]
+            for hit in hits:
+                yield hit["_source"]
+            if len(hits) < batch_size:
+                return
+            search_after = hits[-1]["sort"]
+    
     def hybrid_search(
         self,
         query_text: str,
@@ -203,69 +580,34 @@ class ElasticClient:
             List of document dictionaries with scores
         """
         try:
-            # Build hybrid search query
-            # Using script_score for vector similarity combined with text matching
-            search_body = {
-                "size": k,
-                "query": {
-                    "bool": {
-                        "should": [
-                            # Semantic search component (vector similarity)
-                            {
-                                "script_score": {
-                                    "query": {"match_all": {}},
-                                    "script": {
-                                        "source": f"{semantic_weight} * (cosineSimilarity(params.query_vector, 'embedding') + 1.0)",
-                                        "params": {
-                                            "query_vector": query_embedding
-                                        }
-                                    }
-                                }
-                            },
-                            # Keyword search component (BM25)
-                            {
-                                "multi_match": {
-                                    "query": query_text,
-                                    "fields": ["text^2", "title"],
-                                    "type": "best_fields",
-                                    "fuzziness": "AUTO",
-                                    "boost": keyword_weight
-                                }
-                            }
-                        ]
-                    }
-                },
-                "_source": {
-                    "excludes": ["embedding"]  # Don't return large embeddings
-                },
-                "highlight": {
-                    "fields": {
-                        "text": {
-                            "fragment_size": 200,
-                            "number_of_fragments": 2
-                        }
-                    }
-                }
-            }
+            if not self._stored_scripts["ready"]:
+                self.put_search_templates()
+            template_id, params = self._search_params(
+                query_text, query_embedding, k, semantic_weight, keyword_weight
+            )
             
-            # Execute search
-            response = self.es.search(index=self.index_name, body=search_body)
+            # Execute search within the remaining request budget
+            timeout = stage_timeout(cap=ES_REQUEST_TIMEOUT_S)
+            if timeout <= 0:
+                DEADLINE_EXCEEDED.inc("search")
+                raise DeadlineExceeded("search")
+            with span("es.hybrid_search.request"):
+                try:
+                    response = self.es.options(request_timeout=timeout).search_template(
+                        index=self.index_name,
+                        id=template_id,
+                        params=params
+                    )
+                except Exception as e:
+                    # elasticsearch.ConnectionTimeout: the budget ran out in flight
+                    if type(e).__name__ == "ConnectionTimeout":
+                        DEADLINE_EXCEEDED.inc("search")
+                        raise DeadlineExceeded("search") from e
+                    raise
             
             # Process results
-            results = []
-            for hit in response['hits']['hits']:
-                doc = hit['_source']
-                doc['_id'] = hit['_id']
-                doc['score'] = hit['_score']
-                
-                # Add highlighted snippets if available
-                if 'highlight' in hit and 'text' in hit['highlight']:
-                    doc['snippet'] = ' ... '.join(hit['highlight']['text'])
-                else:
-                    # Fallback to first 200 characters
-                    doc['snippet'] = doc.get('text', '')[:200] + '...'
-                
-                results.append(doc)
+            with span("es.hybrid_search.process"):
+                results = self._process_hits(response)
             
             logger.info(f"🔍 Hybrid search found {len(results)} results")
             
@@ -275,6 +617,63 @@ class ElasticClient:
             logger.error(f"❌ Error in hybrid search: {str(e)}")
             raise
     
+    @staticmethod
+    def _search_params(
+        query_text: str,
+        query_embedding: List[float],
+        k: int,
+        semantic_weight: float,
+        keyword_weight: float
+    ) -> tuple:
+        """Stored template ID and its params for one hybrid search"""
+        params = {
+            "query_text": query_text,
+            "query_vector": compact_vector(query_embedding),
+            "k": k,
+            "semantic_weight": semantic_weight,
+            "keyword_weight": keyword_weight
+        }
+        if not uses_knn():
+            return EXACT_TEMPLATE_ID, params
+        
+        window = max(k, Config.VECTOR_RESCORE_WINDOW)
+        params.update({
+            "window": window,
+            "num_candidates": max(window * 2, Config.VECTOR_NUM_CANDIDATES),
+            "knn_boost": 2 * semantic_weight
+        })
+        if Config.VECTOR_RESCORE_WINDOW > 0:
+            return KNN_RESCORE_TEMPLATE_ID, params
+        return KNN_TEMPLATE_ID, params
+    
+    def _process_hits(self, response: Dict) -> List[Dict]:
+        """Convert a search response into result documents with snippets"""
+        results = []
+        for hit in response['hits']['hits']:
+            doc = hit['_source']
+            doc['_id'] = hit['_id']
+            doc['score'] = hit['_score']
+            
+            # Add highlighted snippets if available
+            if 'highlight' in hit and 'text' in hit['highlight']:
+                doc['snippet'] = ' ... '.join(hit['highlight']['text'])
+            else:
+                # Fallback to first 200 characters
+                doc['snippet'] = doc.get('text', '')[:200] + '...'
+            
+            results.append(doc)
+        
+        return results
+    
+    def warm_up(self, query_embedding: List[float]) -> None:
+        """
+        Run a representative search to prime the connection pool and caches
+        
+        Args:
+            query_embedding: Any valid embedding vector
+        """
+        self.hybrid_search(query_text="warm up", query_embedding=query_embedding, k=1)
+    
     def get_document_count(self) -> int:
         """Get total number of documents in index"""
         try:
@@ -284,6 +683,106 @@ class ElasticClient:
             logger.error(f"❌ Error getting document count: {str(e)}")
             return 0
     
+    def alias_targets(self) -> List[str]:
+        """
+        Concrete indexes behind this client's index name
+        
+        Returns:
+            The alias targets, [index_name] for a plain index, [] if missing
+        """
+        if self.es.indices.exists_alias(name=self.index_name):
+            return sorted(self.es.indices.get_alias(name=self.index_name))
+        if self.es.indices.exists(index=self.index_name):
+            return [self.index_name]
+        return []
+    
+    def versions(self) -> List[str]:
+        """Versioned indexes built for this alias, oldest first"""
+        pattern = f"{self.index_name}{VERSION_SEPARATOR}*"
+        return sorted(self.es.indices.get(index=pattern, expand_wildcards="open"))
+    
+    def create_version(self) -> "ElasticClient":
+        """
+        Create a new, empty versioned index for a blue/green rebuild
+        
+        The index is set up for bulk loading; call finish_bulk_load() on
+        the returned client before serving from it.
+        
+        Returns:
+            Client for the new index (same connection pool)
+        """
+        version = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")[:17]
+        client = self.for_index(f"{self.index_name}{VERSION_SEPARATOR}{version}")
+        try:
+            self.es.indices.create(index=client.index_name, body=self.index_body(bulk_load=True))
+            logger.info(f"✅ Created index version: {client.index_name}")
+            return client
+        except Exception as e:
+            logger.error(f"❌ Error creating index version: {str(e)}")
+            raise
+    
+    def finish_bulk_load(self) -> None:
+        """Restore refreshes and replicas, refresh and merge to one segment"""
+        try:
+            self.es.indices.put_settings(
+                index=self.index_name,
+                settings={"index": {"refresh_interval": None, "number_of_replicas": 1}}
+            )
+            self.es.indices.refresh(index=self.index_name)
+            self.es.indices.forcemerge(index=self.index_name, max_num_segments=1)
+            logger.info(f"🧱 Finished bulk load: {self.index_name}")
+        except Exception as e:
+            logger.error(f"❌ Error finishing bulk load: {str(e)}")
+            raise
+    
+    def swap_alias(self, new_index: str) -> List[str]:
+        """
+        Atomically point this client's alias at new_index
+        
+        A plain (pre-alias) index with the alias name is removed in the same
+        request, so searches never see a missing index.
+        
+        Args:
+            new_index: Concrete index to serve from
+            
+        Returns:
+            Indexes the alias pointed to before
+        """
+        try:
+            previous = self.alias_targets()
+            if previous == [self.index_name]:
+                actions = [{"remove_index": {"index": self.index_name}}]
+            else:
+                actions = [
+                    {"remove": {"index": index, "alias": self.index_name}}
+                    for index in previous if index != new_index
+                ]
+            actions.append({"add": {"index": new_index, "alias": self.index_name, "is_write_index": True}})
+            self.es.indices.update_aliases(actions=actions)
+            logger.info(f"🔀 Alias {self.index_name}: {', '.join(previous) or '-'} -> {new_index}")
+            return previous
+        except Exception as e:
+            logger.error(f"❌ Error swapping alias {self.index_name}: {str(e)}")
+            raise
+    
+    def garbage_collect(self, keep: int = 1) -> List[str]:
+        """
+        Delete old versions no longer behind the alias
+        
+        Args:
+            keep: Most recent previous versions kept for rollback
+            
+        Returns:
+            Deleted index names
+        """
+        live = set(self.alias_targets())
+        stale = [index for index in self.versions() if index not in live]
+        deleted = stale[:max(0, len(stale) - keep)]
+        for index in deleted:
+            self.es.indices.delete(index=index)
+            logger.info(f"🗑️  Deleted old index version: {index}")
+        return deleted
+    
     def delete_index(self) -> bool:
         """Delete the index"""
         try:
@@ -299,6 +798,7 @@ class ElasticClient:
 
 if __name__ == "__main__":
     """Test the Elastic client"""
+    Config.load()
     client = ElasticClient()
     
     # Create index
@@ -307,7 +807,7 @@ if __name__ == "__main__":
     # Test document
     test_doc = {
         "text": "This is a test document for SentiFlow",
-        "embedding": [0.1] * 768,  # Dummy embedding
+        "embedding": [0.1] * Config.EMBEDDING_DIMENSIONS,  # Dummy embedding
         "source": "test.txt",
         "category": "test",
         "timestamp": "2025-10-24T00:00:00Z",
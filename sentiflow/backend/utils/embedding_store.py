@@ -0,0 +1,416 @@
+"""
+Embedding Store
+Content-addressed cache of document embeddings on local disk: a chunk's
+vector is looked up by a hash of its text, so rebuilding an index only
+embeds chunks that changed since the last build
+
+One append-only file per embedding space (provider, model, dims and
+document prefix), memory-mapped for reads. Layout (little-endian):
+    b"SFEV" | version u32 | dims u32 | header length u32 | header JSON
+    records     key (16-byte BLAKE2b of the text) | dims float32
+
+The hash index (key -> record offset) is built in memory by scanning the
+keys when a file is opened (~16 bytes per record, milliseconds for
+100k chunks) and extended with records other processes appended.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from config import Config
+from utils.metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SFEV"
+VERSION = 1
+KEY_BYTES = 16
+_PREAMBLE = struct.Struct("<4sIII")
+
+EMBEDDING_STORE_LOOKUPS = REGISTRY.counter(
+    "sentiflow_embedding_store_lookups_total",
+    "Document embedding lookups in the local embedding store (hit, miss)",
+    ("outcome",)
+)
+
+
+def text_key(text: str) -> bytes:
+    """Content address of a chunk text"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+
+def embedding_space(embedder, task_type: str = "RETRIEVAL_DOCUMENT") -> Dict:
+    """
+    Everything that determines a document vector besides its text
+
+    Args:
+        embedder: Embedding provider (provider, model_name, dims)
+        task_type: Embedding task type
+
+    Returns:
+        Dictionary identifying the vector space
+    """
+    return {
+        "provider": embedder.provider,
+        "model": embedder.model_name,
+        "dims": embedder.dims,
+        "task_type": task_type,
+        # Local models embed "<prefix><text>"; a new prefix means new vectors
+        "prefix": getattr(embedder, "document_prefix", "") if task_type == "RETRIEVAL_DOCUMENT" else ""
+    }
+
+
+def _space_file_name(space: Dict) -> str:
+    digest = hashlib.blake2b(json.dumps(space, sort_keys=True).encode("utf-8"), digest_size=4).hexdigest()
+    model = re.sub(r"[^A-Za-z0-9._-]+", "_", str(space["model"]))
+    return f"{space['provider']}-{model}-{space['dims']}-{digest}.vec"
+
+
+class VectorFile:
+    """
+    One append-only vector file (a single embedding space)
+
+    Appends are whole records in one O_APPEND write, so concurrent
+    ingestion processes interleave records without tearing them; a
+    partial record left by a crash is ignored and dropped by compact().
+    """
+
+    def __init__(self, path: str, space: Dict):
+        """
+        Args:
+            path: Vector file (created with its header if missing)
+            space: embedding_space() of the vectors stored in it
+
+        Raises:
+            ValueError: if the file belongs to another space or version
+        """
+        self.path = path
+        self.space = space
+        self.dims = int(space["dims"])
+        self.record_size = KEY_BYTES + 4 * self.dims
+        self._lock = threading.Lock()
+        self._mm: Optional[mmap.mmap] = None
+        self._index: Dict[bytes, int] = {}
+        self._indexed_to = 0
+        self.duplicates = 0
+
+        if not os.path.exists(path):
+            self._write_header(path)
+        self._fd = os.open(path, os.O_RDWR | os.O_APPEND | getattr(os, "O_BINARY", 0))
+        try:
+            magic, version, dims, header_length = _PREAMBLE.unpack(self._read_at(0, _PREAMBLE.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} embedding store file")
+            stored_space = json.loads(self._read_at(_PREAMBLE.size, header_length))["space"]
+            if dims != self.dims or stored_space != space:
+                raise ValueError(f"{path} holds vectors of {stored_space}, not {space}")
+            self.data_start = _PREAMBLE.size + header_length
+            self._refresh()
+        except Exception:
+            os.close(self._fd)
+            raise
+
+    def _write_header(self, path: str) -> None:
+        header = json.dumps({"space": self.space, "created_at": datetime.utcnow().isoformat()}).encode("utf-8")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, VERSION, self.dims, len(header)))
+            f.write(header)
+        try:
+            # Another process may have created it meanwhile; keep theirs
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+
+    def _read_at(self, offset: int, length: int) -> bytes:
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def _refresh(self) -> None:
+        """Map the file again and index records appended since the last call"""
+        size = os.fstat(self._fd).st_size
+        complete = self.data_start + (size - self.data_start) // self.record_size * self.record_size
+        if complete <= self._indexed_to:
+            return
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        offset = max(self._indexed_to, self.data_start)
+        mm, index, step = self._mm, self._index, self.record_size
+        for position in range(offset, complete, step):
+            key = mm[position:position + KEY_BYTES]
+            if key in index:
+                self.duplicates += 1
+            else:
+                index[key] = position
+        self._indexed_to = complete
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[List[float]]]:
+        """
+        Stored vectors for content keys (None where absent)
+
+        Args:
+            keys: text_key() of each text
+
+        Returns:
+            Vector or None per key, in input order
+        """
+        with self._lock:
+            if any(key not in self._index for key in keys):
+                # Pick up what other processes appended
+                self._refresh()
+            vectors = []
+            for key in keys:
+                position = self._index.get(key)
+                if position is None:
+                    vectors.append(None)
+                    continue
+                start = position + KEY_BYTES
+                vector = array("f", self._mm[start:start + 4 * self.dims])
+                if sys.byteorder != "little":
+                    vector.byteswap()
+                vectors.append(vector.tolist())
+            return vectors
+
+    def append_many(self, keys: List[bytes], vectors: List[List[float]]) -> int:
+        """
+        Append vectors not stored yet
+
+        Args:
+            keys: text_key() of each text
+            vectors: Embedding per key (dims long)
+
+        Returns:
+            Number of records written
+        """
+        with self._lock:
+            records = []
+            seen = set()
+            for key, vector in zip(keys, vectors):
+                if key in self._index or key in seen:
+                    continue
+                if len(vector) != self.dims:
+                    raise ValueError(f"Expected a {self.dims}-dim vector, got {len(vector)}")
+                values = array("f", vector)
+                if sys.byteorder != "little":
+                    values.byteswap()
+                records.append(key + values.tobytes())
+                seen.add(key)
+            if records:
+                size = os.fstat(self._fd).st_size
+                torn = (size - self.data_start) % self.record_size
+                if torn:
+                    # A crash left half a record; appending after it would misalign the rest
+                    os.ftruncate(self._fd, size - torn)
+                os.write(self._fd, b"".join(records))
+                self._refresh()
+            return len(records)
+
+    def compact(self, keep: Optional[Iterable[bytes]] = None) -> Dict:
+        """
+        Rewrite the file without duplicate records, torn tails and,
+        if `keep` is given, records whose key is not in it
+
+        Records appended by another process while compacting are lost
+        (they are simply embedded again next time).
+
+        Args:
+            keep: Keys to keep (all if None)
+
+        Returns:
+            Dictionary with records and bytes before and after
+        """
+        with self._lock:
+            self._refresh()
+            keep = None if keep is None else set(keep)
+            before = {"records": len(self._index) + self.duplicates, "bytes": os.fstat(self._fd).st_size}
+            positions = sorted(
+                position for key, position in self._index.items() if keep is None or key in keep
+            )
+            tmp_path = f"{self.path}.tmp-{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                f.write(self._mm[:self.data_start])
+                for position in positions:
+                    f.write(self._mm[position:position + self.record_size])
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+            self._mm.close()
+            self._mm = None
+            os.close(self._fd)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND | getattr(os, "O_BINARY", 0))
+            self._index, self._indexed_to, self.duplicates = {}, 0, 0
+            self._refresh()
+            return {
+                "records_before": before["records"],
+                "records_after": len(self._index),
+                "bytes_before": before["bytes"],
+                "bytes_after": os.fstat(self._fd).st_size
+            }
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "records": len(self._index),
+            "duplicates": self.duplicates,
+            "bytes": os.fstat(self._fd).st_size
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+            os.close(self._fd)
+
+
+class EmbeddingStore:
+    """
+    Document embeddings reused across ingestions and index rebuilds
+
+    embed() returns stored vectors for texts seen before and calls the
+    embedding provider once for the rest (identical texts in a call are
+    embedded once), then appends the new vectors. Vectors are stored as
+    float32, the precision Elasticsearch keeps them in.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        """
+        Args:
+            directory: Store directory (EMBEDDING_STORE_DIR if None)
+        """
+        self.directory = directory or Config.EMBEDDING_STORE_DIR
+        self.hits = 0
+        self.misses = 0
+        self._files: Dict[str, VectorFile] = {}
+        self._used: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def file(self, space: Dict) -> VectorFile:
+        """Vector file of an embedding space (opened or created on first use)"""
+        name = _space_file_name(space)
+        with self._lock:
+            if name not in self._files:
+                self._files[name] = VectorFile(os.path.join(self.directory, name), space)
+                self._used[name] = set()
+            return self._files[name]
+
+    def embed(self, embedder, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT") -> List[List[float]]:
+        """
+        Embeddings for texts, from the store where possible
+
+        Args:
+            embedder: Embedding provider for texts not stored yet
+            texts: Texts to embed
+            task_type: Embedding task type
+
+        Returns:
+            Embedding vectors in input order
+        """
+        vector_file = self.file(embedding_space(embedder, task_type))
+        keys = [text_key(text) for text in texts]
+        vectors = vector_file.get_many(keys)
+
+        missing: Dict[bytes, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        hits = len(texts) - sum(vector is None for vector in vectors)
+        EMBEDDING_STORE_LOOKUPS.inc("hit", amount=hits)
+        EMBEDDING_STORE_LOOKUPS.inc("miss", amount=len(texts) - hits)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(texts) - hits
+            self._used[_space_file_name(vector_file.space)].update(keys)
+
+        if missing:
+            new_keys = list(missing)
+            new_vectors = embedder.embed([missing[key] for key in new_keys], task_type)
+            vector_file.append_many(new_keys, new_vectors)
+            fresh = dict(zip(new_keys, new_vectors))
+            vectors = [fresh[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+        return vectors
+
+    def compact(self, used_only: bool = False) -> Dict:
+        """
+        Compact the vector files opened by this store
+
+        Args:
+            used_only: Also drop every vector not looked up or added since
+                the store was opened, i.e. chunks that are no longer part of
+                the knowledge base just ingested. Only safe when the
+                directory backs that knowledge base alone.
+
+        Returns:
+            Compaction statistics per file
+        """
+        results = {}
+        for name, vector_file in list(self._files.items()):
+            results[name] = vector_file.compact(self._used[name] if used_only else None)
+            logger.info(
+                f"🗜️  Compacted {name}: {results[name]['records_before']} -> {results[name]['records_after']} vectors, "
+                f"{results[name]['bytes_before']} -> {results[name]['bytes_after']} bytes"
+            )
+        return results
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "files": [vector_file.stats() for vector_file in self._files.values()]
+        }
+
+    def close(self) -> None:
+        for vector_file in self._files.values():
+            vector_file.close()
+        self._files = {}
+
+
+if __name__ == "__main__":
+    """
+    Usage (from backend/):
+        python -m utils.embedding_store stats
+        python -m utils.embedding_store compact
+    """
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description='Inspect or compact the local embedding store')
+    parser.add_argument('command', choices=['stats', 'compact'])
+    parser.add_argument('--dir', default=None, help='Store directory (default: EMBEDDING_STORE_DIR)')
+
+    args = parser.parse_args()
+    Config.load()
+
+    directory = args.dir or Config.EMBEDDING_STORE_DIR
+    output = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.vec"))):
+        with open(path, "rb") as f:
+            _, _, _, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            space = json.loads(f.read(header_length))["space"]
+        vector_file = VectorFile(path, space)
+        output[os.path.basename(path)] = vector_file.compact() if args.command == 'compact' else vector_file.stats()
+        vector_file.close()
+    print(json.dumps(output, indent=2))
@@ -0,0 +1,291 @@
+"""
+Embedding Providers
+Query and document embeddings from Vertex AI or from a small
+sentence-embedding model running on local CPU (ONNX Runtime)
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from config import Config
+from utils.metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ("vertex", "local")
+
+EMBEDDING_LATENCY = REGISTRY.histogram(
+    "sentiflow_embedding_seconds",
+    "Embedding call latency by provider and task type",
+    ("provider", "task_type")
+)
+
+
+def local_model_name(model_dir: Optional[str] = None) -> str:
+    """Name recorded for a local model: its directory name"""
+    return os.path.basename(os.path.normpath(model_dir or Config.LOCAL_EMBEDDING_MODEL))
+
+
+def embedding_signature() -> Dict:
+    """
+    Provider, model and size the configured embeddings come from
+
+    Stored in the index mapping's _meta: vectors of different models live
+    in unrelated spaces, so an index only serves queries embedded the same way.
+    """
+    if Config.EMBEDDING_PROVIDER == "local":
+        model = local_model_name()
+    else:
+        model = Config.EMBEDDING_MODEL
+    return {
+        "embedding_provider": Config.EMBEDDING_PROVIDER,
+        "embedding_model": model,
+        "embedding_dims": Config.EMBEDDING_DIMENSIONS
+    }
+
+
+class VertexEmbeddingProvider:
+    """
+    Vertex AI text embeddings (EMBEDDING_MODEL, EMBEDDING_DIMENSIONS)
+
+    Wraps any model with the TextEmbeddingModel.get_embeddings interface.
+    """
+
+    provider = "vertex"
+
+    def __init__(self, model=None):
+        """
+        Args:
+            model: Pre-loaded embedding model (loaded if None)
+        """
+        if model is None:
+            from utils.vertex import bind_request_timeout, init_vertex
+            init_vertex()
+            from vertexai.language_models import TextEmbeddingModel
+
+            model = bind_request_timeout(TextEmbeddingModel.from_pretrained(Config.EMBEDDING_MODEL))
+        self.model = model
+
+        # Vertex SDK types are only needed once the model exists
+        from vertexai.language_models import TextEmbeddingInput
+        self._embedding_input = TextEmbeddingInput
+
+    @property
+    def model_name(self) -> str:
+        return Config.EMBEDDING_MODEL
+
+    @property
+    def dims(self) -> int:
+        # Follows EMBEDDING_DIMENSIONS (migrate_embeddings changes it at runtime)
+        return Config.EMBEDDING_DIMENSIONS
+
+    def embed(self, texts: List[str], task_type: str) -> List[List[float]]:
+        """
+        Embed texts in one Vertex AI call
+
+        Args:
+            texts: Texts to embed
+            task_type: RETRIEVAL_QUERY or RETRIEVAL_DOCUMENT
+
+        Returns:
+            Embedding vectors in input order
+        """
+        started = time.perf_counter()
+        inputs = [self._embedding_input(text=text, task_type=task_type) for text in texts]
+        embeddings = self.model.get_embeddings(inputs, output_dimensionality=self.dims)
+        EMBEDDING_LATENCY.observe(time.perf_counter() - started, self.provider, task_type)
+        return [embedding.values for embedding in embeddings]
+
+    def close(self) -> None:
+        pass
+
+
+class LocalEmbeddingProvider:
+    """
+    Sentence-embedding model on local CPU (no network hop per query)
+
+    LOCAL_EMBEDDING_MODEL is a directory holding an ONNX export of the
+    model (model.onnx) and its tokenizer (tokenizer.json), e.g. from
+    `optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 <dir>`.
+    The session is loaded once; texts are tokenized per batch (padded to
+    the batch's longest text, similar lengths batched together), mean-pooled
+    over the attention mask and L2-normalized. Batches of a large call run
+    in parallel on LOCAL_EMBEDDING_THREADS threads (ONNX Runtime releases
+    the GIL); a single-batch call runs on the caller's thread.
+    """
+
+    provider = "local"
+
+    def __init__(
+        self,
+        model_dir: Optional[str] = None,
+        threads: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_tokens: Optional[int] = None
+    ):
+        """
+        Args:
+            model_dir: Exported model directory (LOCAL_EMBEDDING_MODEL if None)
+            threads: Parallel batches (LOCAL_EMBEDDING_THREADS if None)
+            batch_size: Texts per inference call (LOCAL_EMBEDDING_BATCH_SIZE if None)
+            max_tokens: Truncation length (LOCAL_EMBEDDING_MAX_TOKENS if None)
+
+        Raises:
+            ImportError: if numpy, onnxruntime or tokenizers is missing
+            ValueError: if the model's output size differs from EMBEDDING_DIMENSIONS
+        """
+        try:
+            import numpy as np
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                f"EMBEDDING_PROVIDER=local needs numpy, onnxruntime and tokenizers "
+                f"(pip install numpy onnxruntime tokenizers): {str(e)}"
+            )
+
+        self.model_dir = model_dir or Config.LOCAL_EMBEDDING_MODEL
+        self.model_name = local_model_name(self.model_dir)
+        self.batch_size = max(1, batch_size or Config.LOCAL_EMBEDDING_BATCH_SIZE)
+        self.query_prefix = Config.LOCAL_EMBEDDING_QUERY_PREFIX
+        self.document_prefix = Config.LOCAL_EMBEDDING_DOCUMENT_PREFIX
+        self._np = np
+        threads = max(1, threads or Config.LOCAL_EMBEDDING_THREADS)
+
+        try:
+            # One thread per inference call: parallelism comes from running
+            # batches side by side, which keeps single queries from contending
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = 1
+            options.inter_op_num_threads = 1
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self._session = ort.InferenceSession(
+                os.path.join(self.model_dir, "model.onnx"),
+                sess_options=options,
+                providers=["CPUExecutionProvider"]
+            )
+            self._input_names = {model_input.name for model_input in self._session.get_inputs()}
+
+            self._tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+            self._tokenizer.enable_truncation(max_length=max_tokens or Config.LOCAL_EMBEDDING_MAX_TOKENS)
+            if self._tokenizer.padding is None:
+                self._tokenizer.enable_padding()
+
+            self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="local-embed")
+
+            # The model decides the vector size; the index mapping must agree
+            self.dims = len(self._run_batch(["dimension probe"])[0])
+        except Exception as e:
+            logger.error(f"❌ Failed to load local embedding model {self.model_dir}: {str(e)}")
+            raise
+
+        if self.dims != Config.EMBEDDING_DIMENSIONS:
+            self.close()
+            raise ValueError(
+                f"Local embedding model {self.model_name} outputs {self.dims}-dim vectors but "
+                f"EMBEDDING_DIMENSIONS={Config.EMBEDDING_DIMENSIONS}; set EMBEDDING_DIMENSIONS={self.dims}"
+            )
+        logger.info(f"✅ Loaded local embedding model {self.model_name} ({self.dims} dims, {threads} threads)")
+
+    def embed(self, texts: List[str], task_type: str) -> List[List[float]]:
+        """
+        Embed texts on local CPU
+
+        Args:
+            texts: Texts to embed
+            task_type: RETRIEVAL_QUERY or RETRIEVAL_DOCUMENT (selects the
+                configured prefix, for models trained with "query: "/"passage: ")
+
+        Returns:
+            Embedding vectors in input order
+        """
+        started = time.perf_counter()
+        prefix = self.query_prefix if task_type == "RETRIEVAL_QUERY" else self.document_prefix
+        texts = [prefix + text for text in texts]
+
+        if len(texts) <= self.batch_size:
+            vectors = self._run_batch(texts)
+        else:
+            # Similar lengths share a batch so little of it is padding
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+            batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+            results = self._pool.map(lambda batch: self._run_batch([texts[i] for i in batch]), batches)
+            vectors = [None] * len(texts)
+            for batch, batch_vectors in zip(batches, results):
+                for i, vector in zip(batch, batch_vectors):
+                    vectors[i] = vector
+
+        EMBEDDING_LATENCY.observe(time.perf_counter() - started, self.provider, task_type)
+        return vectors
+
+    def _run_batch(self, texts: List[str]) -> List[List[float]]:
+        np = self._np
+        encodings = self._tokenizer.encode_batch(texts)
+        mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+        }
+        output = self._session.run(None, {name: feeds[name] for name in self._input_names if name in feeds})[0]
+
+        if output.ndim == 3:
+            # Token embeddings: mean over the real (unpadded) tokens
+            weights = mask[:, :, None].astype(np.float32)
+            output = (output * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(output, axis=1, keepdims=True)
+        return (output / np.clip(norms, 1e-12, None)).astype(np.float32).tolist()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+def build_embedding_provider(model=None):
+    """
+    Create the provider selected by EMBEDDING_PROVIDER
+
+    Args:
+        model: Pre-loaded Vertex embedding model (vertex provider only)
+
+    Returns:
+        VertexEmbeddingProvider or LocalEmbeddingProvider
+
+    Raises:
+        ValueError: if EMBEDDING_PROVIDER is unknown
+    """
+    if Config.EMBEDDING_PROVIDER == "local":
+        return LocalEmbeddingProvider()
+    if Config.EMBEDDING_PROVIDER == "vertex":
+        return VertexEmbeddingProvider(model)
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {Config.EMBEDDING_PROVIDER} (expected one of {', '.join(PROVIDERS)})")
+
+
+if __name__ == "__main__":
+    """Compare query embedding latency of the configured provider"""
+    import statistics
+
+    Config.load()
+    embedder = build_embedding_provider()
+    queries = [
+        "What is your return policy?",
+        "How do I track my shipment?",
+        "My order arrived damaged, can I get a refund?",
+        "Do you ship internationally?"
+    ]
+    timings = []
+    for i in range(50):
+        started = time.perf_counter()
+        embedder.embed([queries[i % len(queries)]], "RETRIEVAL_QUERY")
+        timings.append((time.perf_counter() - started) * 1000)
+    started = time.perf_counter()
+    embedder.embed(queries * 16, "RETRIEVAL_QUERY")
+    batch_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{embedder.provider}/{embedder.model_name} ({embedder.dims} dims)")
+    print(f"single query: p50 {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms")
+    print(f"{len(queries) * 16} queries in one call: {batch_ms:.1f} ms")
+    embedder.close()
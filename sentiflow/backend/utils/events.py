@@ -0,0 +1,321 @@
+"""
+Event Log Utilities
+Persists conversation/analytics events without adding I/O to the request
+path: requests enqueue into a bounded in-process queue (never blocking,
+dropping when full) and a background writer flushes batches to a sink
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EVENTS_ENQUEUED = REGISTRY.counter(
+    "sentiflow_events_enqueued_total",
+    "Events accepted into the event queue",
+    ("type",)
+)
+EVENTS_DROPPED = REGISTRY.counter(
+    "sentiflow_events_dropped_total",
+    "Events lost (queue_full, sink_error, shutdown)",
+    ("reason",)
+)
+EVENTS_WRITTEN = REGISTRY.counter(
+    "sentiflow_events_written_total",
+    "Events persisted by the sink",
+    ("sink",)
+)
+EVENT_QUEUE_DEPTH = REGISTRY.gauge(
+    "sentiflow_event_queue_depth",
+    "Events waiting for the background writer"
+)
+EVENT_FLUSH = REGISTRY.histogram(
+    "sentiflow_event_flush_seconds",
+    "Time to write one batch to the sink",
+    ("sink",)
+)
+EVENT_BATCH = REGISTRY.histogram(
+    "sentiflow_event_batch_size",
+    "Events per sink write",
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 5000)
+)
+
+
+class JsonlSink:
+    """Append-only JSON Lines files, one per UTC day"""
+
+    name = "jsonl"
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def write(self, events: List[Dict]) -> None:
+        path = self.directory / f"events-{datetime.utcnow():%Y%m%d}.jsonl"
+        lines = "".join(json.dumps(event, default=str) + "\n" for event in events)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def close(self) -> None:
+        pass
+
+
+class ColumnarSink:
+    """
+    One column-oriented file per batch (Parquet with pyarrow installed,
+    otherwise {"columns": {name: [values]}} JSON with the same layout)
+    """
+
+    name = "columnar"
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+            self._pa = pyarrow
+        except ImportError:
+            self._pa = None
+        self._seq = 0
+
+    def write(self, events: List[Dict]) -> None:
+        names = sorted({key for event in events for key in event})
+        columns = {
+            name: [
+                json.dumps(event[name], default=str) if isinstance(event.get(name), (dict, list)) else event.get(name)
+                for event in events
+            ]
+            for name in names
+        }
+        self._seq += 1
+        stem = self.directory / f"events-{datetime.utcnow():%Y%m%dT%H%M%S}-{os.getpid()}-{self._seq:06d}"
+        if self._pa is not None:
+            self._pa.parquet.write_table(self._pa.table(columns), f"{stem}.parquet")
+        else:
+            with open(f"{stem}.columns.json", "w", encoding="utf-8") as f:
+                json.dump({"rows": len(events), "columns": columns}, f, default=str)
+
+    def close(self) -> None:
+        pass
+
+
+class BigQuerySink:
+    """Streaming inserts into BIGQUERY_DATASET.BIGQUERY_TABLE"""
+
+    name = "bigquery"
+
+    def __init__(self, project: Optional[str], dataset: str, table: str):
+        from google.cloud import bigquery
+
+        self.client = bigquery.Client(project=project)
+        self.table = f"{self.client.project}.{dataset}.{table}"
+
+    def write(self, events: List[Dict]) -> None:
+        rows = [
+            {key: json.dumps(value) if isinstance(value, (dict, list)) else value for key, value in event.items()}
+            for event in events
+        ]
+        errors = self.client.insert_rows_json(self.table, rows)
+        if errors:
+            raise RuntimeError(f"BigQuery rejected {len(errors)} rows: {errors[:3]}")
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class PubSubSink:
+    """One Pub/Sub message per event on PUBSUB_TOPIC"""
+
+    name = "pubsub"
+
+    def __init__(self, project: Optional[str], topic: str):
+        from google.cloud import pubsub_v1
+
+        self.publisher = pubsub_v1.PublisherClient()
+        self.topic = self.publisher.topic_path(project, topic)
+
+    def write(self, events: List[Dict]) -> None:
+        futures = [
+            self.publisher.publish(
+                self.topic,
+                json.dumps(event, default=str).encode("utf-8"),
+                type=event.get("type", "event")
+            )
+            for event in events
+        ]
+        for future in futures:
+            future.result(timeout=30)
+
+    def close(self) -> None:
+        self.publisher.stop()
+
+
+def build_sink(config):
+    """
+    Sink selected by EVENT_SINK (jsonl, columnar, bigquery, pubsub, none)
+
+    Returns:
+        Sink instance, or None when event logging is disabled
+    """
+    kind = config.EVENT_SINK.lower()
+    if kind == "none":
+        return None
+    if kind == "jsonl":
+        return JsonlSink(config.EVENT_LOG_DIR)
+    if kind == "columnar":
+        return ColumnarSink(config.EVENT_LOG_DIR)
+    if kind == "bigquery":
+        return BigQuerySink(config.GCP_PROJECT_ID, config.BIGQUERY_DATASET, config.BIGQUERY_TABLE)
+    if kind == "pubsub":
+        return PubSubSink(config.GCP_PROJECT_ID, config.PUBSUB_TOPIC)
+    raise ValueError(f"Unknown EVENT_SINK: {config.EVENT_SINK}")
+
+
+class EventLog:
+    """
+    Bounded queue + background batch writer
+
+    emit() never blocks and never touches the sink: when the queue is full
+    the event is dropped and counted. The writer flushes when batch_size
+    events are waiting or flush_interval_s has passed. A failed write is
+    retried once, then the batch is dropped and counted, so a sink outage
+    costs events rather than request latency or memory.
+    """
+
+    def __init__(
+        self,
+        sink,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval_s: float = 1.0
+    ):
+        """
+        Args:
+            sink: Object with write(events) and close()
+            max_queue: Events held before new ones are dropped
+            batch_size: Maximum events per sink write
+            flush_interval_s: Maximum time an event waits before a flush
+        """
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_s = flush_interval_s
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_queue))
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, config) -> Optional["EventLog"]:
+        """Event log writing to the configured sink (None if EVENT_SINK=none)"""
+        sink = build_sink(config)
+        if sink is None:
+            return None
+        logger.info(f"📝 Event log -> {sink.name}")
+        return cls(
+            sink,
+            max_queue=config.EVENT_QUEUE_SIZE,
+            batch_size=config.EVENT_BATCH_SIZE,
+            flush_interval_s=config.EVENT_FLUSH_INTERVAL_MS / 1000.0
+        )
+
+    def emit(self, event_type: str, **fields) -> bool:
+        """
+        Queue an event without blocking
+
+        Returns:
+            bool: False if the event was dropped
+        """
+        if self._closed:
+            self._drop("shutdown")
+            return False
+        event = {"type": event_type, "timestamp": datetime.utcnow().isoformat(), **fields}
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._drop("queue_full")
+            return False
+        with self._stats_lock:
+            self.enqueued += 1
+        EVENTS_ENQUEUED.inc(event_type)
+        EVENT_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush queued events and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self.sink.close()
+
+    def stats(self) -> Dict:
+        return {
+            "sink": self.sink.name,
+            "queued": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped
+        }
+
+    def _drop(self, reason: str, count: int = 1) -> None:
+        with self._stats_lock:
+            self.dropped += count
+        EVENTS_DROPPED.inc(reason, amount=count)
+
+    def _run(self) -> None:
+        while True:
+            batch = []
+            stop = False
+            deadline = time.monotonic() + self.flush_interval_s
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    event = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if event is None:
+                    stop = True
+                    break
+                batch.append(event)
+            EVENT_QUEUE_DEPTH.set(self._queue.qsize())
+            if batch:
+                self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch: List[Dict]) -> None:
+        EVENT_BATCH.observe(len(batch))
+        for attempt in range(2):
+            start = time.perf_counter()
+            try:
+                self.sink.write(batch)
+            except Exception as e:
+                logger.error(f"❌ Event sink {self.sink.name} failed ({len(batch)} events): {str(e)}")
+                if attempt == 0:
+                    time.sleep(min(1.0, self.flush_interval_s))
+                    continue
+                self._drop("sink_error", len(batch))
+                return
+            EVENT_FLUSH.observe(time.perf_counter() - start, self.sink.name)
+            EVENTS_WRITTEN.inc(self.sink.name, amount=len(batch))
+            self.written += len(batch)
+            return
@@ -0,0 +1,241 @@
+"""
+FAQ Table File Format
+Compact on-disk table of precomputed answers: intent centroids (float32),
+an (intent, tone) entry index and the answers, memory-mapped at load so
+workers share the pages and only the answers actually served are decoded
+
+Layout (little-endian):
+    b"SFAQ" | version u32 | header length u32 | header JSON
+    centroids   intents x dims float32, unit length
+    entries     per answer: intent u32, label u16, pad u16, offset u32, length u32
+    answers     UTF-8 JSON per entry
+    intents     UTF-8 JSON: member queries and tone statistics per intent
+                (only read to rebuild the table)
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime
+from operator import mul
+from typing import Dict, List, Optional, Tuple
+
+MAGIC = b"SFAQ"
+VERSION = 1
+_PREAMBLE = struct.Struct("<4sII")
+_ENTRY = struct.Struct("<IHHII")
+
+
+def _align(offset: int, to: int = 8) -> int:
+    return (offset + to - 1) // to * to
+
+
+def write_faq_table(
+    path: str,
+    centroids: List[List[float]],
+    answers: Dict[Tuple[int, str], Dict],
+    intents: List[Dict],
+    generation: List[str],
+    embedding: Dict
+) -> Dict:
+    """
+    Write a FAQ table atomically (temporary file + rename)
+
+    Args:
+        path: Destination file
+        centroids: Unit-length centroid per intent
+        answers: (intent index, sentiment label) -> answer dict
+        intents: Per-intent metadata (members, tones) in centroid order
+        generation: Concrete index(es) the answers were generated from
+        embedding: embedding_signature() the centroids were computed with
+
+    Returns:
+        The header written
+    """
+    dims = len(centroids[0]) if centroids else embedding.get("embedding_dims", 0)
+    labels = sorted({label for _, label in answers})
+    label_ids = {label: i for i, label in enumerate(labels)}
+
+    matrix = array("f", (value for centroid in centroids for value in centroid))
+    blobs = []
+    entries = []
+    offset = 0
+    for (intent, label) in sorted(answers, key=lambda key: (key[0], label_ids[key[1]])):
+        blob = json.dumps(answers[(intent, label)], ensure_ascii=False).encode("utf-8")
+        entries.append(_ENTRY.pack(intent, label_ids[label], 0, offset, len(blob)))
+        blobs.append(blob)
+        offset += len(blob)
+    entry_bytes = b"".join(entries)
+    answer_bytes = b"".join(blobs)
+    intent_bytes = json.dumps(intents, ensure_ascii=False).encode("utf-8")
+    if sys.byteorder != "little":
+        matrix.byteswap()
+
+    header = {
+        "dims": dims,
+        "intents": len(centroids),
+        "entries": len(entries),
+        "labels": labels,
+        "generation": list(generation),
+        "embedding": embedding,
+        "built_at": datetime.utcnow().isoformat()
+    }
+    # Section offsets depend on the header size, which depends on the offsets
+    sections = {}
+    for _ in range(3):
+        header["sections"] = sections
+        start = _align(_PREAMBLE.size + len(json.dumps(header).encode("utf-8")))
+        position = start
+        sizes = (
+            ("centroids", len(matrix) * 4),
+            ("entries", len(entry_bytes)),
+            ("answers", len(answer_bytes)),
+            ("intents", len(intent_bytes))
+        )
+        new_sections = {}
+        for name, size in sizes:
+            new_sections[name] = [position, size]
+            position = _align(position + size)
+        if new_sections == sections:
+            break
+        sections = new_sections
+    header["sections"] = sections
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, data in (
+            ("centroids", matrix.tobytes()),
+            ("entries", entry_bytes),
+            ("answers", answer_bytes),
+            ("intents", intent_bytes)
+        ):
+            f.write(b"\0" * (sections[name][0] - f.tell()))
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return header
+
+
+class FaqTable:
+    """
+    Read-only, memory-mapped FAQ table
+
+    Nearest-centroid search is one matrix-vector product with numpy
+    installed, a pure-Python scan over the mapped floats otherwise (a few
+    hundred intents keep either well under the cost of one retrieval).
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Table written by write_faq_table
+
+        Raises:
+            ValueError: if the file is not a FAQ table of this version
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, header_length = _PREAMBLE.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} FAQ table")
+            self.header = json.loads(self._mm[_PREAMBLE.size:_PREAMBLE.size + header_length])
+        except Exception:
+            self._mm.close()
+            raise
+
+        self.dims = self.header["dims"]
+        self.size = self.header["intents"]
+        self.labels = self.header["labels"]
+        self.generation = self.header["generation"]
+        self.embedding = self.header["embedding"]
+        self.built_at = self.header["built_at"]
+        self._sections = self.header["sections"]
+
+        start, length = self._sections["centroids"]
+        try:
+            import numpy as np
+            self._matrix = np.frombuffer(self._mm, dtype="<f4", count=length // 4, offset=start).reshape(
+                self.size, self.dims
+            )
+            self._np = np
+        except ImportError:
+            self._np = None
+            view = memoryview(self._mm)[start:start + length]
+            if sys.byteorder == "little":
+                self._matrix = view.cast("f")
+            else:
+                self._matrix = array("f", view)
+                self._matrix.byteswap()
+
+        # (intent, label) -> answer location; a few hundred small tuples
+        start, length = self._sections["entries"]
+        self._entries = {}
+        for intent, label_id, _, offset, size in _ENTRY.iter_unpack(self._mm[start:start + length]):
+            self._entries[(intent, self.labels[label_id])] = (offset, size)
+
+    def nearest(self, embedding: List[float]) -> Tuple[Optional[int], float]:
+        """
+        Closest intent by cosine similarity
+
+        Args:
+            embedding: Unit-length query embedding (dims long)
+
+        Returns:
+            (intent index, similarity); (None, 0.0) for an empty table
+        """
+        if not self.size:
+            return None, 0.0
+        if self._np is not None:
+            scores = self._matrix @ self._np.asarray(embedding, dtype=self._np.float32)
+            best = int(scores.argmax())
+            return best, float(scores[best])
+        dims = self.dims
+        best, best_score = 0, -2.0
+        for i in range(self.size):
+            score = sum(map(mul, embedding, self._matrix[i * dims:(i + 1) * dims]))
+            if score > best_score:
+                best, best_score = i, score
+        return best, best_score
+
+    def answer(self, intent: int, label: str) -> Optional[Dict]:
+        """Precomputed answer for an intent and sentiment label (None if absent)"""
+        location = self._entries.get((intent, label))
+        if location is None:
+            return None
+        base = self._sections["answers"][0]
+        offset, size = location
+        return json.loads(self._mm[base + offset:base + offset + size])
+
+    def intents(self) -> List[Dict]:
+        """Member queries and tone statistics per intent (for rebuilding)"""
+        start, length = self._sections["intents"]
+        return json.loads(self._mm[start:start + length])
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "intents": self.size,
+            "entries": len(self._entries),
+            "labels": self.labels,
+            "generation": self.generation,
+            "built_at": self.built_at,
+            "bytes": len(self._mm)
+        }
+
+    def close(self) -> None:
+        # Views into the map must go first, or mmap.close() raises BufferError
+        self._matrix = None
+        try:
+            self._mm.close()
+        except BufferError:
+            pass
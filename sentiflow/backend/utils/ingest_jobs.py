@@ -0,0 +1,474 @@
+"""
+Ingestion Jobs
+Background knowledge base updates behind /api/ingest: a bounded number of
+DocumentIngestor runs at a time, progress reported while they run,
+cancellation, and job state persisted as one JSON file per job so any
+worker process can report on a job and restarts leave a record
+"""
+
+import base64
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from utils.document_parsers import parser_for
+from utils.metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODES = ("update", "rebuild")
+ACTIVE_STATUSES = ("queued", "running")
+# interrupted: the process running the job exited before it finished
+FINAL_STATUSES = ("succeeded", "failed", "cancelled", "interrupted")
+
+INGEST_JOBS = REGISTRY.counter(
+    "sentiflow_ingest_jobs_total",
+    "Finished ingestion jobs by mode and status",
+    ("mode", "status")
+)
+INGEST_JOBS_ACTIVE = REGISTRY.gauge(
+    "sentiflow_ingest_jobs_active",
+    "Ingestion jobs queued or running in this process"
+)
+
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{16}$")
+# Seconds between progress writes to the job file
+_PERSIST_INTERVAL_S = 1.0
+
+
+class JobRejected(Exception):
+    """Raised when the job queue is full"""
+
+
+def valid_job_id(job_id: str) -> bool:
+    return bool(_JOB_ID_RE.match(job_id or ""))
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    if os.name != "posix":
+        # No cheap liveness probe; assume the owner is still working on it
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class IngestJobRunner:
+    """
+    Runs ingestion jobs on a small thread pool
+
+    A job ingests either a folder under `root` or documents uploaded with
+    the request (written to the job's directory), into a tenant's
+    knowledge base:
+    - update: DocumentIngestor.ingest_folder into the serving index
+      (chunks are added next to the existing ones)
+    - rebuild: pipelines/reindex.py rebuild_index, a blue/green rebuild
+      that swaps the alias when done and leaves it untouched on failure
+      or cancellation
+
+    Parsing, embedding and indexing happen off the request threads; at
+    most `max_concurrent` jobs run at once per process, so chat traffic
+    keeps its CPU and Vertex AI quota.
+    """
+
+    def __init__(
+        self,
+        ingestor_for: Callable[[str], object],
+        directory: str,
+        root: str,
+        max_concurrent: int = 1,
+        max_queued: int = 10,
+        history: int = 100,
+        on_finished: Optional[Callable[[Dict], None]] = None
+    ):
+        """
+        Args:
+            ingestor_for: Tenant ID -> DocumentIngestor writing to that
+                tenant's knowledge base
+            directory: Where job files and uploaded documents are kept
+            root: Folder jobs may read documents from (and below)
+            max_concurrent: Jobs running at once
+            max_queued: Jobs waiting beyond the running ones
+            history: Finished jobs kept on disk
+            on_finished: Called with the job after it ends (cache invalidation)
+        """
+        self.ingestor_for = ingestor_for
+        self.directory = Path(directory)
+        self.root = Path(root).resolve()
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.history = max(1, history)
+        self.on_finished = on_finished
+        self._jobs: Dict[str, Dict] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="ingest-job")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._recover()
+
+    @classmethod
+    def from_config(cls, config, ingestor_for, on_finished=None) -> "IngestJobRunner":
+        return cls(
+            ingestor_for,
+            directory=config.INGEST_JOB_DIR,
+            root=config.INGEST_ROOT,
+            max_concurrent=config.INGEST_JOB_WORKERS,
+            max_queued=config.INGEST_JOB_QUEUE_SIZE,
+            history=config.INGEST_JOB_HISTORY,
+            on_finished=on_finished
+        )
+
+    # ------------------------------------------------------------------
+    # Job files
+    # ------------------------------------------------------------------
+
+    def _job_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.json"
+
+    def _cancel_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.cancel"
+
+    def _persist(self, job: Dict) -> None:
+        path = self._job_path(job["job_id"])
+        tmp_path = path.with_suffix(f".tmp-{os.getpid()}-{threading.get_ident()}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+    def _load(self, job_id: str) -> Optional[Dict]:
+        try:
+            with open(self._job_path(job_id), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _recover(self) -> None:
+        """Mark jobs whose process is gone as interrupted"""
+        for path in self.directory.glob("*.json"):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if job.get("status") in ACTIVE_STATUSES and not _pid_alive(job.get("pid")):
+                job["status"] = "interrupted"
+                job["finished_at"] = datetime.utcnow().isoformat()
+                job["error"] = "The process running this job exited; resubmit it"
+                self._persist(job)
+                logger.warning(f"⚠️  Ingestion job {job['job_id']} was interrupted by a restart")
+
+    def _prune(self) -> None:
+        """Delete the oldest finished jobs beyond `history`"""
+        finished = []
+        for path in self.directory.glob("*.json"):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if job.get("status") in FINAL_STATUSES:
+                finished.append((job.get("created_at", ""), job["job_id"]))
+        for _, job_id in sorted(finished)[:-self.history]:
+            self._job_path(job_id).unlink(missing_ok=True)
+            self._cancel_path(job_id).unlink(missing_ok=True)
+            shutil.rmtree(self.directory / job_id, ignore_errors=True)
+            with self._lock:
+                self._jobs.pop(job_id, None)
+                self._cancel_events.pop(job_id, None)
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def submit(self, tenant: str, spec: Dict, max_upload_bytes: int) -> Dict:
+        """
+        Validate and queue an ingestion job
+
+        Args:
+            tenant: Normalized tenant ID whose knowledge base is updated
+            spec: {"folder": path under root} or {"documents": [{"name",
+                "content" | "content_base64"}]}, plus optional "mode"
+                (update | rebuild), "category" and "pattern"
+            max_upload_bytes: Limit on the decoded size of uploaded documents
+
+        Returns:
+            The queued job
+
+        Raises:
+            ValueError: if the spec is invalid
+            JobRejected: if too many jobs are queued already
+        """
+        mode = spec.get("mode") or "update"
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}' (expected one of {', '.join(MODES)})")
+        if bool(spec.get("folder")) == bool(spec.get("documents")):
+            raise ValueError("Give either 'folder' or 'documents'")
+        category = str(spec.get("category") or "knowledge_base")
+        pattern = spec.get("pattern") or None
+
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job["status"] in ACTIVE_STATUSES)
+            if active >= self.max_concurrent + self.max_queued:
+                raise JobRejected(f"{active} ingestion jobs are queued or running; try again later")
+
+        job_id = uuid.uuid4().hex[:16]
+        if spec.get("folder"):
+            folder = self._resolve_folder(str(spec["folder"]))
+            source = str(folder.relative_to(self.root)) or "."
+        else:
+            folder = self._write_uploads(job_id, spec["documents"], max_upload_bytes)
+            source = "upload"
+
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "tenant": tenant,
+            "mode": mode,
+            "source": source,
+            "category": category,
+            "pattern": pattern,
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "progress": None,
+            "result": None,
+            "error": None,
+            "cancel_requested": False,
+            "pid": os.getpid()
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._cancel_events[job_id] = threading.Event()
+            self._persist(job)
+            INGEST_JOBS_ACTIVE.set(sum(1 for j in self._jobs.values() if j["status"] in ACTIVE_STATUSES))
+        self._pool.submit(self._run, job_id, str(folder))
+        logger.info(f"📥 Queued ingestion job {job_id} ({mode}, tenant {tenant}, {source})")
+        self._prune()
+        return dict(job)
+
+    def _resolve_folder(self, folder: str) -> Path:
+        path = (self.root / folder).resolve()
+        if path != self.root and self.root not in path.parents:
+            raise ValueError(f"Folder must be inside the ingestion root ({self.root})")
+        if not path.is_dir():
+            raise ValueError(f"Folder not found: {folder}")
+        return path
+
+    def _write_uploads(self, job_id: str, documents: List[Dict], max_upload_bytes: int) -> Path:
+        if not isinstance(documents, list):
+            raise ValueError("'documents' must be a list of {name, content} objects")
+        files = {}
+        total = 0
+        for document in documents:
+            name = Path(str((document or {}).get("name") or "")).name
+            if not name or name.startswith("."):
+                raise ValueError("Every document needs a file name")
+            if parser_for(name) is None:
+                raise ValueError(f"Unsupported document type: {name}")
+            if name in files:
+                raise ValueError(f"Duplicate document name: {name}")
+            if "content_base64" in document:
+                try:
+                    data = base64.b64decode(document["content_base64"], validate=True)
+                except (ValueError, TypeError):
+                    raise ValueError(f"Invalid base64 content for {name}")
+            else:
+                data = str(document.get("content") or "").encode("utf-8")
+            total += len(data)
+            if total > max_upload_bytes:
+                raise ValueError(f"Uploaded documents exceed {max_upload_bytes // (1024 * 1024)} MB")
+            files[name] = data
+
+        folder = self.directory / job_id / "files"
+        folder.mkdir(parents=True, exist_ok=True)
+        for name, data in files.items():
+            (folder / name).write_bytes(data)
+        return folder
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Job state (from this process, else from its job file; None if unknown)"""
+        if not valid_job_id(job_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        return self._load(job_id)
+
+    def recent(self, tenant: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Most recent jobs first (optionally of one tenant)"""
+        jobs = []
+        for path in self.directory.glob("*.json"):
+            job = self.get(path.stem)
+            if job is not None and (tenant is None or job.get("tenant") == tenant):
+                jobs.append(job)
+        jobs.sort(key=lambda job: job.get("created_at", ""), reverse=True)
+        return jobs[:limit]
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """
+        Request cancellation of a job
+
+        A queued job is cancelled before it starts; a running one stops
+        before its next file (a rebuild discards its new index). Jobs run
+        by another worker process see the request through a marker file.
+
+        Returns:
+            The job after the request (None if unknown)
+        """
+        job = self.get(job_id)
+        if job is None or job["status"] in FINAL_STATUSES:
+            return job
+        with self._lock:
+            local = self._jobs.get(job_id)
+            if local is not None:
+                local["cancel_requested"] = True
+                self._cancel_events[job_id].set()
+                self._persist(local)
+        if local is not None:
+            if local["status"] == "queued":
+                self._finish(job_id, "cancelled", error="Cancelled before it started")
+            return self.get(job_id)
+        self._cancel_path(job_id).touch()
+        job["cancel_requested"] = True
+        return job
+
+    def stats(self) -> Dict:
+        with self._lock:
+            statuses: Dict[str, int] = {}
+            for job in self._jobs.values():
+                statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "jobs": statuses
+        }
+
+    def close(self) -> None:
+        """Ask running jobs to stop before their next file and drop queued ones"""
+        with self._lock:
+            for event in self._cancel_events.values():
+                event.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _cancelled(self, job_id: str) -> bool:
+        return self._cancel_events[job_id].is_set() or self._cancel_path(job_id).exists()
+
+    def _update(self, job_id: str, persist: bool = True, **fields) -> Dict:
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            if persist:
+                self._persist(job)
+            INGEST_JOBS_ACTIVE.set(sum(1 for j in self._jobs.values() if j["status"] in ACTIVE_STATUSES))
+            return dict(job)
+
+    def _run(self, job_id: str, folder: str) -> None:
+        job = self._jobs[job_id]
+        if job["status"] in FINAL_STATUSES:
+            return
+        if self._cancelled(job_id):
+            self._finish(job_id, "cancelled", error="Cancelled before it started")
+            return
+
+        started = time.perf_counter()
+        self._update(job_id, status="running", started_at=datetime.utcnow().isoformat())
+        last_persist = 0.0
+
+        def progress(totals: Dict) -> None:
+            nonlocal last_persist
+            elapsed = max(totals["elapsed_s"], 1e-6)
+            report = {
+                **totals,
+                "file": os.path.relpath(totals["file"], folder),
+                "percent": round(100.0 * totals["files_done"] / totals["files_total"], 1),
+                "chunks_per_s": round(totals["chunks"] / elapsed, 1),
+                "embeddings_per_s": round(totals["embeddings"] / elapsed, 1)
+            }
+            now = time.monotonic()
+            persist = now - last_persist >= _PERSIST_INTERVAL_S or totals["files_done"] == totals["files_total"]
+            if persist:
+                last_persist = now
+            self._update(job_id, persist=persist, progress=report)
+
+        try:
+            ingestor = self.ingestor_for(job["tenant"])
+            if job["mode"] == "rebuild":
+                from pipelines.reindex import RebuildCancelled, rebuild_index
+                try:
+                    result = rebuild_index(
+                        folder,
+                        category=job["category"],
+                        file_pattern=job["pattern"],
+                        alias=ingestor.es_client.index_name,
+                        es_client=ingestor.es_client,
+                        ingestor=ingestor,
+                        progress=progress,
+                        cancelled=lambda: self._cancelled(job_id)
+                    )
+                except RebuildCancelled as e:
+                    self._finish(job_id, "cancelled", error=str(e), elapsed=time.perf_counter() - started)
+                    return
+            else:
+                result = ingestor.ingest_folder(
+                    folder,
+                    category=job["category"],
+                    file_pattern=job["pattern"],
+                    progress=progress,
+                    cancelled=lambda: self._cancelled(job_id)
+                )
+                if not result.get("total_files"):
+                    raise ValueError(f"No supported documents in {job['source']}")
+                if result.get("cancelled"):
+                    self._finish(
+                        job_id,
+                        "cancelled",
+                        result=result,
+                        error="Cancelled; chunks indexed before the cancellation were kept",
+                        elapsed=time.perf_counter() - started
+                    )
+                    return
+            self._finish(job_id, "succeeded", result=result, elapsed=time.perf_counter() - started)
+
+        except Exception as e:
+            logger.error(f"❌ Ingestion job {job_id} failed: {str(e)}")
+            self._finish(job_id, "failed", error=str(e), elapsed=time.perf_counter() - started)
+
+    def _finish(self, job_id: str, status: str, elapsed: float = 0.0, **fields) -> None:
+        job = self._update(
+            job_id,
+            status=status,
+            finished_at=datetime.utcnow().isoformat(),
+            duration_s=round(elapsed, 3),
+            **fields
+        )
+        self._cancel_path(job_id).unlink(missing_ok=True)
+        # Uploaded documents are only needed while the job runs
+        shutil.rmtree(self.directory / job_id, ignore_errors=True)
+        INGEST_JOBS.inc(job["mode"], status)
+        logger.info(f"🏁 Ingestion job {job_id} {status} after {elapsed:.1f}s")
+        if self.on_finished is not None:
+            try:
+                self.on_finished(job)
+            except Exception as e:
+                logger.warning(f"⚠️ Post-ingestion hook failed for job {job_id}: {str(e)}")
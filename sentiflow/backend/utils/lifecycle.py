@@ -0,0 +1,114 @@
+"""
+Startup Lifecycle Module
+Runs component initialization and warm-up in parallel phases and
+tracks readiness for the /api/ready endpoint
+"""
+
+import importlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    """
+    Tracks application startup:
+    - starting: components are being created / warmed
+    - ready: all required components initialized
+    - failed: a required component could not be initialized
+    """
+
+    STARTING = "starting"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, max_workers: int = 4):
+        """
+        Args:
+            max_workers: Thread pool size for parallel startup tasks
+        """
+        self.max_workers = max_workers
+        self.state = self.STARTING
+        self.started_at = time.perf_counter()
+        self.ready_at = None
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == self.READY
+
+    def _run_task(self, phase: str, name: str, task: Callable[[], Any]) -> Any:
+        """Run one task, recording its duration (ms) and any error"""
+        key = f"{phase}.{name}"
+        start = time.perf_counter()
+        try:
+            return task()
+        except Exception as e:
+            with self._lock:
+                self.errors[key] = str(e)
+            logger.error(f"❌ Startup task {key} failed: {str(e)}")
+            return None
+        finally:
+            with self._lock:
+                self.timings[key] = round((time.perf_counter() - start) * 1000, 1)
+
+    def run_parallel(self, phase: str, tasks: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """
+        Run tasks concurrently and wait for all of them
+
+        Args:
+            phase: Phase name used to prefix timings (e.g. "init", "warmup")
+            tasks: Mapping of task name to zero-argument callable
+
+        Returns:
+            Mapping of task name to result (None if the task failed)
+        """
+        logger.info(f"⏱️  Startup phase '{phase}': {', '.join(tasks)}")
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"startup-{phase}") as pool:
+            futures = {
+                name: pool.submit(self._run_task, phase, name, task)
+                for name, task in tasks.items()
+            }
+            return {name: future.result() for name, future in futures.items()}
+
+    def import_modules(self, modules: List[str]) -> None:
+        """
+        Import heavy modules one by one so their cost shows up in timings
+
+        Args:
+            modules: Dotted module names
+        """
+        for module in modules:
+            self._run_task("import", module, lambda m=module: importlib.import_module(m))
+
+    def mark_ready(self) -> None:
+        self.state = self.READY
+        self.ready_at = time.perf_counter()
+        logger.info(f"✅ Startup complete in {self.startup_ms():.0f} ms")
+
+    def mark_failed(self, reason: str) -> None:
+        self.state = self.FAILED
+        self.errors.setdefault("startup", reason)
+        logger.error(f"❌ Startup failed: {reason}")
+
+    def startup_ms(self) -> float:
+        end = self.ready_at or time.perf_counter()
+        return (end - self.started_at) * 1000
+
+    def status(self) -> Dict:
+        """Readiness report for the /api/ready endpoint"""
+        return {
+            "status": self.state,
+            "startup_ms": round(self.startup_ms(), 1),
+            "timings_ms": dict(self.timings),
+            "errors": dict(self.errors),
+            "timestamp": datetime.utcnow().isoformat()
+        }
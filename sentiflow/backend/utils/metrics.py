@@ -0,0 +1,261 @@
+"""
+Metrics and Tracing Module
+Low-overhead counters, gauges and histograms with Prometheus text export,
+plus context-managed spans for per-stage latency
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Default latency buckets in seconds (1ms .. 30s)
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class: a named family of label-keyed series"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *labelvalues):
+        """Return (creating if needed) the series for labelvalues"""
+        key = tuple(str(v) for v in labelvalues)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.get(key)
+                if series is None:
+                    series = self._new_series()
+                    self._series[key] = series
+        return series
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, series in sorted(self._series.items()):
+            lines.extend(self._render_series(key, series))
+        return lines
+
+    def _render_series(self, key: Tuple, series) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(series.value)}"]
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    kind = "counter"
+
+    def _new_series(self):
+        return _Value()
+
+    def inc(self, *labelvalues, amount: float = 1) -> None:
+        self.labels(*labelvalues).inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def _new_series(self):
+        return _Value()
+
+    def set(self, value: float, *labelvalues) -> None:
+        self.labels(*labelvalues).set(value)
+
+
+class _HistogramSeries:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram (O(log buckets) per observation)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+
+    def observe(self, value: float, *labelvalues) -> None:
+        self.labels(*labelvalues).observe(value)
+
+    def _render_series(self, key: Tuple, series: _HistogramSeries) -> List[str]:
+        lines = []
+        running = 0
+        for bound, count in zip(series.bounds + (float("inf"),), series.counts):
+            running += count
+            labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {running}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {series.sum!r}")
+        lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+
+class Registry:
+    """Holds all metric families; get-or-create by name"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = cls(name, documentation, labelnames, **kwargs)
+                    self._metrics[name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by all modules
+REGISTRY = Registry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "sentiflow_stage_duration_seconds",
+    "Latency of pipeline stages",
+    ("stage",)
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "sentiflow_stage_errors_total",
+    "Pipeline stages that raised an exception",
+    ("stage",)
+)
+
+# Spans recorded for the current request when tracing is enabled
+_current_trace: ContextVar[Optional[List[Dict]]] = ContextVar("sentiflow_trace", default=None)
+
+
+class span:
+    """
+    Time a pipeline stage
+
+    Usage:
+        with span("retrieve.embedding"):
+            ...
+
+    Always records into STAGE_LATENCY; additionally appends to the
+    current request trace when start_trace() was called.
+    """
+
+    __slots__ = ("stage", "start", "duration")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.duration = 0.0
+
+    def __enter__(self) -> "span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.duration = time.perf_counter() - self.start
+        STAGE_LATENCY.labels(self.stage).observe(self.duration)
+        if exc_type is not None:
+            STAGE_ERRORS.labels(self.stage).inc()
+
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append({
+                "stage": self.stage,
+                "ms": round(self.duration * 1000, 2),
+                "error": exc_type is not None
+            })
+        return False
+
+
+def start_trace() -> List[Dict]:
+    """Begin collecting spans for the current request; returns the span list"""
+    trace: List[Dict] = []
+    _current_trace.set(trace)
+    return trace
+
+
+def end_trace() -> Optional[List[Dict]]:
+    """Stop collecting spans and return what was recorded"""
+    trace = _current_trace.get()
+    _current_trace.set(None)
+    return trace
@@ -0,0 +1,234 @@
+"""
+Priority Scheduling Utilities
+Admission control for the chat path: bounded execution slots shared by
+priority classes, with load shedding for low-priority traffic
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from utils.metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HIGH = 0
+NORMAL = 1
+PRIORITY_NAMES = {HIGH: "high", NORMAL: "normal"}
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    "sentiflow_scheduler_queue_depth",
+    "Requests waiting for an execution slot",
+    ("priority",)
+)
+ACTIVE = REGISTRY.gauge(
+    "sentiflow_scheduler_active",
+    "Requests currently holding an execution slot"
+)
+ADMISSIONS = REGISTRY.counter(
+    "sentiflow_scheduler_admissions_total",
+    "Admission decisions (immediate, queued, shed)",
+    ("priority", "outcome")
+)
+QUEUE_WAIT = REGISTRY.histogram(
+    "sentiflow_scheduler_wait_seconds",
+    "Time spent waiting for an execution slot",
+    ("priority",)
+)
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of being given a slot"""
+
+    def __init__(self, priority: int, reason: str):
+        super().__init__(f"{PRIORITY_NAMES[priority]} priority request shed: {reason}")
+        self.priority = priority
+        self.reason = reason
+
+
+class PriorityScheduler:
+    """
+    Hands out a fixed number of execution slots in priority order
+
+    - High priority requests may use every slot; normal priority requests
+      only max_concurrency - reserved_high, so a burst of routine traffic
+      always leaves room for at-risk customers
+    - Waiters are served strictly by (priority, arrival)
+    - A request is shed (Overloaded) when its class queue is full or it
+      waited longer than its class's max wait
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        reserved_high: int = 2,
+        max_queue: Optional[Dict[int, int]] = None,
+        max_wait_s: Optional[Dict[int, float]] = None
+    ):
+        """
+        Args:
+            max_concurrency: Total execution slots
+            reserved_high: Slots normal priority requests may not take
+            max_queue: Maximum waiters per priority
+            max_wait_s: Maximum queueing time per priority
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.reserved_high = min(max(0, reserved_high), self.max_concurrency - 1)
+        self.max_queue = max_queue or {HIGH: 64, NORMAL: 16}
+        self.max_wait_s = max_wait_s or {HIGH: 10.0, NORMAL: 2.0}
+        self._cond = threading.Condition()
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._queued = {HIGH: 0, NORMAL: 0}
+        self.active = 0
+
+    @classmethod
+    def from_config(cls, config) -> "PriorityScheduler":
+        """Build a scheduler from SCHED_* settings"""
+        return cls(
+            max_concurrency=config.SCHED_MAX_CONCURRENCY,
+            reserved_high=config.SCHED_RESERVED_HIGH,
+            max_queue={HIGH: config.SCHED_MAX_QUEUE_HIGH, NORMAL: config.SCHED_MAX_QUEUE_NORMAL},
+            max_wait_s={
+                HIGH: config.SCHED_MAX_WAIT_HIGH_MS / 1000.0,
+                NORMAL: config.SCHED_MAX_WAIT_NORMAL_MS / 1000.0
+            }
+        )
+
+    def _limit(self, priority: int) -> int:
+        return self.max_concurrency if priority == HIGH else self.max_concurrency - self.reserved_high
+
+    def _shed(self, priority: int, reason: str) -> Overloaded:
+        ADMISSIONS.inc(PRIORITY_NAMES[priority], "shed")
+        return Overloaded(priority, reason)
+
+    def acquire(self, priority: int, timeout: Optional[float] = None) -> float:
+        """
+        Wait for an execution slot
+
+        Args:
+            priority: HIGH or NORMAL
+            timeout: Optional cap on the class's max wait (e.g. request deadline)
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            Overloaded: if the request is shed
+        """
+        name = PRIORITY_NAMES[priority]
+        start = time.perf_counter()
+        with self._cond:
+            if not self._waiters and self.active < self._limit(priority):
+                self.active += 1
+                ACTIVE.set(self.active)
+                ADMISSIONS.inc(name, "immediate")
+                QUEUE_WAIT.observe(0.0, name)
+                return 0.0
+
+            if self._queued[priority] >= self.max_queue[priority]:
+                raise self._shed(priority, "queue full")
+
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            self._queued[priority] += 1
+            QUEUE_DEPTH.set(self._queued[priority], name)
+            max_wait = self.max_wait_s[priority]
+            if timeout is not None:
+                max_wait = min(max_wait, timeout)
+            deadline = start + max_wait
+            try:
+                while True:
+                    if self._waiters[0] == entry and self.active < self._limit(priority):
+                        heapq.heappop(self._waiters)
+                        self.active += 1
+                        ACTIVE.set(self.active)
+                        # Waiters that woke before this one became head went back to
+                        # sleep; wake them if another slot is still free
+                        if self._waiters and self.active < self.max_concurrency:
+                            self._cond.notify_all()
+                        break
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._waiters.remove(entry)
+                        heapq.heapify(self._waiters)
+                        # The next waiter may be runnable now
+                        self._cond.notify_all()
+                        raise self._shed(priority, "wait timeout")
+                    self._cond.wait(remaining)
+            finally:
+                self._queued[priority] -= 1
+                QUEUE_DEPTH.set(self._queued[priority], name)
+
+        waited = time.perf_counter() - start
+        ADMISSIONS.inc(name, "queued")
+        QUEUE_WAIT.observe(waited, name)
+        return waited
+
+    def release(self) -> None:
+        """Return a slot and wake the waiters"""
+        with self._cond:
+            self.active -= 1
+            ACTIVE.set(self.active)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: int, timeout: Optional[float] = None):
+        """Hold an execution slot for the duration of the block"""
+        self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def status(self) -> Dict:
+        """Current slot usage and queue depths"""
+        with self._cond:
+            return {
+                "active": self.active,
+                "max_concurrency": self.max_concurrency,
+                "reserved_high": self.reserved_high,
+                "queued": {PRIORITY_NAMES[p]: n for p, n in self._queued.items()}
+            }
+
+
+if __name__ == "__main__":
+    """Check that queued waiters take every slot freed at once"""
+    import sys
+
+    failures = 0
+    for round_no in range(20):
+        scheduler = PriorityScheduler(max_concurrency=4, reserved_high=0, max_wait_s={HIGH: 2.0, NORMAL: 2.0})
+        for _ in range(4):
+            scheduler.acquire(HIGH)
+        admitted = []
+        waiters = [
+            threading.Thread(target=lambda: admitted.append(scheduler.acquire(HIGH)), daemon=True)
+            for _ in range(3)
+        ]
+        for waiter in waiters:
+            waiter.start()
+        while scheduler.status()["queued"]["high"] < len(waiters):
+            time.sleep(0.001)
+        
+        # Free two slots before any waiter can run
+        with scheduler._cond:
+            scheduler.release()
+            scheduler.release()
+        time.sleep(0.2)
+        if len(admitted) != 2:
+            failures += 1
+            print(f"❌ Round {round_no}: {len(admitted)} of 3 waiters admitted with 2 free slots")
+        
+        for _ in range(2):
+            scheduler.release()
+        for waiter in waiters:
+            waiter.join()
+    
+    print("✅ Queued waiters filled every free slot" if not failures else f"❌ {failures} of 20 rounds failed")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,154 @@
+"""
+Singleflight Utilities
+Collapses concurrent identical calls: the first caller for a key runs the
+computation, callers arriving while it is in flight wait for and share its
+result instead of repeating the backend work
+"""
+
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.deadline import wait_for
+from utils.metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SINGLEFLIGHT_CALLS = REGISTRY.counter(
+    "sentiflow_singleflight_calls_total",
+    "Calls by role: leader (ran the computation) or follower (shared it)",
+    ("group", "role")
+)
+SINGLEFLIGHT_WAITERS = REGISTRY.gauge(
+    "sentiflow_singleflight_waiters",
+    "Followers currently waiting on an in-flight computation",
+    ("group",)
+)
+SINGLEFLIGHT_SHARED = REGISTRY.histogram(
+    "sentiflow_singleflight_followers",
+    "Followers that shared each completed computation",
+    ("group",),
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500)
+)
+
+
+class _Flight:
+    __slots__ = ("future", "label", "waiters")
+
+    def __init__(self, label: str):
+        self.future: Future = Future()
+        self.label = label
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    In-flight deduplication for one kind of call
+
+    Unlike a cache, nothing is kept once the computation finishes: a
+    caller arriving afterwards starts a new one. The leader runs fn on its
+    own thread (with its own deadline and spans); followers wait at most
+    `timeout` seconds. An exception raised by the leader is raised in
+    every follower too.
+    """
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Label for the singleflight metrics
+        """
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+        self.waiting = 0
+
+    def in_flight(self, key: str) -> bool:
+        """Whether a computation for key is running right now"""
+        return key in self._flights
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        timeout: Optional[float] = None,
+        label: Optional[str] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Run fn, or wait for the identical call already in flight
+
+        Args:
+            key: Identity of the call
+            fn: Computation to run if no call for key is in flight
+            timeout: Maximum follower wait in seconds (None = no limit)
+            label: Readable form of the key for stats() (key if None)
+
+        Returns:
+            (result, shared): shared is True for followers
+
+        Raises:
+            DeadlineExceeded: if a follower's timeout elapses first
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight(label or key)
+                self._flights[key] = flight
+                self.leaders += 1
+            else:
+                flight.waiters += 1
+                self.followers += 1
+                self.waiting += 1
+                waiting = self.waiting
+
+        if leader:
+            SINGLEFLIGHT_CALLS.inc(self.name, "leader")
+            return self._lead(key, flight, fn), False
+
+        SINGLEFLIGHT_CALLS.inc(self.name, "follower")
+        SINGLEFLIGHT_WAITERS.set(waiting, self.name)
+        try:
+            return wait_for(self.name, flight.future, timeout), True
+        finally:
+            with self._lock:
+                self.waiting -= 1
+                waiting = self.waiting
+            SINGLEFLIGHT_WAITERS.set(waiting, self.name)
+
+    def _lead(self, key: str, flight: _Flight, fn: Callable[[], Any]) -> Any:
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, flight)
+            flight.future.set_exception(e)
+            raise
+        self._finish(key, flight)
+        flight.future.set_result(result)
+        return result
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        # Unregister before resolving: later callers start a fresh computation
+        with self._lock:
+            self._flights.pop(key, None)
+            followers = flight.waiters
+        SINGLEFLIGHT_SHARED.observe(followers, self.name)
+        if followers:
+            logger.info(f"🪂 {self.name}: {followers} identical calls shared one result ({flight.label[:50]})")
+
+    def stats(self, top: int = 5) -> Dict:
+        """Counters plus the in-flight keys with the most waiters"""
+        with self._lock:
+            flights: List[_Flight] = sorted(self._flights.values(), key=lambda f: f.waiters, reverse=True)
+            total = self.leaders + self.followers
+            return {
+                "in_flight": len(flights),
+                "waiting": self.waiting,
+                "leaders": self.leaders,
+                "followers": self.followers,
+                "shared_ratio": round(self.followers / total, 4) if total else 0.0,
+                "top_keys": [{"key": f.label, "waiters": f.waiters} for f in flights[:top]]
+            }
@@ -0,0 +1,121 @@
+"""
+Tenant Routing Utilities
+Maps tenant IDs to their own knowledge base index and keeps a bounded pool
+of per-tenant components that are built on first use
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+from config import Config
+from utils.metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_TENANT_ID_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+TENANT_POOL = REGISTRY.gauge(
+    "sentiflow_tenant_pool_size",
+    "Tenants with provisioned components in this process"
+)
+TENANT_EVENTS = REGISTRY.counter(
+    "sentiflow_tenant_events_total",
+    "Tenant pool events (hit, provisioned, evicted)",
+    ("event",)
+)
+
+
+class InvalidTenant(ValueError):
+    """Tenant ID that cannot be mapped to an index name"""
+
+
+class UnknownTenant(LookupError):
+    """Tenant that is neither allow-listed nor has a knowledge base index"""
+
+
+def normalize_tenant_id(tenant_id: Optional[str]) -> str:
+    """
+    Validate a tenant ID from a request (None/empty = DEFAULT_TENANT)
+
+    Raises:
+        InvalidTenant: if the ID is not lowercase letters, digits, '-' or '_'
+    """
+    tenant = (tenant_id or "").strip().lower() or Config.DEFAULT_TENANT
+    if not _TENANT_ID_RE.match(tenant):
+        raise InvalidTenant(f"Invalid tenant ID: {tenant_id!r}")
+    return tenant
+
+
+def tenant_index_name(tenant_id: str) -> str:
+    """Index (or alias) holding a tenant's knowledge base"""
+    if tenant_id == Config.DEFAULT_TENANT:
+        return Config.ELASTIC_INDEX_NAME
+    return f"{Config.TENANT_INDEX_PREFIX}-{tenant_id}"
+
+
+class TenantPool(Generic[T]):
+    """
+    Lazily built per-tenant components with LRU eviction
+
+    build(tenant_id) runs once per tenant (under a per-tenant lock, so
+    concurrent first requests provision only once). Evicted tenants are
+    rebuilt on their next request; their index is untouched.
+    """
+
+    def __init__(self, build: Callable[[str], T], max_tenants: int = 100):
+        """
+        Args:
+            build: Creates (and provisions) the components for a tenant
+            max_tenants: Tenants kept in memory at once
+        """
+        self.build = build
+        self.max_tenants = max(1, max_tenants)
+        self._items: "OrderedDict[str, T]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._building: Dict[str, threading.Lock] = {}
+
+    def get(self, tenant_id: str) -> T:
+        """Components for a tenant, building them on first use"""
+        with self._lock:
+            item = self._items.get(tenant_id)
+            if item is not None:
+                self._items.move_to_end(tenant_id)
+                TENANT_EVENTS.inc("hit")
+                return item
+            build_lock = self._building.setdefault(tenant_id, threading.Lock())
+
+        try:
+            with build_lock:
+                with self._lock:
+                    item = self._items.get(tenant_id)
+                if item is None:
+                    item = self.build(tenant_id)
+                    TENANT_EVENTS.inc("provisioned")
+                    logger.info(f"🏬 Provisioned tenant: {tenant_id}")
+                    with self._lock:
+                        self._items[tenant_id] = item
+                        while len(self._items) > self.max_tenants:
+                            evicted, _ = self._items.popitem(last=False)
+                            TENANT_EVENTS.inc("evicted")
+                            logger.info(f"♻️  Evicted tenant from pool: {evicted}")
+                        TENANT_POOL.set(len(self._items))
+        finally:
+            # Also after a failed build, so rejected tenant IDs leave nothing behind
+            with self._lock:
+                self._building.pop(tenant_id, None)
+        return item
+
+    def tenants(self):
+        with self._lock:
+            return list(self._items)
+    
+    def items(self):
+        """(tenant_id, components) pairs currently in the pool"""
+        with self._lock:
+            return list(self._items.items())
@@ -0,0 +1,44 @@
+"""
+Token Estimation Utilities
+Cheap, dependency-free token estimates for prompt budgeting
+"""
+
+# Gemini tokenizers average ~4 characters per token for English text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of model tokens in text
+
+    Args:
+        text: Any string
+
+    Returns:
+        Estimated token count (0 for empty text)
+    """
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = " ...") -> str:
+    """
+    Truncate text on a word boundary so it fits within max_tokens
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token budget for the returned string (including suffix)
+        suffix: Marker appended when text was cut
+
+    Returns:
+        The original text if it fits, otherwise a truncated copy
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(0, max_tokens * CHARS_PER_TOKEN - len(suffix))
+    cut = text[:max_chars]
+    space = cut.rfind(" ")
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip() + suffix if cut else ""
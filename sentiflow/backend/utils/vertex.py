@@ -0,0 +1,243 @@
+"""
+Vertex AI Helpers
+Deferred, thread-safe Vertex AI initialization and model creation shared
+by all agents
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Optional
+from config import Config
+from utils.deadline import client_timeout
+from utils.metrics import REGISTRY
+from utils.tokens import estimate_tokens
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_init_lock = threading.Lock()
+_initialized = False
+
+CONTEXT_CACHE_REFRESHES = REGISTRY.counter(
+    "sentiflow_context_cache_refresh_total",
+    "Context cache maintenance (extended TTL, rebuilt after expiry or loss)",
+    ("action",)
+)
+
+
+def init_vertex():
+    """
+    Import and initialize the Vertex AI SDK once per process
+
+    The SDK import is expensive, so it is deferred until a component
+    actually needs it. Safe to call from several startup threads.
+
+    Returns:
+        The imported vertexai module
+    """
+    global _initialized
+
+    import vertexai
+
+    if _initialized:
+        return vertexai
+
+    with _init_lock:
+        if not _initialized:
+            vertexai.init(
+                project=Config.GCP_PROJECT_ID,
+                location=Config.VERTEX_AI_LOCATION
+            )
+            _initialized = True
+            logger.info(f"✅ Initialized Vertex AI ({Config.VERTEX_AI_LOCATION})")
+
+    return vertexai
+
+
+class _TimeoutClient:
+    """
+    Prediction client proxy that sends client_timeout() as the gRPC timeout
+
+    The Vertex SDK's generate_content/get_embeddings take no timeout, so
+    the budget is applied to the underlying PredictionServiceClient calls.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name not in ("generate_content", "predict"):
+            return attr
+
+        def call(*args, **kwargs):
+            timeout = client_timeout()
+            if timeout is not None and kwargs.get("timeout") is None:
+                kwargs["timeout"] = max(timeout, 0.001)
+            return attr(*args, **kwargs)
+        return call
+
+
+def bind_request_timeout(model):
+    """
+    Make a Vertex model's backend calls honor the request deadline
+
+    Works for GenerativeModel (generate_content) and TextEmbeddingModel
+    (endpoint predict). Models without a Vertex prediction client (fakes)
+    are returned unchanged.
+
+    Args:
+        model: Vertex SDK model
+
+    Returns:
+        The same model
+    """
+    owner = getattr(model, "_endpoint", model)
+    try:
+        client = owner._prediction_client
+    except Exception as e:
+        logger.debug(f"No prediction client to bind a timeout to: {e}")
+        return model
+    if not isinstance(client, _TimeoutClient):
+        # Overrides the SDK's cached_property on this instance
+        owner._prediction_client = _TimeoutClient(client)
+    return model
+
+
+def json_generation_config(response_schema: Dict, max_output_tokens: int, temperature: float = 0.0):
+    """
+    Generation config for constrained JSON output
+
+    Args:
+        response_schema: Vertex AI response schema (OpenAPI subset)
+        max_output_tokens: Hard cap on generated tokens
+        temperature: Sampling temperature (0 for deterministic labels)
+
+    Returns:
+        GenerationConfig (or an equivalent dict when the SDK is unavailable)
+    """
+    settings = {
+        "temperature": temperature,
+        "max_output_tokens": max_output_tokens,
+        "response_mime_type": "application/json",
+        "response_schema": response_schema
+    }
+    try:
+        from vertexai.generative_models import GenerationConfig
+    except ImportError:
+        return settings
+    return GenerationConfig(**settings)
+
+
+class ContextCachedModel:
+    """
+    Gemini model bound to a CachedContent that is kept alive
+
+    The cache expires CONTEXT_CACHE_TTL_S after creation. Calls made with
+    less than CONTEXT_CACHE_REFRESH_S left extend the TTL; if that fails,
+    or the service reports the cache missing, the cache and model are
+    rebuilt instead of failing the request.
+    """
+
+    def __init__(self, model_name: str, system_instruction: str):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self._lock = threading.Lock()
+        self._build()
+
+    def _build(self) -> None:
+        from vertexai.preview import caching
+        from vertexai.preview.generative_models import GenerativeModel as PreviewModel
+
+        self.cached = caching.CachedContent.create(
+            model_name=self.model_name,
+            system_instruction=self.system_instruction,
+            ttl=timedelta(seconds=Config.CONTEXT_CACHE_TTL_S)
+        )
+        self.expires_at = time.monotonic() + Config.CONTEXT_CACHE_TTL_S
+        self.model = bind_request_timeout(PreviewModel.from_cached_content(cached_content=self.cached))
+        logger.info(f"🗄️  Created context cache for {self.model_name}: {self.cached.name}")
+
+    def _rebuild(self, reason: str) -> None:
+        logger.warning(f"♻️  Rebuilding context cache for {self.model_name}: {reason}")
+        self._build()
+        CONTEXT_CACHE_REFRESHES.inc("rebuild")
+
+    def _refresh(self) -> None:
+        """Extend the TTL (or rebuild) when the cache is close to expiring"""
+        if self.expires_at - time.monotonic() > Config.CONTEXT_CACHE_REFRESH_S:
+            return
+        with self._lock:
+            remaining = self.expires_at - time.monotonic()
+            if remaining > Config.CONTEXT_CACHE_REFRESH_S:
+                return
+            if remaining > 0:
+                try:
+                    self.cached.update(ttl=timedelta(seconds=Config.CONTEXT_CACHE_TTL_S))
+                    self.expires_at = time.monotonic() + Config.CONTEXT_CACHE_TTL_S
+                    CONTEXT_CACHE_REFRESHES.inc("extend")
+                    return
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not extend context cache {self.cached.name}: {e}")
+            self._rebuild("expired" if remaining <= 0 else "TTL update failed")
+
+    @staticmethod
+    def _cache_missing(error: Exception) -> bool:
+        message = str(error).lower()
+        return type(error).__name__ == "NotFound" or ("cache" in message and (
+            "not found" in message or "expired" in message or "404" in message
+        ))
+
+    def generate_content(self, *args, **kwargs):
+        self._refresh()
+        model = self.model
+        try:
+            return model.generate_content(*args, **kwargs)
+        except Exception as e:
+            if not self._cache_missing(e):
+                raise
+            with self._lock:
+                # Another thread may already have replaced it
+                if self.model is model:
+                    self._rebuild(str(e))
+            return self.model.generate_content(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+def create_generative_model(model_name: str, system_instruction: Optional[str] = None):
+    """
+    Create a Gemini model, optionally backed by an explicit context cache
+
+    When GEMINI_CONTEXT_CACHE is enabled and the system instruction is
+    large enough for Vertex AI context caching, the instruction is
+    uploaded once as CachedContent and the model is bound to it, so the
+    static prefix is not re-processed on every call. Otherwise the
+    instruction is attached as a regular system instruction.
+
+    Args:
+        model_name: Gemini model name
+        system_instruction: Static prompt prefix
+
+    Returns:
+        GenerativeModel instance (ContextCachedModel when cached)
+    """
+    init_vertex()
+    from vertexai.generative_models import GenerativeModel
+
+    if (
+        system_instruction
+        and Config.GEMINI_CONTEXT_CACHE
+        and estimate_tokens(system_instruction) >= Config.CONTEXT_CACHE_MIN_TOKENS
+    ):
+        try:
+            return ContextCachedModel(model_name, system_instruction)
+        except Exception as e:
+            logger.warning(f"⚠️ Context caching unavailable for {model_name}: {e}")
+
+    return bind_request_timeout(GenerativeModel(model_name, system_instruction=system_instruction))